@@ -1,20 +1,17 @@
 import os
 from dotenv import load_dotenv
-from supabase import create_client
 
 # Load environment
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+import supabase_db
 
-if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+supabase = supabase_db.get_client()
+if supabase is None:
     print("❌ Missing Supabase credentials")
     exit(1)
 
-supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-
 try:
     print("Inserting Business Definition...")
     # 1. Add Business Definition
@@ -1,78 +1,77 @@
 import os
 import json
+import logging
+import math
+import re
 import requests
-import sys
-from flask import Flask, request, jsonify
+import time
+import uuid
+from flask import Blueprint, Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
-from openai import OpenAI
-from supabase_db import fetch_suppliers_from_db
-from supabase import create_client, Client
 
 # ===== CONFIG =====
-# Load environment variables explicitly from parent directory
-dotenv_path = os.path.join(os.path.dirname(os.path.dirname((__file__))), '.env')
-if os.path.exists(dotenv_path):
-    print(f"Loading .env from: {dotenv_path}")
+# Load environment variables explicitly from parent directory (DOTENV_PATH overrides,
+# e.g. the benchmark suite points it at an empty file so real credentials are never used).
+# This runs before the imports below because several services read env at import.
+dotenv_path = os.getenv("DOTENV_PATH") or os.path.join(os.path.dirname(os.path.dirname((__file__))), '.env')
+_dotenv_found = os.path.exists(dotenv_path)
+if _dotenv_found:
     load_dotenv(dotenv_path, override=True)
 else:
-    print("WARNING: .env file not found in parent directory")
     load_dotenv() # Fallback to default behavior
 
-app = Flask(__name__)
-# Allow CORS for valid origins - allow all for development
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+import supabase_db
+from routes.bi_routes import bi_bp
+from services import artifact_store, bom_costing, cache_warmup, leaderboard_service, llm, llm_limiter, log_setup, market_research_service, metrics, model_router, points_buffer, profiling, progress_service, prompts, readiness, request_timing, structured_output, supplier_index
+from services.request_timing import span
+from services.llm_limiter import LLMUnavailableError
+from services.structured_output import Schema, StructuredOutputError
 
-# ── BI Blueprint (non-breaking extension) ──
-try:
-    sys.path.insert(0, os.path.dirname(__file__))
-    from routes.bi_routes import bi_bp
-    app.register_blueprint(bi_bp)
-    print("BI Blueprint registered at /api/bi/*")
-except Exception as _bi_err:
-    print(f"WARNING: BI Blueprint failed to load (non-critical): {_bi_err}")
+# Configure logging: queued, non-blocking, rotated; levels from LOG_LEVEL / LOG_LEVELS
+log_setup.configure()
+logger = logging.getLogger(__name__)
+if _dotenv_found:
+    logger.info(f"Loaded .env from: {dotenv_path}")
+else:
+    logger.warning(".env file not found in parent directory")
+
+# Every route in this module; create_app() registers it next to the BI blueprint
+main_bp = Blueprint("main", __name__)
 
-# --- QUOTA PROTECTION: Mock Mode for testing ---
-MOCK_AI = os.getenv("MOCK_AI", "False").lower() == "true"
-print(f"DEBUG: MOCK_AI MODE: {MOCK_AI} (from env: {os.getenv('MOCK_AI')})")
+# Quota protection: MOCK_AI=true serves completions from services/mock_llm.py
+logger.info(f"MOCK_AI MODE: {llm.MOCK_AI} (from env: {os.getenv('MOCK_AI')})")
 
 # OpenRouter Configuration
-openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
-client = OpenAI(
-  base_url="https://openrouter.ai/api/v1",
-  api_key=openrouter_api_key,
-)
+# The shared client lives in services/llm.py. Models are picked per endpoint
+# tier by services/model_router.py; the standard tier is Llama 3.1 8B for rate
+# limit headroom (TPD/TPM), set LLM_MODEL to override.
 
+# Output schemas for the JSON endpoints (parsed/repaired by services/structured_output.py)
+SMARTBIZ_SCHEMA = Schema("smartbiz_agent", required=["reply"], fields={"extracted_info": dict, "comparison_data": list})
+RECOMMENDATIONS_SCHEMA = Schema("recommendations", required=["ideas"], fields={"ideas": list})
+BUDGET_SCHEMA = Schema("predict_budget", required=["predicted_budget", "budget_breakdown"], fields={"budget_breakdown": dict})
+RAW_MATERIALS_SCHEMA = Schema("identify_raw_materials", required=["raw_materials"], fields={"raw_materials": list})
+ADVERTISEMENTS_SCHEMA = Schema("generate_advertisements", required=["templates"], fields={"templates": list})
+SOCIAL_MEDIA_SCHEMA = Schema("analyze_social_media", required=["posting_patterns", "ai_suggestions"])
+BUSINESS_NAMES_SCHEMA = Schema("generate_business_names", required=["suggestions"], fields={"suggestions": list})
+AD_POSTS_SCHEMA = Schema("generate_ad_posts", root=list)
+SUCCESS_GUIDE_SCHEMA = Schema("generate_success_guide", required=[
+    "weekly_goals", "marketing_checklist", "cost_control_checklist", "growth_strategies", "export_readiness",
+])
 
-# We use Llama 3.1 8B for better rate limit headroom (TPD/TPM)
-MODEL_NAME = "meta-llama/llama-3.1-8b-instruct"
 
-# Supabase Configuration
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+def _refresh_requested(data: dict) -> bool:
+    """`"refresh": true` in the body or ?refresh=1: regenerate instead of serving the stored artifact."""
+    return bool(data.get("refresh")) or request.args.get("refresh", "").lower() in ("1", "true")
 
-# Configure logging
-import logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("backend_debug.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
 
-# Initialize Supabase client
-supabase_client: Client = None
-if SUPABASE_URL and SUPABASE_SERVICE_KEY:
-    try:
-        supabase_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-        logger.info("Supabase client initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize Supabase client: {e}")
-else:
-    logger.warning("Supabase credentials not found in environment")
+def _llm_unavailable(e: LLMUnavailableError):
+    """503 + Retry-After when the LLM limiter refused a call that has no fallback answer."""
+    response = jsonify({"error": "The AI service is busy right now. Please try again shortly.", "reason": e.reason})
+    response.headers["Retry-After"] = str(max(1, math.ceil(e.retry_after)))
+    return response, 503
+
 
 DATA_GOV_API_KEY = os.getenv("DATA_GOV_API_KEY")
 
@@ -108,9 +107,9 @@ def fetch_food_processing_msme():
     """
     
     # PRIORITY 1: Try Supabase database first
-    db_data = fetch_suppliers_from_db()
+    db_data = supabase_db.fetch_suppliers_from_db()
     if db_data:
-        print("DEBUG: Using supplier data from Supabase database")
+        logger.debug("Using supplier data from Supabase database")
         return db_data
     
     # PRIORITY 2: Try real government API if key is available
@@ -122,16 +121,17 @@ def fetch_food_processing_msme():
             "limit": 50
         }
         try:
-            r = requests.get(url, params=params, timeout=6)
+            with span("http", "data.gov.in"):
+                r = requests.get(url, params=params, timeout=6)
             r.raise_for_status()
-            print("DEBUG: Using supplier data from government API")
+            logger.debug("Using supplier data from government API")
             return r.json()
         except Exception as e:
-            print(f"DEBUG: Government API failed: {e}")
+            logger.debug(f"Government API failed: {e}")
             pass  # Fall through to dummy data
     
     # PRIORITY 3: Fall back to comprehensive dummy data
-    print("DEBUG: Using hardcoded dummy supplier data")
+    logger.debug("Using hardcoded dummy supplier data")
     return {
         "records": [
             # Food & Beverages Suppliers
@@ -539,7 +539,7 @@ Remember: You're not just collecting data - you're building their confidence and
 """
 
 # ===== MAIN ENDPOINT =====
-@app.route("/api/smartbiz-agent", methods=["POST"])
+@main_bp.route("/api/smartbiz-agent", methods=["POST"])
 def smartbiz_agent():
     data = request.json or {}
     user_message = data.get("message", "")
@@ -554,64 +554,7 @@ def smartbiz_agent():
     # Fetch real-time data for advisory steps that need it
     if current_step in ["RAW_MATERIALS", "SUPPLIER_GUIDANCE", "SELLING_GUIDE"]:
         real_time_data = fetch_food_processing_msme()
-        print(f"DEBUG: Fetched real_time_data for {current_step}")
-
-    if MOCK_AI:
-        # Simulated mentor response for testing UI/Flow
-        print("--- RUNNING IN MOCK MODE (NO API COST) ---")
-        mock_replies = {
-            "ASK_IDEA": "That sounds like a great starting point! Before we dive in, what's your approximate budget for this business?",
-            "ASK_BUDGET": "I see. Budgeting is crucial! Now, do you have a specific location or area in mind where you want to set things up?",
-            "ASK_LOCATION_PREFERENCE": "Excellent! Location can make or break a business. Please tell me the exact city or area you're thinking of.",
-            "ASK_CUSTOM_LOCATION": "Got it. Anand is a vibrant area! Should we proceed with this location or would you like to consider somewhere else?",
-            "GENERATE_RECOMMENDATIONS": "Based on what you've told me, I have some great business ideas for you. Would you like to see them?",
-            "SUPPLIER_GUIDANCE": "Great! I've found some officially registered suppliers from government data that might help you. These are verified MSME enterprises that could be potential suppliers or partners for your business.",
-        }
-        reply_text = mock_replies.get(current_step, f"I've noted that. Let's move to the next phase: {current_step}. Ready?")
-        
-        # Add mock comparison data for supplier-related steps
-        mock_comparison_data = []
-        mock_recommendations = []
-        
-        if current_step == "GENERATE_RECOMMENDATIONS":
-            mock_recommendations = [
-                {
-                    "id": "mock-1",
-                    "name": "Organic Cafe",
-                    "description": "A cozy cafe serving organic snacks and beverages.",
-                    "investmentRange": "₹4,00,000 - ₹6,00,000",
-                    "expectedRevenue": "₹80,000/month",
-                    "profitMargin": "20-30%",
-                    "riskLevel": "Medium",
-                    "breakEvenTime": "8-12 months",
-                    "icon": "☕"
-                }
-            ]
-
-        if current_step in ["RAW_MATERIALS", "SUPPLIER_GUIDANCE", "SELLING_GUIDE"]:
-            mock_comparison_data = [
-                {
-                    "name": "Devani Reverence India",
-                    "location": "GHAZIABAD, UTTAR PRADESH",
-                    "type": "Micro",
-                    "activity": "Manufacturing",
-                    "status": "Active",
-                    "price": "Approx ₹55/kg",
-                    "contact": "Dist: GHAZIABAD"
-                }
-            ]
-        
-        if user_message:
-            state["answers"][current_step] = user_message
-            # Simple mock increment
-            state["step_index"] = min(state["step_index"] + 1, len(STEP_FLOW) - 1)
-            
-        return jsonify({
-            "reply": reply_text, 
-            "state": state, 
-            "comparison_data": mock_comparison_data,
-            "recommendations": mock_recommendations
-        })
+        logger.debug(f"Fetched real_time_data for {current_step}")
 
     # Default fallback
     reply_text = "I'm having a little trouble connecting to my brain right now, but don't worry! Could you try again in a moment?"
@@ -637,22 +580,22 @@ REAL_TIME_DATA:
 """
 
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "system", "content": prompt}],
-            model=MODEL_NAME,
-            response_format={"type": "json_object"}
-        )
-        content = chat_completion.choices[0].message.content.strip()
-        
-        import json
-        import re
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        
         recommendations = []
-        
-        if json_match:
-            ai_data = json.loads(json_match.group(0))
-            print(f"DEBUG: AI Output JSON for {current_step}: {ai_data}")
+        try:
+            ai_data = llm.chat_json(
+                [{"role": "system", "content": prompt}],
+                SMARTBIZ_SCHEMA,
+                endpoint=SMARTBIZ_SCHEMA.name,
+                max_retries=0,  # a prose reply is still usable as reply text below
+                response_format={"type": "json_object"}
+            )
+            content = None
+        except StructuredOutputError as e:
+            ai_data = None
+            content = e.raw.strip()
+
+        if ai_data is not None:
+            logger.debug("AI Output JSON for %s: %s", current_step, ai_data)
             reply_text = ai_data.get("reply", "")
             extracted_info = ai_data.get("extracted_info", {})
             comparison_data = ai_data.get("comparison_data", [])
@@ -706,16 +649,16 @@ REAL_TIME_DATA:
                     break
         else:
             # Fallback if not JSON
-            reply_text = content
+            llm.record_fallback(SMARTBIZ_SCHEMA.name)
+            reply_text = content or reply_text
             if user_message:
                 state["answers"][current_step] = user_message
             state["step_index"] = min(state["step_index"] + 1, len(STEP_FLOW) - 1)
 
     except Exception as e:
-        import traceback
-        print(f"ERROR in smartbiz_agent: {str(e)}")
-        # Check if it was a rate limit error to provide better feedback
-        if "rate_limit" in str(e).lower():
+        logger.error(f"Error in smartbiz_agent: {e}")
+        # Rate limited by the provider, or refused by our limiter / open circuit
+        if llm_limiter.is_rate_limited(e):
             reply_text = "I've been talking a bit too much today and hit my daily limit! I need a short break. Please try again soon or switch to Mock Mode in settings."
         
     return jsonify({
@@ -774,7 +717,7 @@ def map_nic_to_category(nic_code_2_digit):
     
     return "Other"
 
-@app.route("/api/marketplace/gov-listings", methods=["GET"])
+@main_bp.route("/api/marketplace/gov-listings", methods=["GET"])
 def get_gov_listings():
     """
     Fetches verified MSME listings from government data and formats them
@@ -798,7 +741,6 @@ def get_gov_listings():
                 raw_nic = str(record.get("NIC5DigitCode", record.get("nic_5_digit_code", ""))).strip()
                 
                 # Extract code using Regex
-                import re
                 # Try to find a 5-digit code first (e.g., 77291 from "1) 77291")
                 match = re.search(r'\b(\d{5})\b', raw_nic)
                 if match:
@@ -812,7 +754,8 @@ def get_gov_listings():
                     else:
                          nic_2_digit = "00"
                 
-                print(f"DEBUG: Enterprise={record.get('EnterpriseName')} | RawNIC={raw_nic} | 2Digit={nic_2_digit} | Act={activity}")
+                # Once per record: lazy %-args so nothing is formatted unless DEBUG is on
+                logger.debug("Enterprise=%s | RawNIC=%s | 2Digit=%s | Act=%s", record.get('EnterpriseName'), raw_nic, nic_2_digit, activity)
                 
                 mapped_category = map_nic_to_category(nic_2_digit)
                 
@@ -859,11 +802,11 @@ def get_gov_listings():
                 
         return jsonify(listings)
     except Exception as e:
-        print(f"Error fetching gov listings: {e}")
+        logger.error(f"Error fetching gov listings: {e}")
         return jsonify([])
 
 # ===== RECOMMENDATIONS ENDPOINT (Workaround for Supabase Edge Function) =====
-@app.route("/api/recommendations", methods=["POST"])
+@main_bp.route("/api/recommendations", methods=["POST"])
 def generate_recommendations():
     """
     Generate business recommendations based on user profile.
@@ -879,10 +822,10 @@ def generate_recommendations():
         ideas = _generate_recommendations_logic(user_profile)
         return jsonify({"ideas": ideas})
         
+    except LLMUnavailableError as e:
+        return _llm_unavailable(e)
     except Exception as e:
-        print(f"ERROR in generate_recommendations: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in generate_recommendations: {e}")
         return jsonify({"error": str(e)}), 500
 
 def _generate_recommendations_logic(user_profile):
@@ -940,75 +883,24 @@ IMPORTANT:
 - Return ONLY valid JSON, no additional text"""
 
     # Call OpenRouter AI
-    chat_completion = client.chat.completions.create(
-        messages=[
+    data = llm.chat_json(
+        [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ],
-        model=MODEL_NAME,
+        RECOMMENDATIONS_SCHEMA,
+        endpoint=RECOMMENDATIONS_SCHEMA.name,
         response_format={"type": "json_object"}
     )
-    
-    content = chat_completion.choices[0].message.content.strip()
-    print(f"DEBUG: AI response for recommendations: {content}")
-    
-    # Parse the JSON from the response
-    import json
-    import re
-    json_match = re.search(r'\{[\s\S]*\}', content)
-    if not json_match:
-        raise ValueError("Failed to parse AI response as JSON")
-    
-    data = json.loads(json_match.group(0))
+    logger.debug("AI response for recommendations: %s", data)
     return data.get("ideas", [])
 
 # ===== NEW FEATURE ENDPOINTS =====
 
 # ===== BUDGET PREDICTION ENDPOINT =====
-@app.route("/api/predict-budget", methods=["POST"])
-def predict_budget():
-    """
-    Predicts required budget for a business idea using AI.
-    Returns budget breakdown and feasibility analysis.
-    """
-    data = request.json or {}
-    business_idea = data.get("idea", "")
-    user_budget = data.get("user_budget")
-    
-    if not business_idea:
-        return jsonify({"error": "Business idea is required"}), 400
-    
-    if MOCK_AI:
-        # Mock response for testing
-        predicted = 500000
-        return jsonify({
-            "predicted_budget": predicted,
-            "budget_breakdown": {
-                "infrastructure": 150000,
-                "equipment": 100000,
-                "inventory": 80000,
-                "marketing": 50000,
-                "licenses": 20000,
-                "working_capital": 100000
-            },
-            "feasibility": {
-                "status": "feasible" if user_budget and user_budget >= predicted else "challenging",
-                "gap": max(0, predicted - (user_budget or 0)),
-                "optimization_suggestions": [
-                    "Start with a smaller space to reduce infrastructure costs",
-                    "Buy used equipment initially to save 30-40%",
-                    "Use digital marketing instead of traditional advertising"
-                ],
-                "scaling_strategy": "Focus on organic growth in first 6 months, then expand with profits"
-            }
-        })
-    
-    try:
-        system_prompt = """You are a financial advisor specializing in Indian startup budgeting.
-Provide realistic budget estimates based on current market conditions in India.
-Consider all necessary expenses including infrastructure, equipment, inventory, licenses, marketing, and working capital."""
-
-        user_prompt = f"""Analyze this business idea and predict the required budget with detailed breakdown:
+BUDGET_PROMPT = prompts.register(
+    BUDGET_SCHEMA.name,
+    """Analyze this business idea and predict the required budget with detailed breakdown:
 
 Business Idea: {business_idea}
 
@@ -1028,127 +920,126 @@ Provide response in this JSON format:
   "location_factor": "<urban/suburban/rural>"
 }}
 
-Be realistic and consider Indian market conditions."""
+Be realistic and consider Indian market conditions.""",
+    system="""You are a financial advisor specializing in Indian startup budgeting.
+Provide realistic budget estimates based on current market conditions in India.
+Consider all necessary expenses including infrastructure, equipment, inventory, licenses, marketing, and working capital.""",
+)
 
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model=MODEL_NAME,
-            response_format={"type": "json_object"}
+
+@main_bp.route("/api/predict-budget", methods=["POST"])
+def predict_budget():
+    """
+    Predicts required budget for a business idea using AI.
+    Returns budget breakdown and feasibility analysis. The AI estimate is
+    stored per idea and reused; send "refresh": true to regenerate it.
+    """
+    data = request.json or {}
+    business_idea = data.get("idea", "")
+    user_budget = data.get("user_budget")
+    
+    if not business_idea:
+        return jsonify({"error": "Business idea is required"}), 400
+    
+    try:
+        system_prompt = BUDGET_PROMPT.system
+        user_prompt = BUDGET_PROMPT.render(business_idea=business_idea)
+
+        ai_data = artifact_store.get_or_generate(
+            "budget_prediction",
+            {"idea": business_idea},
+            lambda: llm.chat_json(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                BUDGET_SCHEMA,
+                endpoint=BUDGET_SCHEMA.name,
+                response_format={"type": "json_object"},
+                with_model=True,
+            ),
+            prompt_version=BUDGET_PROMPT.version,
+            models=model_router.answering_models(BUDGET_SCHEMA.name),
+            refresh=_refresh_requested(data),
         )
         
-        content = chat_completion.choices[0].message.content.strip()
-        import json, re
-        json_match = re.search(r'\{[\s\S]*\}', content)
-        
-        if json_match:
-            ai_data = json.loads(json_match.group(0))
-            predicted = ai_data.get("predicted_budget", 500000)
-            
-            # Calculate feasibility if user budget provided
-            feasibility = {}
-            if user_budget:
-                gap = predicted - user_budget
-                if gap <= 0:
-                    feasibility = {
-                        "status": "feasible",
-                        "gap": 0,
-                        "optimization_suggestions": [],
-                        "scaling_strategy": f"With ₹{user_budget - predicted:,.0f} extra budget, consider: Premium location, Better equipment, Larger inventory, Aggressive marketing campaign"
-                    }
-                elif gap <= predicted * 0.2:  # Within 20%
-                    feasibility = {
-                        "status": "feasible",
-                        "gap": gap,
-                        "optimization_suggestions": [
-                            "Negotiate better rates with suppliers",
-                            "Start with essential equipment only",
-                            "Use cost-effective marketing channels"
-                        ],
-                        "scaling_strategy": "Start lean and scale gradually with revenue"
-                    }
-                else:
-                    feasibility = {
-                        "status": "challenging",
-                        "gap": gap,
-                        "optimization_suggestions": [
-                            "Consider a smaller scale initially",
-                            "Look for used/refurbished equipment",
-                            "Partner with someone to share costs",
-                            "Explore government schemes and loans",
-                            "Start from home to save infrastructure costs"
-                        ],
-                        "scaling_strategy": "Build a phased approach - start minimal viable business and expand"
-                    }
-            
-            return jsonify({
-                "predicted_budget": predicted,
-                "budget_breakdown": ai_data.get("budget_breakdown", {}),
-                "business_type": ai_data.get("business_type", "General"),
-                "feasibility": feasibility
-            })
+        predicted = ai_data.get("predicted_budget", 500000)
+        
+        # Calculate feasibility if user budget provided
+        feasibility = {}
+        if user_budget:
+            gap = predicted - user_budget
+            if gap <= 0:
+                feasibility = {
+                    "status": "feasible",
+                    "gap": 0,
+                    "optimization_suggestions": [],
+                    "scaling_strategy": f"With ₹{user_budget - predicted:,.0f} extra budget, consider: Premium location, Better equipment, Larger inventory, Aggressive marketing campaign"
+                }
+            elif gap <= predicted * 0.2:  # Within 20%
+                feasibility = {
+                    "status": "feasible",
+                    "gap": gap,
+                    "optimization_suggestions": [
+                        "Negotiate better rates with suppliers",
+                        "Start with essential equipment only",
+                        "Use cost-effective marketing channels"
+                    ],
+                    "scaling_strategy": "Start lean and scale gradually with revenue"
+                }
+            else:
+                feasibility = {
+                    "status": "challenging",
+                    "gap": gap,
+                    "optimization_suggestions": [
+                        "Consider a smaller scale initially",
+                        "Look for used/refurbished equipment",
+                        "Partner with someone to share costs",
+                        "Explore government schemes and loans",
+                        "Start from home to save infrastructure costs"
+                    ],
+                    "scaling_strategy": "Build a phased approach - start minimal viable business and expand"
+                }
         
+        return jsonify({
+            "predicted_budget": predicted,
+            "budget_breakdown": ai_data.get("budget_breakdown", {}),
+            "business_type": ai_data.get("business_type", "General"),
+            "feasibility": feasibility
+        })
+
+    except StructuredOutputError as e:
+        logger.error(f"Unusable AI response in predict_budget: {e}")
         return jsonify({"error": "Failed to parse AI response"}), 500
-        
+    except LLMUnavailableError as e:
+        return _llm_unavailable(e)
     except Exception as e:
-        print(f"ERROR in predict_budget: {str(e)}")
+        logger.error(f"Error in predict_budget: {e}")
         return jsonify({"error": "Budget prediction failed"}), 500
 
 
 # ===== MARKET RESEARCH LINKS ENDPOINT =====
-@app.route("/api/market-research", methods=["POST"])
+@main_bp.route("/api/market-research", methods=["POST"])
 def get_market_research():
     """
     Returns categorized market research links based on business type and location.
-    Data comes from the database (seeded during migration).
+    Data comes from the market_research_links table via the in-memory index.
     """
     data = request.json or {}
     business_type = data.get("business_type", "All")
     location = data.get("location", "India")
     
-    # In a real implementation, this would query the Supabase database
-    # For now, return structured data that frontend can use
-    
-    return jsonify({
-        "links": [
-            {
-                "category": "government_schemes",
-                "items": [
-                    {"title": "MSME - Ministry of Micro, Small and Medium Enterprises", "url": "https://msme.gov.in/", "verified": True},
-                    {"title": "Startup India", "url": "https://www.startupindia.gov.in/", "verified": True},
-                    {"title": "DGFT - Directorate General of Foreign Trade", "url": "https://dgft.gov.in/", "verified": True},
-                    {"title": "GeM - Government e-Marketplace", "url": "https://gem.gov.in/", "verified": True},
-                    {"title": "Udyam Registration Portal", "url": "https://udyamregistration.gov.in/", "verified": True}
-                ]
-            },
-            {
-                "category": "market_trends",
-                "items": [
-                    {"title": "IBEF - India Brand Equity Foundation", "url": "https://www.ibef.org/", "verified": True},
-                    {"title": "NITI Aayog", "url": "https://www.niti.gov.in/", "verified": True}
-                ]
-            },
-            {
-                "category": "product_research",
-                "items": [
-                    {"title": "CSIR - Council of Scientific & Industrial Research", "url": "https://www.csir.res.in/", "verified": True}
-                ]
-            },
-            {
-                "category": "industry_reports",
-                "items": [
-                    {"title": "Ministry of Commerce & Industry", "url": "https://commerce.gov.in/", "verified": True},
-                    {"title": "RBI - Reserve Bank of India", "url": "https://www.rbi.org.in/", "verified": True}
-                ]
-            }
-        ]
-    })
+    try:
+        links = market_research_service.get_links(supabase_db.get_client(), business_type, location)
+    except Exception as e:
+        logger.error(f"Error in get_market_research: {e}")
+        links = market_research_service.FALLBACK_LINKS
+
+    return jsonify({"links": links})
 
 
 # ===== RAW MATERIALS IDENTIFICATION ENDPOINT =====
-@app.route("/api/identify-raw-materials", methods=["POST"])
+@main_bp.route("/api/identify-raw-materials", methods=["POST"])
 def identify_raw_materials():
     """
     Uses AI to identify required raw materials based on business type.
@@ -1161,20 +1052,6 @@ def identify_raw_materials():
     if not business_type:
         return jsonify({"error": "Business type is required"}), 400
     
-    if MOCK_AI:
-        return jsonify({
-            "raw_materials": [
-                {"name": "Flour", "specification": "Wheat flour, 50kg bags", "estimated_cost": "₹1,500-2,000 per bag"},
-                {"name": "Sugar", "specification": "Refined sugar, 25kg bags", "estimated_cost": "₹1,000-1,200 per bag"},
-                {"name": "Packaging Materials", "specification": "Food-grade boxes and bags", "estimated_cost": "₹5,000-10,000 monthly"}
-            ],
-            "supplier_platforms": [
-                {"name": "IndiaMART", "url": "https://www.indiamart.com/", "type": "B2B Marketplace"},
-                {"name": "TradeIndia", "url": "https://www.tradeindia.com/", "type": "B2B Marketplace"},
-                {"name": "MSME Suppliers", "url": "/marketplace", "type": "Government Verified"}
-            ]
-        })
-    
     try:
         system_prompt = """You are a supply chain expert for Indian businesses.
 Identify raw materials needed for the business and provide realistic cost estimates."""
@@ -1197,86 +1074,40 @@ Provide response in JSON format:
 
 List 5-8 essential raw materials with realistic Indian market prices."""
 
-        chat_completion = client.chat.completions.create(
-            messages=[
+        ai_data = llm.chat_json(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            model=MODEL_NAME,
+            RAW_MATERIALS_SCHEMA,
+            endpoint=RAW_MATERIALS_SCHEMA.name,
             response_format={"type": "json_object"}
         )
         
-        content = chat_completion.choices[0].message.content.strip()
-        import json, re
-        json_match = re.search(r'\{[\s\S]*\}', content)
-        
-        if json_match:
-            ai_data = json.loads(json_match.group(0))
-            return jsonify({
-                "raw_materials": ai_data.get("raw_materials", []),
-                "supplier_platforms": [
-                    {"name": "IndiaMART", "url": "https://www.indiamart.com/", "type": "B2B Marketplace"},
-                    {"name": "TradeIndia", "url": "https://www.tradeindia.com/", "type": "B2B Marketplace"},
-                    {"name": "Alibaba India", "url": "https://www.alibaba.com/", "type": "International B2B"},
-                    {"name": "MSME Suppliers", "url": "/marketplace", "type": "Government Verified"}
-                ]
-            })
-        
+        return jsonify({
+            "raw_materials": ai_data.get("raw_materials", []),
+            "supplier_platforms": [
+                {"name": "IndiaMART", "url": "https://www.indiamart.com/", "type": "B2B Marketplace"},
+                {"name": "TradeIndia", "url": "https://www.tradeindia.com/", "type": "B2B Marketplace"},
+                {"name": "Alibaba India", "url": "https://www.alibaba.com/", "type": "International B2B"},
+                {"name": "MSME Suppliers", "url": "/marketplace", "type": "Government Verified"}
+            ]
+        })
+
+    except StructuredOutputError as e:
+        logger.error(f"Unusable AI response in identify_raw_materials: {e}")
         return jsonify({"error": "Failed to parse AI response"}), 500
-        
+    except LLMUnavailableError as e:
+        return _llm_unavailable(e)
     except Exception as e:
-        print(f"ERROR in identify_raw_materials: {str(e)}")
+        logger.error(f"Error in identify_raw_materials: {e}")
         return jsonify({"error": "Raw material identification failed"}), 500
 
 
 # ===== ADVERTISEMENT GENERATION ENDPOINT =====
-@app.route("/api/generate-advertisements", methods=["POST"])
-def generate_advertisements():
-    """
-    Generates 2-3 advertisement templates with captions, hashtags, and posting strategy.
-    """
-    data = request.json or {}
-    business_type = data.get("business_type", "")
-    business_name = data.get("business_name", "")
-    details = data.get("details", "")
-    
-    if not business_type:
-        return jsonify({"error": "Business type is required"}), 400
-    
-    if MOCK_AI:
-        return jsonify({
-            "templates": [
-                {
-                    "id": "template-1",
-                    "design_concept": "Modern minimalist with product showcase",
-                    "caption": f"🎉 Introducing {business_name or 'Your Business'}! Quality products at affordable prices. Visit us today! 🛍️",
-                    "hashtags": ["#NewBusiness", "#LocalBusiness", "#SmallBusiness", "#ShopLocal", "#SupportLocal"],
-                    "target_audience": "Local community, age 25-45, interested in quality products",
-                    "posting_schedule": "Monday & Thursday, 10:00 AM - 11:00 AM",
-                    "platform": "Instagram & Facebook"
-                },
-                {
-                    "id": "template-2",
-                    "design_concept": "Vibrant colors with customer testimonials",
-                    "caption": "💯 Join hundreds of happy customers! Limited time offer - 20% off on first purchase! 🎁",
-                    "hashtags": ["#SpecialOffer", "#Discount", "#QualityProducts", "#CustomerFirst"],
-                    "target_audience": "Deal seekers, age 20-50, value-conscious shoppers",
-                    "posting_schedule": "Wednesday & Saturday, 6:00 PM - 7:00 PM",
-                    "platform": "Instagram Stories & Posts"
-                }
-            ],
-            "posting_strategy": {
-                "frequency": "3-4 posts per week",
-                "best_times": ["10:00 AM", "6:00 PM", "8:00 PM"],
-                "content_mix": "60% product showcase, 30% customer stories, 10% behind-the-scenes"
-            }
-        })
-    
-    try:
-        system_prompt = """You are a social media marketing expert specializing in small business advertising in India.
-Create engaging, culturally relevant ad content that resonates with Indian audiences."""
-
-        user_prompt = f"""Create 2-3 advertisement templates for this business:
+ADVERTISEMENTS_PROMPT = prompts.register(
+    ADVERTISEMENTS_SCHEMA.name,
+    """Create 2-3 advertisement templates for this business:
 
 Business Type: {business_type}
 Business Name: {business_name}
@@ -1302,34 +1133,62 @@ Provide response in JSON format:
   }}
 }}
 
-Make captions engaging, use relevant emojis, and include Indian market context."""
+Make captions engaging, use relevant emojis, and include Indian market context.""",
+    system="""You are a social media marketing expert specializing in small business advertising in India.
+Create engaging, culturally relevant ad content that resonates with Indian audiences.""",
+)
+
 
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model=MODEL_NAME,
-            response_format={"type": "json_object"}
+@main_bp.route("/api/generate-advertisements", methods=["POST"])
+def generate_advertisements():
+    """
+    Generates 2-3 advertisement templates with captions, hashtags, and posting strategy.
+    Stored per business and reused; send "refresh": true to regenerate.
+    """
+    data = request.json or {}
+    business_type = data.get("business_type", "")
+    business_name = data.get("business_name", "")
+    details = data.get("details", "")
+    
+    if not business_type:
+        return jsonify({"error": "Business type is required"}), 400
+    
+    try:
+        system_prompt = ADVERTISEMENTS_PROMPT.system
+        user_prompt = ADVERTISEMENTS_PROMPT.render(business_type=business_type, business_name=business_name, details=details)
+
+        ai_data = artifact_store.get_or_generate(
+            "advertisement_templates",
+            {"business_type": business_type, "business_name": business_name, "details": details},
+            lambda: llm.chat_json(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                ADVERTISEMENTS_SCHEMA,
+                endpoint=ADVERTISEMENTS_SCHEMA.name,
+                response_format={"type": "json_object"},
+                with_model=True,
+            ),
+            prompt_version=ADVERTISEMENTS_PROMPT.version,
+            models=model_router.answering_models(ADVERTISEMENTS_SCHEMA.name),
+            refresh=_refresh_requested(data),
         )
         
-        content = chat_completion.choices[0].message.content.strip()
-        import json, re
-        json_match = re.search(r'\{[\s\S]*\}', content)
-        
-        if json_match:
-            ai_data = json.loads(json_match.group(0))
-            return jsonify(ai_data)
-        
+        return jsonify(ai_data)
+
+    except StructuredOutputError as e:
+        logger.error(f"Unusable AI response in generate_advertisements: {e}")
         return jsonify({"error": "Failed to parse AI response"}), 500
-        
+    except LLMUnavailableError as e:
+        return _llm_unavailable(e)
     except Exception as e:
-        print(f"ERROR in generate_advertisements: {str(e)}")
+        logger.error(f"Error in generate_advertisements: {e}")
         return jsonify({"error": "Advertisement generation failed"}), 500
 
 
 # ===== SOCIAL MEDIA ANALYTICS ENDPOINT =====
-@app.route("/api/analyze-social-media", methods=["POST"])
+@main_bp.route("/api/analyze-social-media", methods=["POST"])
 def analyze_social_media():
     """
     Analyzes social media account and provides AI-powered marketing suggestions.
@@ -1345,47 +1204,6 @@ def analyze_social_media():
     # Note: Real implementation would use social media APIs
     # For now, provide AI-generated suggestions based on business type
     
-    if MOCK_AI:
-        return jsonify({
-            "posting_patterns": {
-                "recommended_frequency": "4-5 posts per week",
-                "best_times": ["10:00 AM", "2:00 PM", "7:00 PM"],
-                "engagement_peak": "Evenings 6-9 PM",
-                "top_content_types": ["Reels", "Carousel Posts", "Stories"]
-            },
-            "ai_suggestions": {
-                "content_ideas": [
-                    "Behind-the-scenes of your business operations",
-                    "Customer testimonials and success stories",
-                    "Product demonstrations and tutorials",
-                    "Industry tips and educational content",
-                    "Special offers and promotions"
-                ],
-                "hashtag_strategy": [
-                    "Use 10-15 hashtags per post",
-                    "Mix of popular and niche hashtags",
-                    "Create a branded hashtag",
-                    "Research competitor hashtags"
-                ],
-                "growth_tips": [
-                    "Post consistently at optimal times",
-                    "Engage with followers within 1 hour of posting",
-                    "Collaborate with micro-influencers in your niche",
-                    "Use Instagram Reels for maximum reach",
-                    "Run targeted ads for local audience"
-                ]
-            },
-            "weekly_strategy": {
-                "monday": {"content": "Motivational post or week preview", "type": "Post", "time": "10:00 AM"},
-                "tuesday": {"content": "Product showcase or tutorial", "type": "Reel", "time": "2:00 PM"},
-                "wednesday": {"content": "Customer testimonial", "type": "Carousel", "time": "7:00 PM"},
-                "thursday": {"content": "Behind-the-scenes", "type": "Story", "time": "6:00 PM"},
-                "friday": {"content": "Weekend offer or promotion", "type": "Post", "time": "5:00 PM"},
-                "saturday": {"content": "Engaging question or poll", "type": "Story", "time": "11:00 AM"},
-                "sunday": {"content": "Week recap or community highlight", "type": "Carousel", "time": "8:00 PM"}
-            }
-        })
-    
     try:
         system_prompt = """You are a social media growth strategist specializing in Indian small businesses.
 Provide actionable, data-driven marketing strategies tailored to the Indian market."""
@@ -1418,32 +1236,30 @@ Provide response in JSON format:
 
 Focus on practical, achievable strategies for small businesses in India."""
 
-        chat_completion = client.chat.completions.create(
-            messages=[
+        ai_data = llm.chat_json(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            model=MODEL_NAME,
+            SOCIAL_MEDIA_SCHEMA,
+            endpoint=SOCIAL_MEDIA_SCHEMA.name,
             response_format={"type": "json_object"}
         )
         
-        content = chat_completion.choices[0].message.content.strip()
-        import json, re
-        json_match = re.search(r'\{[\s\S]*\}', content)
-        
-        if json_match:
-            ai_data = json.loads(json_match.group(0))
-            return jsonify(ai_data)
-        
+        return jsonify(ai_data)
+
+    except StructuredOutputError as e:
+        logger.error(f"Unusable AI response in analyze_social_media: {e}")
         return jsonify({"error": "Failed to parse AI response"}), 500
-        
+    except LLMUnavailableError as e:
+        return _llm_unavailable(e)
     except Exception as e:
-        print(f"ERROR in analyze_social_media: {str(e)}")
+        logger.error(f"Error in analyze_social_media: {e}")
         return jsonify({"error": "Social media analysis failed"}), 500
 
 
 # ===== BUSINESS NAME GENERATION ENDPOINT =====
-@app.route("/api/generate-business-names", methods=["POST"])
+@main_bp.route("/api/generate-business-names", methods=["POST"])
 def generate_business_names():
     """
     Generates creative business name suggestions based on business idea and industry.
@@ -1456,42 +1272,6 @@ def generate_business_names():
     if not business_idea and not industry:
         return jsonify({"error": "Business idea or industry is required"}), 400
     
-    if MOCK_AI:
-        return jsonify({
-            "suggestions": [
-                {
-                    "name": "FreshBite Kitchen",
-                    "category": "Professional",
-                    "tagline": "Healthy meals delivered fresh to your door",
-                    "domain_available": True
-                },
-                {
-                    "name": "NutriNest",
-                    "category": "Creative",
-                    "tagline": "Your nest for nutritious living",
-                    "domain_available": False
-                },
-                {
-                    "name": "FlavorHub",
-                    "category": "Trendy",
-                    "tagline": "Where flavors meet convenience",
-                    "domain_available": True
-                },
-                {
-                    "name": "The Wellness Table",
-                    "category": "Premium",
-                    "tagline": "Elevated dining for health-conscious professionals",
-                    "domain_available": True
-                },
-                {
-                    "name": "GreenPlate Co.",
-                    "category": "Professional",
-                    "tagline": "Sustainable meals for modern lifestyles",
-                    "domain_available": False
-                }
-            ]
-        })
-    
     try:
         system_prompt = """You are a creative branding expert specializing in Indian business naming.
 Create memorable, unique business names that resonate with the target market.
@@ -1521,32 +1301,30 @@ Requirements:
 - Consider Indian market context
 - Avoid generic or overused names"""
 
-        chat_completion = client.chat.completions.create(
-            messages=[
+        ai_data = llm.chat_json(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            model=MODEL_NAME,
+            BUSINESS_NAMES_SCHEMA,
+            endpoint=BUSINESS_NAMES_SCHEMA.name,
             response_format={"type": "json_object"}
         )
         
-        content = chat_completion.choices[0].message.content.strip()
-        import json, re
-        json_match = re.search(r'\{[\s\S]*\}', content)
-        
-        if json_match:
-            ai_data = json.loads(json_match.group(0))
-            return jsonify(ai_data)
-        
+        return jsonify(ai_data)
+
+    except StructuredOutputError as e:
+        logger.error(f"Unusable AI response in generate_business_names: {e}")
         return jsonify({"error": "Failed to parse AI response"}), 500
-        
+    except LLMUnavailableError as e:
+        return _llm_unavailable(e)
     except Exception as e:
-        print(f"ERROR in generate_business_names: {str(e)}")
+        logger.error(f"Error in generate_business_names: {e}")
         return jsonify({"error": "Business name generation failed"}), 500
 
 
 # ===== CHAT TITLE GENERATION ENDPOINT =====
-@app.route("/api/generate-chat-title", methods=["POST"])
+@main_bp.route("/api/generate-chat-title", methods=["POST"])
 def generate_chat_title():
     """
     Generates a contextual chat title based on first few messages.
@@ -1557,9 +1335,6 @@ def generate_chat_title():
     if not messages:
         return jsonify({"title": "New Conversation"})
     
-    if MOCK_AI:
-        return jsonify({"title": "Business Startup Planning"})
-    
     try:
         system_prompt = """You are a chat title generator. Create short, descriptive titles (3-6 words) for business conversations."""
 
@@ -1573,29 +1348,149 @@ Return ONLY the title, nothing else. Examples:
 - "Clothing Brand Marketing Plan"
 """
 
-        chat_completion = client.chat.completions.create(
-            messages=[
+        title = llm.chat(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            model=MODEL_NAME
+            endpoint="generate_chat_title"
         )
-        
-        title = chat_completion.choices[0].message.content.strip()
         # Remove quotes if present
         title = title.strip('"').strip("'")
         
         return jsonify({"title": title})
         
     except Exception as e:
-        print(f"ERROR in generate_chat_title: {str(e)}")
+        logger.error(f"Error in generate_chat_title: {e}")
+        llm.record_fallback("generate_chat_title")
         return jsonify({"title": "New Conversation"})
 
 
+# ===== METRICS =====
+@main_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """
+    LLM token, latency, cache and fallback metrics in Prometheus text format.
+    Requires ADMIN_TOKEN as X-Admin-Token or a bearer token.
+    """
+    if not request_timing.is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+# ===== READINESS =====
+@main_bp.route("/api/ready", methods=["GET"])
+def readiness_check():
+    """
+    200 once the shared clients are created and the database has answered a
+    probe (indexes are reported but do not block), 503 while warming.
+    Failed dependencies are retried from here; "database" is the live probe.
+    """
+    readiness.warm_up()
+    report = readiness.status()
+    report["database"] = supabase_db.health()
+    return jsonify(report), (200 if report["ready"] else 503)
+
+
+# ===== ADMIN: SLOW REQUESTS =====
+@main_bp.route("/api/admin/slow-requests", methods=["GET"])
+def get_slow_requests():
+    """
+    Recent requests slower than SLOW_REQUEST_SECONDS with their span breakdown.
+    Requires the X-Admin-Token header to match ADMIN_TOKEN.
+    """
+    if not request_timing.is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    limit = min(request.args.get("limit", 50, type=int), request_timing.SLOW_REQUEST_BUFFER)
+    return jsonify({
+        "threshold_seconds": request_timing.SLOW_REQUEST_SECONDS,
+        "requests": request_timing.slow_requests(limit, request.args.get("route")),
+    })
+
+
+# ===== ADMIN: PROFILING =====
+@main_bp.route("/api/admin/profile", methods=["GET", "DELETE"])
+def get_profiles():
+    """
+    Aggregated profiles of opted-in requests.
+    GET  ?route=<rule>&mode=sample&format=folded  -> folded stacks (flamegraph.pl / speedscope)
+    GET  ?route=<rule>&mode=cprofile&limit=50     -> top functions by cumulative time
+    GET  (no route)                               -> what has been profiled so far
+    DELETE                                        -> clear collected profiles
+    """
+    if not request_timing.is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    if request.method == "DELETE":
+        profiling.reset()
+        return jsonify({"success": True})
+
+    route = request.args.get("route")
+    mode = request.args.get("mode", "sample")
+    if mode == "sample" and (route or request.args.get("format") == "folded"):
+        return Response(profiling.folded(route), mimetype="text/plain")
+    if mode == "cprofile" and route:
+        return jsonify({
+            "route": route,
+            "functions": profiling.cprofile_top(route, request.args.get("limit", 50, type=int), request.args.get("sort", "cumulative")),
+        })
+    return jsonify({"profiles": profiling.summary()})
+
+
+# ===== LLM OUTPUT STATS =====
+@main_bp.route("/api/llm-stats", methods=["GET"])
+def get_llm_stats():
+    """
+    Per-endpoint structured output counters: clean / fenced / repaired /
+    retried / failed replies and the resulting rates, plus the LLM
+    limiter's current concurrency limit, queue depth and circuit state, the
+    model routing table with per-model latency and success rate, and the
+    version hash of every registered prompt.
+    Requires the X-Admin-Token header to match ADMIN_TOKEN.
+    """
+    if not request_timing.is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({
+        "endpoints": structured_output.get_stats(),
+        "limiter": llm_limiter.snapshot(),
+        "routing": model_router.snapshot(),
+        "prompts": prompts.snapshot(),
+    })
+
+
 # ===== NEW FEATURES ENDPOINTS =====
 
+def _fallback_ad_posts(business_name, business_type):
+    """Static ad posts served when the AI reply is unusable or the LLM is unavailable."""
+    return [
+        {
+            "type": "Promotional Launch",
+            "headline": f"Introducing {business_name}!",
+            "caption": f"Discover the best {business_type} experience. Quality meets affordability.",
+            "cta": "Visit us today!",
+            "hashtags": "#NewBusiness #Quality #StartupIndia",
+            "suggested_time": "9:00 AM - 11:00 AM"
+        },
+        {
+            "type": "Problem-Solution",
+            "headline": f"Need {business_type}? We've Got You!",
+            "caption": f"{business_name} offers reliable solutions tailored to your needs.",
+            "cta": "Contact us now!",
+            "hashtags": "#Solutions #Reliable #CustomerFirst",
+            "suggested_time": "6:00 PM - 8:00 PM"
+        },
+        {
+            "type": "Trust Building",
+            "headline": f"Why {business_name}?",
+            "caption": "✔ Quality Assured\\n✔ Best Prices\\n✔ Happy Customers",
+            "cta": "Follow for updates!",
+            "hashtags": "#Trusted #QualityFirst #Excellence",
+            "suggested_time": "12:00 PM - 2:00 PM"
+        }
+    ]
+
+
 # 1. GENERATE AD POSTS ENDPOINT
-@app.route("/api/generate-ad-posts", methods=["POST"])
+@main_bp.route("/api/generate-ad-posts", methods=["POST"])
 def generate_ad_posts():
     """
     Generates 2-3 AI-powered social media ad posts for marketing.
@@ -1606,36 +1501,6 @@ def generate_ad_posts():
     target_audience = data.get("target_audience", "General Public")
     tone = data.get("tone", "Professional")
     
-    if MOCK_AI:
-        return jsonify({
-            "ads": [
-                {
-                    "type": "Promotional Launch",
-                    "headline": f"Grand Opening of {business_name}!",
-                    "caption": f"We are excited to bring you the best {business_type} in town. Quality. Trust. Excellence.",
-                    "cta": "Visit us today!",
-                    "hashtags": "#NewBusiness #StartupIndia #Quality",
-                    "suggested_time": "9:00 AM - 11:00 AM (Peak engagement)"
-                },
-                {
-                    "type": "Problem-Solution",
-                    "headline": f"Looking for reliable {business_type}?",
-                    "caption": f"At {business_name}, we provide affordable and quality solutions tailored for you.",
-                    "cta": "DM us now!",
-                    "hashtags": "#Solutions #Affordable #TrustUs",
-                    "suggested_time": "6:00 PM - 8:00 PM (Evening engagement)"
-                },
-                {
-                    "type": "Trust Building",
-                    "headline": f"Why Choose {business_name}?",
-                    "caption": "✔ High Quality\n✔ Affordable Pricing\n✔ Fast Delivery\n✔ Customer Satisfaction Guaranteed",
-                    "cta": "Follow us for updates!",
-                    "hashtags": "#TrustWorthy #QualityFirst #CustomerFirst",
-                    "suggested_time": "12:00 PM - 2:00 PM (Lunch break)"
-                }
-            ]
-        })
-    
     try:
         system_prompt = """You are a social media marketing expert. Create engaging, professional ad posts for small businesses in India.
 Return ONLY a valid JSON array, no markdown formatting."""
@@ -1662,177 +1527,116 @@ For each ad, provide:
 Return ONLY valid JSON array of ads in this exact format:
 [{{"type": "...", "headline": "...", "caption": "...", "cta": "...", "hashtags": "...", "suggested_time": "..."}}]"""
 
-        chat_completion = client.chat.completions.create(
-            messages=[
+        # Code fences, stray prose and {"ads": [...]} wrappers are handled by the schema
+        ads = llm.chat_json(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            model=MODEL_NAME
+            AD_POSTS_SCHEMA,
+            endpoint=AD_POSTS_SCHEMA.name
         )
         
-        content = chat_completion.choices[0].message.content
-        print(f"DEBUG: AI Response for ads: {content[:200]}...")
-        
-        # Clean up the response - remove markdown code blocks if present
-        content = content.strip()
-        if content.startswith("```json"):
-            content = content[7:]
-        elif content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        # Parse JSON
-        ads = json.loads(content)
-        
-        # Ensure it's a list
-        if not isinstance(ads, list):
-            ads = [ads]
-        
         return jsonify({"ads": ads})
         
-    except json.JSONDecodeError as e:
-        print(f"JSON ERROR in generate_ad_posts: {str(e)}")
-        print(f"Content was: {content}")
-        # Return fallback ads
-        return jsonify({
-            "ads": [
-                {
-                    "type": "Promotional Launch",
-                    "headline": f"Introducing {business_name}!",
-                    "caption": f"Discover the best {business_type} experience. Quality meets affordability.",
-                    "cta": "Visit us today!",
-                    "hashtags": "#NewBusiness #Quality #StartupIndia",
-                    "suggested_time": "9:00 AM - 11:00 AM"
-                },
-                {
-                    "type": "Problem-Solution",
-                    "headline": f"Need {business_type}? We've Got You!",
-                    "caption": f"{business_name} offers reliable solutions tailored to your needs.",
-                    "cta": "Contact us now!",
-                    "hashtags": "#Solutions #Reliable #CustomerFirst",
-                    "suggested_time": "6:00 PM - 8:00 PM"
-                },
-                {
-                    "type": "Trust Building",
-                    "headline": f"Why {business_name}?",
-                    "caption": "✔ Quality Assured\\n✔ Best Prices\\n✔ Happy Customers",
-                    "cta": "Follow for updates!",
-                    "hashtags": "#Trusted #QualityFirst #Excellence",
-                    "suggested_time": "12:00 PM - 2:00 PM"
-                }
-            ]
-        })
+    except StructuredOutputError as e:
+        logger.error(f"Unusable AI response in generate_ad_posts: {e}")
+        logger.debug(f"Content was: {e.raw[:200]}")
+        llm.record_fallback(AD_POSTS_SCHEMA.name)
+        return jsonify({"ads": _fallback_ad_posts(business_name, business_type)})
+    except LLMUnavailableError:
+        llm.record_fallback(AD_POSTS_SCHEMA.name)
+        return jsonify({"ads": _fallback_ad_posts(business_name, business_type)})
     except Exception as e:
-        print(f"ERROR in generate_ad_posts: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in generate_ad_posts: {e}")
         return jsonify({"error": f"Failed to generate ad posts: {str(e)}"}), 500
 
 
 
 # 2. AWARD POINTS ENDPOINT
-@app.route("/api/award-points", methods=["POST"])
+def _points_written(events: list):
+    """Points buffer hook: the awards are in user_points now."""
+    leaderboard_service.record_written(events)
+    for user_id in {event["user_id"] for event in events}:
+        progress_service.invalidate(user_id)
+
+
+@main_bp.route("/api/award-points", methods=["POST"])
 def award_points_endpoint():
     """
     Awards points to a user for completing activities.
+    The award is queued in the write-behind buffer and flushed in batches,
+    so the response does not wait on the database. Clients may send an
+    event_id to make retries idempotent.
     """
     data = request.json or {}
     user_id = data.get("user_id")
     activity_type = data.get("activity_type")
     points = data.get("points", 0)
     description = data.get("description", "")
+    event_id = data.get("event_id")
     
     if not user_id or not activity_type:
         return jsonify({"error": "Missing required fields"}), 400
+    # The award is only written after the 202, so reject what the database never would accept
+    try:
+        uuid.UUID(str(user_id))
+    except ValueError:
+        return jsonify({"error": "user_id must be a UUID"}), 400
+    try:
+        points = int(points)
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"error": "points must be an integer"}), 400
     
     try:
-        # Call the database function to award points
-        supabase_client.rpc("award_points", {
-            "p_user_id": user_id,
-            "p_activity_type": activity_type,
-            "p_points": points,
-            "p_description": description
-        }).execute()
+        queued_id = points_buffer.get_buffer(
+            supabase_db.get_client(),
+            on_flushed=_points_written,
+            on_dead_lettered=leaderboard_service.record_dead_lettered,
+        ).submit(user_id, activity_type, points, description, event_id=event_id)
+        if queued_id is None:
+            return jsonify({"success": True, "points_awarded": 0, "duplicate": True, "event_id": event_id})
+
+        leaderboard_service.record_award(queued_id, user_id, points)
         
-        return jsonify({"success": True, "points_awarded": points})
+        return jsonify({"success": True, "points_awarded": points, "queued": True, "event_id": queued_id}), 202
         
     except Exception as e:
-        print(f"ERROR in award_points: {str(e)}")
+        logger.error(f"Error in award_points: {e}")
         return jsonify({"error": "Failed to award points"}), 500
 
 
 # 3. GET LEADERBOARD ENDPOINT
-@app.route("/api/get-leaderboard", methods=["GET"])
+@main_bp.route("/api/get-leaderboard", methods=["GET"])
 def get_leaderboard():
     """
     Returns the top users by points for the leaderboard.
+    Served from the in-memory snapshot; pass user_id (and optionally
+    neighbours=N) to also get that user's rank and the users around them.
     """
     try:
         limit = request.args.get("limit", 50, type=int)
+        user_id = request.args.get("user_id")
         
-        response = supabase_client.table("user_points") \
-            .select("*, user_profiles(full_name, business_name, industry)") \
-            .order("total_points", desc=True) \
-            .limit(limit) \
-            .execute()
+        result = {"leaderboard": leaderboard_service.get_top(supabase_db.get_client(), limit)}
+
+        if user_id:
+            radius = request.args.get("neighbours", 3, type=int)
+            me, neighbours = leaderboard_service.get_neighbours(supabase_db.get_client(), user_id, radius)
+            result["me"] = me
+            result["neighbours"] = neighbours
         
-        return jsonify({"leaderboard": response.data})
+        return jsonify(result)
         
     except Exception as e:
-        print(f"ERROR in get_leaderboard: {str(e)}")
+        logger.error(f"Error in get_leaderboard: {e}")
         return jsonify({"error": "Failed to fetch leaderboard"}), 500
 
 
 # 4. GENERATE SUCCESS GUIDE ENDPOINT
-@app.route("/api/generate-success-guide", methods=["POST"])
-def generate_success_guide():
-    """
-    Generates a personalized success guide based on business type.
-    """
-    data = request.json or {}
-    business_type = data.get("business_type", "General")
-    business_stage = data.get("business_stage", "Idea")
-    
-    if MOCK_AI:
-        return jsonify({
-            "weekly_goals": [
-                "Set up social media profiles",
-                "Create first marketing post",
-                "Research 3 competitors",
-                "Define target customer"
-            ],
-            "marketing_checklist": [
-                "Create Google My Business listing",
-                "Set up WhatsApp Business",
-                "Design basic logo",
-                "Prepare launch announcement"
-            ],
-            "cost_control_checklist": [
-                "Track all expenses daily",
-                "Set monthly budget limits",
-                "Negotiate with suppliers",
-                "Avoid unnecessary purchases"
-            ],
-            "growth_strategies": [
-                "Focus on customer retention",
-                "Collect customer feedback",
-                "Offer referral incentives",
-                "Expand product/service range gradually"
-            ],
-            "export_readiness": [
-                "Research export regulations",
-                "Identify potential markets",
-                "Get export licenses",
-                "Find logistics partners"
-            ]
-        })
-    
-    try:
-        system_prompt = """You are a business mentor for Indian startups. Create practical, actionable success guides."""
-        
-        user_prompt = f"""Create a personalized success guide for:
+SUCCESS_GUIDE_PROMPT = prompts.register(
+    SUCCESS_GUIDE_SCHEMA.name,
+    """Create a personalized success guide for:
 Business Type: {business_type}
 Stage: {business_stage}
 
@@ -1844,31 +1648,61 @@ Provide specific, actionable items for:
 5. export_readiness (4-5 items)
 
 Make it specific to {business_type} businesses in India.
-Return ONLY valid JSON."""
+Return ONLY valid JSON.""",
+    system="""You are a business mentor for Indian startups. Create practical, actionable success guides.""",
+)
 
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model=MODEL_NAME
+
+@main_bp.route("/api/generate-success-guide", methods=["POST"])
+def generate_success_guide():
+    """
+    Generates a personalized success guide based on business type.
+    Stored per business type and stage and reused; send "refresh": true to regenerate.
+    """
+    data = request.json or {}
+    business_type = data.get("business_type", "General")
+    business_stage = data.get("business_stage", "Idea")
+    
+    try:
+        system_prompt = SUCCESS_GUIDE_PROMPT.system
+        user_prompt = SUCCESS_GUIDE_PROMPT.render(business_type=business_type, business_stage=business_stage)
+
+        guide = artifact_store.get_or_generate(
+            "success_guide",
+            {"business_type": business_type, "business_stage": business_stage},
+            lambda: llm.chat_json(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                SUCCESS_GUIDE_SCHEMA,
+                endpoint=SUCCESS_GUIDE_SCHEMA.name,
+                with_model=True,
+            ),
+            prompt_version=SUCCESS_GUIDE_PROMPT.version,
+            models=model_router.answering_models(SUCCESS_GUIDE_SCHEMA.name),
+            refresh=_refresh_requested(data),
         )
         
-        content = chat_completion.choices[0].message.content
-        guide = json.loads(content)
-        
         return jsonify(guide)
         
+    except StructuredOutputError as e:
+        logger.error(f"Unusable AI response in generate_success_guide: {e}")
+        return jsonify({"error": "Failed to parse AI response"}), 500
+    except LLMUnavailableError as e:
+        return _llm_unavailable(e)
     except Exception as e:
-        print(f"ERROR in generate_success_guide: {str(e)}")
+        logger.error(f"Error in generate_success_guide: {e}")
         return jsonify({"error": "Failed to generate success guide"}), 500
 
 
 # 6. GET USER PROGRESS ENDPOINT
-@app.route("/api/get-user-progress", methods=["GET"])
+@main_bp.route("/api/get-user-progress", methods=["GET"])
 def get_user_progress():
     """
     Returns user progress metrics.
+    Served from the per-user cache with an ETag; clients sending a matching
+    If-None-Match get an empty 304.
     """
     user_id = request.args.get("user_id")
     
@@ -1876,24 +1710,78 @@ def get_user_progress():
         return jsonify({"error": "Missing user_id"}), 400
     
     try:
-        response = supabase_client.table("user_progress") \
-            .select("*") \
-            .eq("user_id", user_id) \
-            .single() \
-            .execute()
-        
-        return jsonify({"progress": response.data})
+        progress, etag = progress_service.get_progress(supabase_db.get_client(), user_id)
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = jsonify({"progress": progress})
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
         
     except Exception as e:
-        print(f"ERROR in get_user_progress: {str(e)}")
+        logger.error(f"Error in get_user_progress: {e}")
         return jsonify({"error": "Failed to fetch progress"}), 500
 
 
+# Seconds between SSE keep-alives, and how long one stream stays open
+# before the browser's EventSource reconnects
+PROGRESS_STREAM_HEARTBEAT = 25
+PROGRESS_STREAM_MAX_SECONDS = 300
+
+
+@main_bp.route("/api/user-progress/stream", methods=["GET"])
+def stream_user_progress():
+    """
+    Server-Sent Events stream of user progress.
+    Sends the current progress immediately, then again whenever it changes,
+    replacing interval polling on the dashboard. Changes made through this
+    worker are pushed at once; others (direct frontend writes, other workers)
+    within progress_service.PROGRESS_TTL_SECONDS, by the one shared refresh
+    progress_service.watch() runs per user. The stream itself only waits.
+    """
+    user_id = request.args.get("user_id")
+
+    if not user_id:
+        return jsonify({"error": "Missing user_id"}), 400
+
+    def generate():
+        deadline = time.time() + PROGRESS_STREAM_MAX_SECONDS
+        with progress_service.watch(user_id, supabase_db.get_client):
+            seen_version = progress_service.version(user_id)
+            last_etag = None
+            while time.time() < deadline:
+                try:
+                    progress, etag = progress_service.get_progress(supabase_db.get_client(), user_id)
+                except Exception as e:
+                    logger.error(f"Error in stream_user_progress: {e}")
+                    yield "event: error\ndata: {}\n\n"
+                    return
+                if etag != last_etag:
+                    last_etag = etag
+                    yield f"id: {etag}\nevent: progress\ndata: {json.dumps({'progress': progress}, default=str)}\n\n"
+                # Only a version bump means new data; keep the connection alive meanwhile
+                while time.time() < deadline:
+                    current = progress_service.wait_for_change(
+                        user_id, seen_version, min(PROGRESS_STREAM_HEARTBEAT, max(0.0, deadline - time.time())))
+                    if current != seen_version:
+                        seen_version = current
+                        break
+                    yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ===== AD PERSISTENCE ENDPOINTS =====
 
 # 7. SAVE PLAN ADS ENDPOINT
 # 7. SAVE PLAN ADS ENDPOINT
-@app.route("/api/save-plan-ads", methods=["POST"])
+@main_bp.route("/api/save-plan-ads", methods=["POST"])
 def save_plan_ads():
     """
     Save generated ads for a specific business plan.
@@ -1902,7 +1790,7 @@ def save_plan_ads():
     logger.info("=== SAVE PLAN ADS ENDPOINT CALLED ===")
     
     # Check if Supabase client is available
-    if not supabase_client:
+    if not supabase_db.get_client():
         logger.error("Supabase client not initialized")
         return jsonify({"error": "Database connection not available"}), 500
     
@@ -1959,26 +1847,28 @@ def save_plan_ads():
                             logger.info(f"Uploading image for ad {i} to {file_path}")
                             
                             # Upload to Supabase Storage
-                            # Initialize storage client if separate, or use supabase_client.storage
+                            # Initialize storage client if separate, or use the client's .storage
                             # Note: Supabase Python client syntax for storage:
-                            storage_response = supabase_client.storage.from_("ad-creatives").upload(
-                                path=file_path,
-                                file=file_content,
-                                file_options={"content-type": f"image/{file_ext}"}
-                            )
+                            with span("storage", "ad-creatives.upload"):
+                                storage_response = supabase_db.get_client().storage.from_("ad-creatives").upload(
+                                    path=file_path,
+                                    file=file_content,
+                                    file_options={"content-type": f"image/{file_ext}"}
+                                )
                             
                             # Get Public URL
                             # The upload response object might not contain the public URL directly
                             # We construct it or request it
                             
                             # With supabase-py, getting public URL:
-                            public_url_response = supabase_client.storage.from_("ad-creatives").get_public_url(file_path)
+                            with span("storage", "ad-creatives.get_public_url"):
+                                public_url_response = supabase_db.get_client().storage.from_("ad-creatives").get_public_url(file_path)
                             
                             # public_url_response is usually a string or object with publicURL
                             if isinstance(public_url_response, str):
                                 image_url = public_url_response
                             elif isinstance(public_url_response, dict) and 'publicURL' in public_url_response: # Older versions
-                                print(f"Public URL dict key found: {public_url_response}") # Debugging
+                                logger.debug(f"Public URL dict key found: {public_url_response}")
                                 image_url = public_url_response['publicURL'] 
                             else: # Newer versions might return just the URL string
                                 image_url = str(public_url_response)
@@ -2008,21 +1898,23 @@ def save_plan_ads():
                 
                 logger.debug(f"Inserting ad {i+1}/{len(ads)}: {ad_data.get('headline')}")
                 
-                response = supabase_client.table("plan_ads") \
-                    .insert(ad_data) \
-                    .execute()
+                with span("db", "plan_ads.insert"):
+                    response = supabase_db.get_client().table("plan_ads") \
+                        .insert(ad_data) \
+                        .execute()
                 
                 if response.data:
                     saved_ads.append(response.data[0])
                     logger.info(f"Ad {i+1} saved successfully, ID: {response.data[0]['id']}")
                     
             except Exception as insert_error:
-                logger.error(f"Failed to insert ad {i+1}: {type(insert_error).__name__}: {insert_error}")
-                import traceback
-                logger.error(traceback.format_exc())
+                logger.exception(f"Failed to insert ad {i+1}: {type(insert_error).__name__}: {insert_error}")
                 # Don't raise, try to save other ads
                 # raise insert_error
 
+        if saved_ads:
+            progress_service.invalidate(user_id)
+
         # Award points for ad generation (first time only system)
         try:
              # Basic points logic - can be expanded
@@ -2037,21 +1929,19 @@ def save_plan_ads():
         })
         
     except Exception as e:
-        logger.error(f"CRITICAL ERROR in save_plan_ads: {str(e)}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.exception(f"CRITICAL ERROR in save_plan_ads: {str(e)}")
         return jsonify({"error": f"Failed to save ads: {str(e)}"}), 500
 
 
 # 8. GET PLAN ADS ENDPOINT
-@app.route("/api/get-plan-ads/<plan_id>", methods=["GET"])
+@main_bp.route("/api/get-plan-ads/<plan_id>", methods=["GET"])
 def get_plan_ads(plan_id):
     """
     Retrieve all non-archived ads for a specific business plan.
     """
     # Check if Supabase client is available
-    if not supabase_client:
-        print("ERROR: Supabase client not initialized")
+    if not supabase_db.get_client():
+        logger.error("Supabase client not initialized")
         return jsonify({"error": "Database connection not available"}), 500
     
     user_id = request.args.get("user_id")
@@ -2060,7 +1950,7 @@ def get_plan_ads(plan_id):
         return jsonify({"error": "Missing user_id"}), 400
     
     try:
-        query = supabase_client.table("plan_ads") \
+        query = supabase_db.get_client().table("plan_ads") \
             .select("*") \
             .eq("user_id", user_id) \
             .eq("is_archived", False)
@@ -2069,10 +1959,11 @@ def get_plan_ads(plan_id):
         if plan_id.lower() != "all":
             query = query.eq("plan_id", plan_id)
             
-        response = query.order("created_at", {"ascending": False}).execute()
+        with span("db", "plan_ads.select"):
+            response = query.order("created_at", {"ascending": False}).execute()
         
         # Log successful fetch
-        print(f"Fetched {len(response.data) if response.data else 0} ads for user {user_id}")
+        logger.info(f"Fetched {len(response.data) if response.data else 0} ads for user {user_id}")
         
         return jsonify({
             "success": True,
@@ -2081,15 +1972,13 @@ def get_plan_ads(plan_id):
         })
         
     except Exception as e:
-        print(f"CRITICAL ERROR in get_plan_ads: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Critical error in get_plan_ads: {e}")
         # Return the actual error to the frontend for debugging
         return jsonify({"error": f"Failed to fetch ads: {str(e)}"}), 500
 
 
 # 9. DELETE PLAN AD ENDPOINT
-@app.route("/api/delete-plan-ad/<ad_id>", methods=["DELETE"])
+@main_bp.route("/api/delete-plan-ad/<ad_id>", methods=["DELETE"])
 def delete_plan_ad(ad_id):
     """
     Delete a specific ad (soft delete by archiving).
@@ -2101,13 +1990,15 @@ def delete_plan_ad(ad_id):
     
     try:
         # Soft delete by setting is_archived to true
-        response = supabase_client.table("plan_ads") \
-            .update({"is_archived": True}) \
-            .eq("id", ad_id) \
-            .eq("user_id", user_id) \
-            .execute()
+        with span("db", "plan_ads.archive"):
+            response = supabase_db.get_client().table("plan_ads") \
+                .update({"is_archived": True}) \
+                .eq("id", ad_id) \
+                .eq("user_id", user_id) \
+                .execute()
         
         if response.data:
+            progress_service.invalidate(user_id)
             return jsonify({
                 "success": True,
                 "message": "Ad deleted successfully"
@@ -2116,12 +2007,12 @@ def delete_plan_ad(ad_id):
             return jsonify({"error": "Ad not found"}), 404
         
     except Exception as e:
-        print(f"ERROR in delete_plan_ad: {str(e)}")
+        logger.error(f"Error in delete_plan_ad: {e}")
         return jsonify({"error": "Failed to delete ad"}), 500
 
 
 # 10. TOGGLE FAVORITE AD ENDPOINT
-@app.route("/api/toggle-favorite-ad/<ad_id>", methods=["PATCH"])
+@main_bp.route("/api/toggle-favorite-ad/<ad_id>", methods=["PATCH"])
 def toggle_favorite_ad(ad_id):
     """
     Toggle favorite status of an ad.
@@ -2133,12 +2024,13 @@ def toggle_favorite_ad(ad_id):
     
     try:
         # Get current favorite status
-        current = supabase_client.table("plan_ads") \
-            .select("is_favorite") \
-            .eq("id", ad_id) \
-            .eq("user_id", user_id) \
-            .single() \
-            .execute()
+        with span("db", "plan_ads.select_favorite"):
+            current = supabase_db.get_client().table("plan_ads") \
+                .select("is_favorite") \
+                .eq("id", ad_id) \
+                .eq("user_id", user_id) \
+                .single() \
+                .execute()
         
         if not current.data:
             return jsonify({"error": "Ad not found"}), 404
@@ -2146,11 +2038,12 @@ def toggle_favorite_ad(ad_id):
         # Toggle the status
         new_status = not current.data.get("is_favorite", False)
         
-        response = supabase_client.table("plan_ads") \
-            .update({"is_favorite": new_status}) \
-            .eq("id", ad_id) \
-            .eq("user_id", user_id) \
-            .execute()
+        with span("db", "plan_ads.update_favorite"):
+            response = supabase_db.get_client().table("plan_ads") \
+                .update({"is_favorite": new_status}) \
+                .eq("id", ad_id) \
+                .eq("user_id", user_id) \
+                .execute()
         
         return jsonify({
             "success": True,
@@ -2159,16 +2052,29 @@ def toggle_favorite_ad(ad_id):
         })
         
     except Exception as e:
-        print(f"ERROR in toggle_favorite_ad: {str(e)}")
+        logger.error(f"Error in toggle_favorite_ad: {e}")
         return jsonify({"error": "Failed to toggle favorite"}), 500
 
 
 
 # 11. UPDATE USER PROFILE ENDPOINT
-@app.route("/api/update-user-profile", methods=["POST"])
+# Columns a client may PATCH on user_profiles
+PROFILE_FIELDS = (
+    "full_name",
+    "phone",
+    "business_name",
+    "industry",
+    "business_stage",
+    "location",
+    "preferred_category",
+)
+
+
+@main_bp.route("/api/update-user-profile", methods=["POST"])
 def update_user_profile():
     """
     Update or create user profile.
+    PATCH semantics: only the fields present in the request are written.
     """
     try:
         data = request.json
@@ -2176,53 +2082,97 @@ def update_user_profile():
              return jsonify({"error": "No data provided"}), 400
              
         user_id = data.get("user_id")
-        full_name = data.get("full_name")
-        phone = data.get("phone")
-        business_name = data.get("business_name")
-        industry = data.get("industry")
         
         if not user_id:
             return jsonify({"error": "Missing user_id"}), 400
-            
-        # Prepare profile data
-        profile_data = {
-            "user_id": user_id,
-            "full_name": full_name,
-            "phone": phone,
-            "business_name": business_name,
-            "industry": industry,
-            "updated_at": "now()"
-        }
-        
-        # Upsert profile (Insert or Update)
-        response = supabase_client.table("user_profiles").upsert(
-            profile_data, on_conflict="user_id"
-        ).execute()
+
+        changes = {field: data[field] for field in PROFILE_FIELDS if field in data}
+
+        profile_data = {"user_id": user_id, **changes, "updated_at": "now()"}
+
+        # Upsert profile (Insert or Update) in a single round trip.
+        # default_to_null=False keeps omitted columns untouched on update,
+        # and PostgREST returns the stored row (Prefer: return=representation).
+        with span("db", "user_profiles.upsert"):
+            response = supabase_db.get_client().table("user_profiles").upsert(
+                profile_data,
+                on_conflict="user_id",
+                returning="representation",
+                default_to_null=False,
+            ).execute()
         
-        if response.data:
-            return jsonify({
-                "success": True,
-                "profile": response.data[0],
-                "message": "Profile updated successfully"
-            })
-        else:
-             # If upsert doesn't return data, fetch it manually to confirm
-             fetch_profile = supabase_client.table("user_profiles").select("*").eq("user_id", user_id).execute()
-             if fetch_profile.data:
-                 return jsonify({
-                    "success": True,
-                    "profile": fetch_profile.data[0],
-                    "message": "Profile updated successfully"
-                })
-             return jsonify({"error": "Failed to update profile (no data returned)"}), 500
+        if not response.data:
+            return jsonify({"error": "Failed to update profile (no data returned)"}), 500
+
+        profile = response.data[0]
+        leaderboard_service.record_profile(user_id, profile)
+        return jsonify({
+            "success": True,
+            "profile": profile,
+            "message": "Profile updated successfully"
+        })
 
     except Exception as e:
-        print(f"ERROR in update_user_profile: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in update_user_profile: {e}")
         return jsonify({"error": f"Failed to update profile: {str(e)}"}), 500
 
 
+# ===== APP FACTORY =====
+def _register_dependencies():
+    """Warm-up work for /api/ready; all of it also happens lazily on first use."""
+    def supabase_ready():
+        return supabase_db.health()["ok"]
+
+    def with_db(load):
+        def warm():
+            client = supabase_db.get_client()
+            if client is None:
+                return False
+            load(client)
+        return warm
+
+    readiness.register("supabase", supabase_ready)
+    readiness.register("llm", llm.get_client)
+    readiness.register("market_research_index", with_db(market_research_service.load), required=False)
+    readiness.register("bom_engine", with_db(bom_costing.load), required=False)
+    readiness.register("supplier_index", with_db(supplier_index.load), required=False)
+    # Last: after a deploy that edited a prompt, regenerate its most requested keys.
+    # Not retried: /api/ready is public and every attempt makes LLM calls
+    readiness.register("prompt_warm_up", prompts.warm_changed, required=False, retry=False)
+    if cache_warmup.WARM_ON_START:
+        readiness.register("bi_cache_warm_up", cache_warmup.run, required=False)
+
+
+def create_app() -> Flask:
+    """
+    Build the app. Nothing slow happens here: the Supabase and LLM clients are
+    created on first use, and with WARM_ON_START (default on) a background
+    thread creates them and loads the reference indexes right away.
+    """
+    app = Flask(__name__)
+    # Allow CORS for valid origins - allow all for development
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+
+    app.register_blueprint(main_bp)
+    app.register_blueprint(bi_bp)
+    logger.info("BI Blueprint registered at /api/bi/*")
+
+    # Per-route latency histograms, db/llm/storage spans and slow-request sampling
+    request_timing.init_app(app)
+    # Token / latency accounting headers for every request that calls the LLM
+    llm.init_app(app)
+    # Opt-in profiling (X-Profile header with admin token, or PROFILE_SAMPLE_RATE)
+    profiling.init_app(app)
+
+    _register_dependencies()
+    if os.getenv("WARM_ON_START", "true").lower() == "true":
+        readiness.warm_up()
+    return app
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
     app.run(debug=True)
 
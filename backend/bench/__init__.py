@@ -0,0 +1,5 @@
+"""
+Benchmark suite for the backend hot paths.
+Runs the Flask app against local stand-ins for OpenRouter and Supabase/PostgREST
+and records throughput and latency percentiles. See bench/run.py.
+"""
@@ -0,0 +1,115 @@
+"""
+Import-time benchmark — how long a cold worker takes to import app.py, and
+what the lazily created clients cost when they are first used.
+
+Run from backend/:
+    python -m bench.import_time                 # 5 cold imports
+    python -m bench.import_time --runs 10 --top 15 --out import.json
+
+Each run is a fresh interpreter with warm-up disabled and no .env, so only
+import and create_app() are measured. --top lists the slowest modules by
+cumulative import time (python -X importtime) from one extra run.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from bench.mock_postgrest import SERVICE_KEY
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+import supabase_db
+from services import llm
+supabase_db.get_client()
+clients = time.perf_counter()
+llm.get_client()
+done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "supabase_client_ms": (clients - imported) * 1000,
+    "llm_client_ms": (done - clients) * 1000,
+}))
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DOTENV_PATH": os.devnull,
+        "WARM_ON_START": "false",
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE": "",
+        # Syntactically valid but unreachable: creating the clients does no I/O
+        "SUPABASE_URL": "http://127.0.0.1:9",
+        "SUPABASE_SERVICE_KEY": SERVICE_KEY,
+        "OPENROUTER_API_KEY": "bench",
+    })
+    return env
+
+
+def measure(runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=_env(),
+                                         stderr=subprocess.DEVNULL, text=True)
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return samples
+
+
+def slowest_modules(top: int) -> list:
+    """[(module, cumulative_ms)] for a cold `import app`, slowest first (top-level packages only)."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=BACKEND_DIR,
+                            env=_env(), capture_output=True, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            modules.append((name.strip(), int(cumulative) / 1000))
+    return sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.import_time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list (0 = skip)")
+    parser.add_argument("--out", default="", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    samples = measure(args.runs)
+    summary = {}
+    for key in samples[0]:
+        values = [s[key] for s in samples]
+        summary[key] = {"median": round(statistics.median(values), 1), "min": round(min(values), 1),
+                        "max": round(max(values), 1)}
+        print(f"{key:<20} median={summary[key]['median']:>7.1f}ms  min={summary[key]['min']:>7.1f}ms  max={summary[key]['max']:>7.1f}ms")
+
+    modules = slowest_modules(args.top) if args.top else []
+    if modules:
+        print("\nSlowest imports (cumulative):")
+        for name, ms in modules:
+            print(f"  {ms:>8.1f}ms  {name}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"runs": args.runs, "summary": summary, "samples": samples,
+                       "slowest_modules": modules}, f, indent=2)
+        print(f"Results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Mock OpenRouter — a local /api/v1/chat/completions with controllable timing.
+Replies are one JSON object carrying the keys every endpoint schema requires,
+so all JSON endpoints parse them. Time to first token and the token rate are
+configurable; streamed replies are sent as SSE chunks like the real API.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+CHUNK_TOKENS = 4
+
+REPLY = {
+    "reply": "Sounds good! What budget do you have in mind?",
+    "extracted_info": {},
+    "comparison_data": [],
+    "step_completed": False,
+    "ideas": [{"id": "tea-stall", "name": "Tea Stall", "investmentRange": "₹50,000 - ₹1,00,000"}],
+    "predicted_budget": 500000,
+    "budget_breakdown": {"equipment": 200000, "working_capital": 300000},
+    "raw_materials": [{"name": "Tea leaves", "estimated_cost": "₹400 per kg"}],
+    "templates": [{"id": "template-1", "caption": "Fresh chai every morning!"}],
+    "posting_patterns": {"recommended_frequency": "4 posts per week"},
+    "ai_suggestions": {"content_ideas": ["Behind the scenes"]},
+    "suggestions": [{"name": "Chai Point", "tagline": "Every cup, fresh"}],
+    "weekly_goals": ["Open the stall"],
+    "marketing_checklist": ["WhatsApp Business"],
+    "cost_control_checklist": ["Track daily spend"],
+    "growth_strategies": ["Add snacks"],
+    "export_readiness": ["N/A"],
+    "products": [{"id": "p1", "name": "Masala Chai", "avg_selling_price": 20, "category": "Beverage"}],
+    "demand_level": "High",
+    "demand_trend": "Rising",
+    "profit_margin_estimate": "25-40%",
+    "investment_range": "₹50,000 - ₹2,00,000",
+    "top_products": [],
+    "suppliers": [{"name": "Assam Tea Traders", "approx_cost": "₹350-₹450 per kg", "rating": 4.1}],
+    "materials": [{"name": "Tea leaves", "cost_estimate": "₹400 per kg"}],
+    "total_material_cost_per_100_units": "₹300-₹500",
+    "steps": [{"step_number": 1, "title": "Boil water"}],
+    "ingredients": [{"name": "Milk", "cost": "₹60"}],
+}
+
+
+class MockOpenRouter:
+    def __init__(self, ttfb_ms: float = 300, jitter_ms: float = 50, tokens_per_second: float = 200,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.ttfb_ms = ttfb_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-openrouter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _ttfb(self) -> float:
+        return max(0.0, random.gauss(self.ttfb_ms, self.jitter_ms)) / 1000
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with mock._lock:
+                    mock.requests += 1
+                content = json.dumps(REPLY, ensure_ascii=False)
+                prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // CHARS_PER_TOKEN
+                completion_tokens = max(1, len(content) // CHARS_PER_TOKEN)
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}
+                base = {"id": f"gen-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": body.get("model", "mock")}
+
+                time.sleep(mock._ttfb())
+                if body.get("stream"):
+                    self._stream(content, usage, base, (body.get("stream_options") or {}).get("include_usage"))
+                else:
+                    time.sleep(completion_tokens / mock.tokens_per_second)
+                    payload = json.dumps({
+                        **base, "object": "chat.completion",
+                        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                        "usage": usage,
+                    }).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _event(self, obj):
+                self._chunk(b"data: " + json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+            def _stream(self, content: str, usage: dict, base: dict, include_usage: bool):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                step = CHUNK_TOKENS * CHARS_PER_TOKEN
+                delay = CHUNK_TOKENS / mock.tokens_per_second
+                for start in range(0, len(content), step):
+                    self._event({**base, "object": "chat.completion.chunk", "choices": [
+                        {"index": 0, "delta": {"content": content[start:start + step]}, "finish_reason": None}]})
+                    time.sleep(delay)
+                self._event({**base, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                if include_usage:
+                    self._event({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+        return Handler
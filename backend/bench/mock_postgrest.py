@@ -0,0 +1,198 @@
+"""
+Mock PostgREST — a local stand-in for the Supabase REST and Storage APIs.
+Serves a synthetic, deterministic dataset (suppliers, BOM catalogue, market
+research links, ...) with enough of PostgREST's query surface for the app:
+eq.<value> filters, offset/limit paging, single-object Accept, exact counts,
+inserts / upserts / updates with return=representation, RPC calls and object uploads.
+Every request can be delayed by a configurable database latency.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+# Dummy JWT-shaped key: the Supabase client validates the format only
+SERVICE_KEY = "bench.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.mock"
+
+CITIES = [("Pune", "Maharashtra"), ("Anand", "Gujarat"), ("Indore", "Madhya Pradesh"),
+          ("Coimbatore", "Tamil Nadu"), ("Ghaziabad", "Uttar Pradesh"), ("Mysuru", "Karnataka")]
+NIC_CODES = ["10712", "10792", "13121", "20221", "26109", "47211", "56101", "74909"]
+
+
+def build_dataset(suppliers: int = 300, products: int = 60, materials: int = 80, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    now = "2026-01-01T00:00:00+00:00"
+    tables: dict = {}
+
+    tables["suppliers"] = [{
+        "id": f"s{i}",
+        "enterprise_name": f"Bench Enterprise {i}",
+        "district": CITIES[i % len(CITIES)][0],
+        "state": CITIES[i % len(CITIES)][1],
+        "enterprise_type": rng.choice(["Micro", "Small", "Medium"]),
+        "major_activity": rng.choice(["Manufacturing", "Services", "Trading"]),
+        "nic_code": rng.choice(NIC_CODES),
+        "production_commenced": True,
+        "registration_date": "2021-04-01",
+        "social_category": "General",
+        "contact_phone": f"+91 90000 {i:05d}",
+        "contact_email": f"supplier{i}@example.com",
+    } for i in range(suppliers)]
+
+    businesses = ["Bakery", "Tea Stall", "Pickle Unit", "Tailoring"]
+    tables["business_definitions"] = [{"id": f"b{i}", "name": name} for i, name in enumerate(businesses)]
+    tables["raw_materials"] = [{
+        "id": f"m{i}", "name": f"Material {i}", "unit": rng.choice(["kg", "litre", "piece"]),
+        "avg_cost_per_unit": round(rng.uniform(5, 500), 2), "category": "General",
+    } for i in range(materials)]
+    tables["products"] = [{
+        "id": f"p{i}", "business_id": f"b{i % len(businesses)}", "name": f"Product {i}",
+        "avg_selling_price": round(rng.uniform(50, 900), 2),
+    } for i in range(products)]
+    tables["product_materials"] = [
+        {"product_id": f"p{p}", "material_id": f"m{m}", "quantity_required": round(rng.uniform(0.01, 2.0), 3)}
+        for p in range(products) for m in rng.sample(range(materials), 6)
+    ]
+    tables["supplier_materials"] = [{
+        "supplier_id": f"s{rng.randrange(suppliers)}", "material_id": f"m{m}",
+        "price_offer": round(rng.uniform(5, 450), 2), "is_primary_supplier": rng.random() < 0.2,
+    } for m in range(materials) for _ in range(3)]
+    tables["market_research_links"] = [{
+        "id": f"l{i}", "business_type": "All", "location": "India", "category": "market_trends",
+        "title": f"Report {i}", "url": f"https://example.com/{i}", "description": "",
+        "is_verified": True, "is_government": False, "updated_at": now,
+    } for i in range(20)]
+    tables["user_points"] = [{"user_id": f"u{i}", "total_points": rng.randrange(0, 5000), "rank": None} for i in range(200)]
+    tables["user_profiles"] = []
+    tables["user_progress"] = []
+    tables["plan_ads"] = []
+    return tables
+
+
+def _matches(row: dict, filters: list) -> bool:
+    for column, expression in filters:
+        op, _, value = expression.partition(".")
+        if op == "eq" and str(row.get(column)).lower() != value.lower():
+            return False
+    return True
+
+
+class MockPostgrest:
+    def __init__(self, latency_ms: float = 5, host: str = "127.0.0.1", port: int = 0, **dataset_options):
+        self.latency_ms = latency_ms
+        self.tables = build_dataset(**dataset_options)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="mock-postgrest", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload, headers: dict = None):
+                body = json.dumps(payload, default=str).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _route(self):
+                with mock._lock:
+                    mock.requests += 1
+                if mock.latency_ms:
+                    time.sleep(mock.latency_ms / 1000)
+                parts = urlsplit(self.path)
+                params = parse_qsl(parts.query, keep_blank_values=True)
+                return unquote(parts.path), params
+
+            def _table(self, path: str):
+                name = path[len("/rest/v1/"):]
+                return mock.tables.setdefault(name, [])
+
+            def do_GET(self):
+                path, params = self._route()
+                if not path.startswith("/rest/v1/"):
+                    return self._send(404, {"message": "not found"})
+                rows = self._table(path)
+                filters = [(k, v) for k, v in params if k not in ("select", "order", "offset", "limit")]
+                with mock._lock:
+                    selected = [r for r in rows if _matches(r, filters)]
+                args = dict(params)
+                offset = int(args.get("offset", 0))
+                limit = int(args.get("limit", len(selected)))
+                page = selected[offset:offset + limit]
+
+                headers = {}
+                if "count=exact" in (self.headers.get("Prefer") or ""):
+                    end = offset + len(page) - 1 if page else 0
+                    headers["Content-Range"] = f"{offset}-{end}/{len(selected)}"
+                if "vnd.pgrst.object" in (self.headers.get("Accept") or ""):
+                    if len(page) != 1:
+                        return self._send(406, {"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned"})
+                    return self._send(200, page[0], headers)
+                return self._send(200, page, headers)
+
+            def do_POST(self):
+                path, params = self._route()
+                raw = self._body()
+                if path.startswith("/storage/v1/object/"):
+                    return self._send(200, {"Key": path[len("/storage/v1/object/"):], "Id": str(uuid.uuid4())})
+                if path.startswith("/rest/v1/rpc/"):
+                    return self._send(200, 0)
+                if not path.startswith("/rest/v1/"):
+                    return self._send(404, {"message": "not found"})
+                payload = json.loads(raw or b"[]")
+                records = payload if isinstance(payload, list) else [payload]
+                stored = [{"id": str(uuid.uuid4()), "created_at": time.strftime("%Y-%m-%dT%H:%M:%S+00:00"), **r} for r in records]
+                table = self._table(path)
+                conflict = dict(params).get("on_conflict")
+                with mock._lock:
+                    if conflict:
+                        # Upsert: incoming rows replace stored rows with the same key
+                        keys = {r.get(conflict) for r in stored}
+                        table[:] = [r for r in table if r.get(conflict) not in keys]
+                    table.extend(stored)
+                return self._send(201, stored)
+
+            def do_PATCH(self):
+                path, params = self._route()
+                changes = json.loads(self._body() or b"{}")
+                filters = [(k, v) for k, v in params if k not in ("select",)]
+                table = self._table(path)
+                with mock._lock:
+                    updated = [r for r in table if _matches(r, filters)]
+                    for row in updated:
+                        row.update(changes)
+                return self._send(200, updated)
+
+        return Handler
@@ -0,0 +1,118 @@
+"""
+Cache key replay — how many BI requests would be cache hits with raw input
+strings as keys versus the canonical forms from services/normalise.py.
+
+Run from backend/:
+    python -m bench.replay_keys requests.jsonl
+    python -m bench.replay_keys prompt_stats.json --show 10
+
+Inputs are either JSON lines, one request per line, as
+    {"path": "/api/bi/recipe-breakdown", "body": {"business_type": "...", "product_name": "..."}}
+(the body fields may also sit at the top level, and "prompt": "bi.recipe" may
+replace "path"), or a prompt stats file written by services/prompts.py, whose
+per-prompt popularity counts are the raw inputs the app was asked for.
+The cache is treated as unbounded and TTLs are ignored, so the hit rate is
+1 - distinct keys / requests; real hit rates are lower for both key forms.
+"""
+
+import argparse
+import json
+from collections import Counter
+
+from services import normalise
+
+# prompt name -> (route, input fields and how each is canonicalised)
+ENDPOINTS = {
+    "bi.products": ("/api/bi/product-list", {"business_name": normalise.business_type}),
+    "bi.research": ("/api/bi/research-product", {"business_type": normalise.business_type, "product_name": normalise.product_name}),
+    "bi.suppliers": ("/api/bi/enriched-suppliers", {"business_type": normalise.business_type, "product_name": normalise.product_name, "city": normalise.city}),
+    "bi.materials": ("/api/bi/product-materials", {"business_type": normalise.business_type, "product_name": normalise.product_name}),
+    "bi.recipe": ("/api/bi/recipe-breakdown", {"business_type": normalise.business_type, "product_name": normalise.product_name}),
+}
+_BY_PATH = {path: name for name, (path, _) in ENDPOINTS.items()}
+
+
+def _request(record: dict):
+    """(prompt name, inputs) for one logged request, or None if it is not a BI lookup."""
+    name = record.get("prompt") or _BY_PATH.get((record.get("path") or "").split("?")[0])
+    if name not in ENDPOINTS:
+        return None
+    body = record.get("body") if isinstance(record.get("body"), dict) else record
+    if name == "bi.products":
+        body = {"business_name": body.get("businessName") or body.get("business_name", "")}
+    if name == "bi.suppliers":
+        body = {**body, "city": body.get("city", "India")}
+    return name, body
+
+
+def load(path: str) -> Counter:
+    """Counter of (prompt name, raw inputs as sorted JSON) -> requests."""
+    requests = Counter()
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    try:
+        stats = json.loads(content)
+    except ValueError:
+        stats = None
+    if isinstance(stats, dict) and "popular" in stats:
+        for name, counts in stats["popular"].items():
+            if name in ENDPOINTS:
+                for inputs, count in counts.items():
+                    requests[name, inputs] += count
+        return requests
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        request = _request(json.loads(line))
+        if request:
+            name, body = request
+            fields = ENDPOINTS[name][1]
+            requests[name, json.dumps({field: body.get(field, "") for field in fields}, sort_keys=True, ensure_ascii=False)] += 1
+    return requests
+
+
+def canonical(name: str, raw_inputs: str) -> str:
+    inputs = json.loads(raw_inputs)
+    return ":".join(canonicalise(inputs.get(field, "")) for field, canonicalise in ENDPOINTS[name][1].items())
+
+
+def replay(requests: Counter) -> dict:
+    total = sum(requests.values())
+    raw_keys = {(name, inputs) for name, inputs in requests}
+    canonical_keys = {(name, canonical(name, inputs)) for name, inputs in requests}
+    return {
+        "requests": total,
+        "raw_keys": len(raw_keys),
+        "canonical_keys": len(canonical_keys),
+        "raw_hit_rate": round(1 - len(raw_keys) / total, 4) if total else 0.0,
+        "canonical_hit_rate": round(1 - len(canonical_keys) / total, 4) if total else 0.0,
+        "llm_calls_saved": len(raw_keys) - len(canonical_keys),
+    }
+
+
+def merged(requests: Counter, top: int) -> list:
+    """The canonical keys that absorb the most raw spellings."""
+    groups: dict = {}
+    for name, inputs in requests:
+        groups.setdefault((name, canonical(name, inputs)), []).append(inputs)
+    biggest = sorted(groups.items(), key=lambda item: -len(item[1]))[:top]
+    return [{"prompt": name, "key": key, "spellings": [json.loads(i) for i in spellings]} for (name, key), spellings in biggest if len(spellings) > 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.replay_keys")
+    parser.add_argument("logs", nargs="+", help="JSON-lines request logs or prompt stats files")
+    parser.add_argument("--show", type=int, default=0, help="list the N canonical keys merging the most spellings")
+    args = parser.parse_args(argv)
+
+    requests = Counter()
+    for path in args.logs:
+        requests.update(load(path))
+    result = replay(requests)
+    if args.show:
+        result["merged"] = merged(requests, args.show)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Backend benchmark — throughput and p50/p95/p99 latency of the hot paths.
+
+Starts a mock OpenRouter and a mock Supabase/PostgREST, launches the Flask app
+in a subprocess pointed at them (real credentials in .env are never loaded),
+then runs every scenario at each concurrency level.
+
+Run from backend/:
+    python -m bench.run                                   # all scenarios, concurrency 1,4,16
+    python -m bench.run --scenarios gov-listings,bi-research-cold --concurrency 1,8 --duration 5
+    python -m bench.run --llm-ttfb-ms 800 --llm-tokens-per-second 60 --out before.json
+    python -m bench.run compare before.json after.json --threshold 0.10
+
+Results are JSON (one entry per scenario x concurrency) and can be compared
+between runs; compare exits with status 1 when a regression exceeds the threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from bench.mock_openrouter import MockOpenRouter
+from bench.mock_postgrest import SERVICE_KEY, MockPostgrest
+from bench.runner import run_load
+from bench.scenarios import SCENARIOS
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "bench", "results")
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def start_app(port: int, llm: MockOpenRouter, db: MockPostgrest, workdir: str, log_path: str):
+    env = dict(os.environ)
+    env.update({
+        "DOTENV_PATH": os.devnull,
+        "SUPABASE_URL": db.url,
+        "SUPABASE_SERVICE_KEY": SERVICE_KEY,
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_BASE_URL": llm.base_url,
+        "MOCK_AI": "false",
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE": "",
+        "POINTS_LOG_PATH": os.path.join(workdir, "points_events.log"),
+        "PROMPT_STATS_PATH": os.path.join(workdir, "prompt_stats.json"),
+        # Measure the app, not the provider limits: the mock has no RPM/TPM caps
+        "LLM_RPM": "0",
+        "LLM_TPM": "0",
+        "LLM_MAX_CONCURRENCY": "512",
+        "LLM_INITIAL_CONCURRENCY": "512",
+    })
+    code = (
+        "from app import app; "
+        f"app.run(host='127.0.0.1', port={port}, threaded=True, debug=False, use_reloader=False)"
+    )
+    log = open(log_path, "w")
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited during startup (see {log_path})")
+        try:
+            if requests.get(f"{base_url}/api/ready", timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"App did not become ready (see {log_path})")
+
+
+def run(args) -> dict:
+    names = [s.strip() for s in args.scenarios.split(",")] if args.scenarios else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    llm = MockOpenRouter(args.llm_ttfb_ms, args.llm_jitter_ms, args.llm_tokens_per_second).start()
+    db = MockPostgrest(args.db_latency_ms, suppliers=args.suppliers).start()
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    log_path = os.path.join(workdir, "app.log")
+    process, base_url = start_app(_free_port(), llm, db, workdir, log_path)
+
+    results = []
+    try:
+        for name in names:
+            for level in levels:
+                stats = run_load(SCENARIOS[name], base_url, level, args.duration, args.warmup)
+                results.append({"scenario": name, **stats})
+                print(f"{name:<22} c={level:<3} {stats['throughput_rps']:>8.1f} req/s  "
+                      f"p50={stats['p50_ms']:>8.1f}ms  p95={stats['p95_ms']:>8.1f}ms  "
+                      f"p99={stats['p99_ms']:>8.1f}ms  errors={stats['errors']}")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        llm.stop()
+        db.stop()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "duration_s": args.duration,
+                "warmup_s": args.warmup,
+                "concurrency": levels,
+                "llm_ttfb_ms": args.llm_ttfb_ms,
+                "llm_jitter_ms": args.llm_jitter_ms,
+                "llm_tokens_per_second": args.llm_tokens_per_second,
+                "db_latency_ms": args.db_latency_ms,
+                "suppliers": args.suppliers,
+            },
+            "app_log": log_path,
+            "mock_requests": {"openrouter": llm.requests, "postgrest": db.requests},
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    """Rows of (scenario, concurrency, metric, old, new, change, regressed)."""
+    old = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    rows = []
+    for result in candidate["results"]:
+        key = (result["scenario"], result["concurrency"])
+        if key not in old:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = old[key][metric], result[metric]
+            change = (after - before) / before if before else 0.0
+            # Latency regresses upwards, throughput downwards
+            regressed = change < -threshold if metric == "throughput_rps" else change > threshold
+            rows.append((key[0], key[1], metric, before, after, change, regressed))
+    return rows
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "compare":
+        parser = argparse.ArgumentParser(prog="python -m bench.run compare")
+        parser.add_argument("baseline")
+        parser.add_argument("candidate")
+        parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+        args = parser.parse_args(argv[1:])
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        rows = compare(baseline, candidate, args.threshold)
+        for scenario, level, metric, before, after, change, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{scenario:<22} c={level:<3} {metric:<15} {before:>10.1f} -> {after:>10.1f}  {change:+7.1%}{flag}")
+        return 1 if any(row[-1] for row in rows) else 0
+
+    parser = argparse.ArgumentParser(prog="python -m bench.run")
+    parser.add_argument("--scenarios", default="", help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario and level")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--llm-ttfb-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--suppliers", type=int, default=300, help="rows in the mock suppliers table")
+    parser.add_argument("--out", default="", help="results file (default bench/results/bench-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Load runner — closed-loop workers hammering one scenario for a fixed time.
+Each worker thread owns a keep-alive requests.Session and records the wall
+time of every request; results are summarised as throughput and latency
+percentiles.
+"""
+
+import itertools
+import threading
+import time
+
+import requests
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_load(scenario, base_url: str, concurrency: int, duration: float, warmup: float = 0.0,
+             timeout: float = 60.0) -> dict:
+    counter = itertools.count()
+    latencies: list = []
+    errors = [0]
+    statuses: dict = {}
+    lock = threading.Lock()
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    def worker():
+        session = requests.Session()
+        session.request = _with_timeout(session.request, timeout)
+        local_latencies = []
+        local_errors = 0
+        local_statuses: dict = {}
+        while True:
+            started = time.perf_counter()
+            if started >= stop_at:
+                break
+            try:
+                response = scenario(session, base_url, next(counter))
+                response.content  # read the full body
+                ok = response.status_code < 500
+                status = str(response.status_code)
+            except requests.RequestException as e:
+                ok = False
+                status = type(e).__name__
+            ended = time.perf_counter()
+            if started < measure_from:
+                continue
+            local_latencies.append(ended - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+            if not ok:
+                local_errors += 1
+        session.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "requests": len(ms),
+        "errors": errors[0],
+        "status_counts": statuses,
+        "throughput_rps": round(len(ms) / duration, 2) if duration else 0.0,
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "max_ms": round(ms[-1], 2) if ms else 0.0,
+    }
+
+
+def _with_timeout(request, timeout: float):
+    def wrapped(method, url, **kwargs):
+        kwargs.setdefault("timeout", timeout)
+        return request(method, url, **kwargs)
+    return wrapped
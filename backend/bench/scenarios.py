@@ -0,0 +1,72 @@
+"""
+Benchmark scenarios — one function per hot path.
+Each takes (session, base_url, i) where i is a per-run request counter, sends
+one request and returns the response. Inputs vary with i where the endpoint
+caches results, so "cold" scenarios keep exercising the uncached path.
+"""
+
+AD = {
+    "type": "Promotional Launch",
+    "headline": "Fresh chai every morning",
+    "caption": "Come taste the best masala chai in town.",
+    "cta": "Visit us today!",
+    "hashtags": "#Chai #LocalBusiness",
+    "suggested_time": "9:00 AM",
+}
+
+
+def smartbiz_agent(session, base_url, i):
+    return session.post(f"{base_url}/api/smartbiz-agent", json={
+        "message": "I want to open a tea stall",
+        "state": {"step_index": 0, "answers": {}},
+    })
+
+
+def bi_research_cold(session, base_url, i):
+    # Unique product per request: result cache miss, one LLM call
+    return session.post(f"{base_url}/api/bi/research-product", json={
+        "business_type": "Tea Stall", "product_name": f"Blend {i}",
+    })
+
+
+def bi_research_cached(session, base_url, i):
+    return session.post(f"{base_url}/api/bi/research-product", json={
+        "business_type": "Tea Stall", "product_name": f"House Blend {i % 5}",
+    })
+
+
+def bi_product_materials(session, base_url, i):
+    # BOM-backed products from the mock catalogue; no LLM call
+    return session.post(f"{base_url}/api/bi/product-materials", json={
+        "business_type": "Bakery", "product_name": f"Product {i % 60}",
+    })
+
+
+def bi_sourcing_plan(session, base_url, i):
+    return session.post(f"{base_url}/api/bi/sourcing-plan", json={
+        "business_type": "Bakery", "product_name": f"Product {i % 60}",
+    })
+
+
+def gov_listings(session, base_url, i):
+    return session.get(f"{base_url}/api/marketplace/gov-listings")
+
+
+def save_plan_ads(session, base_url, i):
+    return session.post(f"{base_url}/api/save-plan-ads", json={
+        "user_id": f"bench-user-{i % 50}",
+        "plan_id": f"plan-{i % 10}",
+        "plan_name": "Bench Plan",
+        "ads": [AD, AD],
+    })
+
+
+SCENARIOS = {
+    "smartbiz-agent": smartbiz_agent,
+    "bi-research-cold": bi_research_cold,
+    "bi-research-cached": bi_research_cached,
+    "bi-product-materials": bi_product_materials,
+    "bi-sourcing-plan": bi_sourcing_plan,
+    "gov-listings": gov_listings,
+    "save-plan-ads": save_plan_ads,
+}
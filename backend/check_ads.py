@@ -3,17 +3,17 @@ Check saved ads in Supabase
 """
 import os
 from dotenv import load_dotenv
-from supabase import create_client
 
 # Load environment explicitly
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path, override=True)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+import supabase_db
 
 try:
-    client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    client = supabase_db.get_client()
+    if client is None:
+        raise RuntimeError("SUPABASE_URL or SUPABASE_SERVICE_KEY not set")
     
     # Get all ads
     response = client.table("plan_ads").select("*").order("created_at", desc=True).limit(5).execute()
@@ -12,6 +12,8 @@ from services.bi_service import (
     get_recipe_breakdown,
     get_business_products,
 )
+from services import pricing_simulator, supplier_index
+import supabase_db
 import logging
 
 logger = logging.getLogger(__name__)
@@ -101,7 +103,7 @@ def recipe_breakdown():
         if not business_type or not product_name:
             return jsonify({"success": False, "error": "business_type and product_name required"}), 400
 
-        result = get_recipe_breakdown(business_type, product_name)
+        result = get_recipe_breakdown(business_type, product_name, refresh=bool(data.get("refresh")))
         return jsonify({"success": True, "data": result})
 
     except Exception as e:
@@ -109,6 +111,69 @@ def recipe_breakdown():
         return jsonify({"success": False, "error": str(e), "fallback": True}), 500
 
 
+@bi_bp.route("/sourcing-plan", methods=["POST", "OPTIONS"])
+def sourcing_plan():
+    """Cheapest full sourcing plan for a product's BOM from supplier_materials."""
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+    try:
+        data = request.get_json() or {}
+        business_type = data.get("business_type", "")
+        product_name = data.get("product_name", "")
+
+        if not product_name:
+            return jsonify({"success": False, "error": "product_name is required"}), 400
+        try:
+            batch_size = int(data.get("batch_size", 100))
+        except (TypeError, ValueError, OverflowError):
+            batch_size = 0
+        if batch_size < 1:
+            return jsonify({"success": False, "error": "batch_size must be a positive integer"}), 400
+
+        plan = supplier_index.sourcing_plan(supabase_db.get_client(), product_name, business_type, batch_size)
+        if plan is None:
+            return jsonify({"success": False, "error": "No bill of materials for this product"}), 404
+        return jsonify({"success": True, "data": plan})
+
+    except Exception as e:
+        logger.error(f"sourcing-plan error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bi_bp.route("/pricing-simulation", methods=["POST", "OPTIONS"])
+def pricing_simulation():
+    """What-if pricing over a product's BOM — margin and break-even distributions, no LLM."""
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+    try:
+        data = request.get_json() or {}
+        product_name = data.get("product_name", "")
+
+        if not product_name:
+            return jsonify({"success": False, "error": "product_name is required"}), 400
+
+        result = pricing_simulator.simulate_product(
+            supabase_db.get_client(),
+            product_name,
+            data.get("business_type", ""),
+            price_range=data.get("price_range"),
+            volume_range=data.get("volume_range"),
+            material_shocks=data.get("material_shocks"),
+            fixed_costs=data.get("fixed_costs", 0),
+            scenarios=data.get("scenarios"),
+            seed=data.get("seed"),
+        )
+        if result is None:
+            return jsonify({"success": False, "error": "No bill of materials for this product"}), 404
+        return jsonify({"success": True, "data": result})
+
+    except pricing_simulator.SimulationError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"pricing-simulation error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @bi_bp.route("/product-list", methods=["POST", "OPTIONS"])
 def product_list():
     """Return business-specific products — replaces broken Supabase edge function."""
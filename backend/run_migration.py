@@ -5,21 +5,20 @@ This script creates the suppliers table and inserts dummy data
 
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
 
 # Load environment variables
 load_dotenv()
 
+import supabase_db
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
+# Shared client from the data-access module
+supabase = supabase_db.get_client()
+if supabase is None:
     print("ERROR: SUPABASE_URL or SUPABASE_SERVICE_KEY not found in .env")
     exit(1)
 
-# Create Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 print("✅ Connected to Supabase")
 print(f"URL: {SUPABASE_URL}")
 
@@ -0,0 +1,131 @@
+"""
+Artifact Store Service — persistent, content-addressed store for generated AI artifacts.
+An artifact (success guide, budget prediction, ad templates, recipe breakdown)
+is keyed by a hash of its normalised inputs, the prompt version and the model,
+so the same question is generated once and served from Supabase afterwards;
+bumping a prompt version or changing the model yields new keys and therefore
+fresh generations. The model in the key is the one that answered, which is
+the hedge model when a hedged request was won by the hedge. Callers pass refresh=True to regenerate and overwrite.
+Store errors never fail a request: a lookup or write that fails is logged
+and the artifact is generated as if it were missing.
+"""
+
+import hashlib
+import json
+import logging
+import re
+
+import supabase_db
+from services import metrics, value_parser
+from services.request_timing import span
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_LOOKUPS = metrics.Counter("artifact_store_lookups_total", "Stored artifact lookups by kind and result", ("kind", "result"))
+ARTIFACT_WRITE_ERRORS = metrics.Counter("artifact_store_write_errors_total", "Failed artifact writes", ("kind",))
+
+
+def _success_guide_row(inputs: dict, data: dict) -> dict:
+    return {
+        "business_type": inputs.get("business_type") or "General",
+        **{field: data.get(field) for field in (
+            "weekly_goals", "marketing_checklist", "cost_control_checklist", "growth_strategies", "export_readiness",
+        )},
+    }
+
+
+def _budget_prediction_row(inputs: dict, data: dict) -> dict:
+    amount = value_parser.parse_amount(data.get("predicted_budget"))
+    return {
+        "business_idea": inputs.get("idea", ""),
+        "predicted_budget": (amount["min"] if amount["min"] is not None else amount["max"]) if amount else 0,
+        "budget_breakdown": data.get("budget_breakdown") or {},
+    }
+
+
+def _advertisement_row(inputs: dict, data: dict) -> dict:
+    return {"business_type": inputs.get("business_type", "")}
+
+
+# kind -> (table, column holding the artifact, extra columns filled from inputs/data)
+KINDS = {
+    "success_guide": ("success_guides", "payload", _success_guide_row),
+    "budget_prediction": ("budget_predictions", "payload", _budget_prediction_row),
+    "advertisement_templates": ("advertisement_templates", "template_data", _advertisement_row),
+    "recipe_breakdown": ("ai_artifacts", "payload", None),
+}
+
+
+def _normalise(value):
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip().lower()
+    if isinstance(value, dict):
+        return {k: _normalise(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalise(v) for v in value]
+    return value
+
+
+def artifact_key(kind: str, inputs: dict, prompt_version: str, model: str) -> str:
+    material = json.dumps(
+        {"kind": kind, "inputs": _normalise(inputs), "prompt_version": prompt_version, "model": model},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def get(kind: str, key: str):
+    """Stored artifact for `key`, or None (also when the store is unavailable)."""
+    table, column, _ = KINDS[kind]
+    client = supabase_db.get_client()
+    if client is None:
+        return None
+    try:
+        with span("db", f"{table}.artifact"):
+            rows = client.table(table).select(column).eq("artifact_key", key).limit(1).execute().data or []
+    except Exception as e:
+        logger.warning(f"Artifact lookup failed ({kind}): {e}")
+        ARTIFACT_LOOKUPS.inc(kind=kind, result="error")
+        return None
+    artifact = rows[0].get(column) if rows else None
+    ARTIFACT_LOOKUPS.inc(kind=kind, result="hit" if artifact else "miss")
+    return artifact
+
+
+def put(kind: str, key: str, inputs: dict, data, prompt_version: str, model: str):
+    table, column, extra_columns = KINDS[kind]
+    client = supabase_db.get_client()
+    if client is None:
+        return
+    row = {"artifact_key": key, "prompt_version": prompt_version, "model": model, column: data}
+    if extra_columns is None:
+        row.update(kind=kind, inputs=inputs)
+    else:
+        row.update(extra_columns(inputs, data))
+    try:
+        with span("db", f"{table}.artifact_upsert"):
+            client.table(table).upsert(row, on_conflict="artifact_key").execute()
+    except Exception as e:
+        logger.warning(f"Artifact write failed ({kind}): {e}")
+        ARTIFACT_WRITE_ERRORS.inc(kind=kind)
+
+
+def get_or_generate(kind: str, inputs: dict, generate, prompt_version: str, models: tuple, refresh: bool = False):
+    """
+    Serve the stored artifact for these inputs from any of `models` (preferred
+    first, see model_router.answering_models), or call generate() and store its
+    result. generate() returns (data, model that answered); the artifact is
+    stored under that model. Exceptions from generate() propagate; nothing is
+    stored then.
+    """
+    if refresh:
+        ARTIFACT_LOOKUPS.inc(kind=kind, result="refresh")
+    else:
+        for model in models:
+            stored = get(kind, artifact_key(kind, inputs, prompt_version, model))
+            if stored:
+                return stored
+    data, model = generate()
+    if data:
+        put(kind, artifact_key(kind, inputs, prompt_version, model), inputs, data, prompt_version, model)
+    return data
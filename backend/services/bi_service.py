@@ -4,85 +4,132 @@ raw material analysis, and food recipe breakdown.
 All functions are pure helpers called by bi_routes.py Blueprint.
 """
 
+import hashlib
 import json
+import os
 import time
 import logging
-from openai import OpenAI
-import os
+
+from services import artifact_store, bom_costing, llm, model_router, normalise, prompts, supplier_index, value_parser
+from services.structured_output import Schema, StructuredOutputError
+import supabase_db
 
 logger = logging.getLogger(__name__)
 
-# In-process cache — keyed by "endpoint:key", value = (timestamp, data)
+# In-process cache — keyed by "endpoint:prompt version:inputs", value = (expires_at, data).
+# The prompt version (services/prompts.py) changes whenever the prompt text does;
+# inputs are in canonical form (services/normalise.py) so spelling variants share entries.
 _CACHE: dict = {}
-CACHE_TTL_SECONDS = 3600  # 1 hour
+CACHE_TTL_SECONDS = int(os.getenv("BI_CACHE_TTL_SECONDS", "3600"))  # 1 hour
+# Fallbacks (LLM failed or refused by the limiter) are only kept briefly so
+# real answers return soon after the provider recovers
+FALLBACK_TTL_SECONDS = 60
+# Optional file-backed second level, shared by all workers on the host and by
+# the warm-up job (services/cache_warmup.py); "" keeps the cache in memory only
+CACHE_DIR = os.getenv("BI_CACHE_DIR", "")
 
 
-def _cache_get(key: str):
-    entry = _CACHE.get(key)
-    if entry and (time.time() - entry[0]) < CACHE_TTL_SECONDS:
-        logger.info(f"BI cache HIT for key: {key}")
-        return entry[1]
-    return None
+def _disk_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
 
 
-def _cache_set(key: str, data):
-    _CACHE[key] = (time.time(), data)
+def _disk_get(key: str):
+    try:
+        with open(_disk_path(key), encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable BI cache file for {key}: {e}")
+        return None
+    if entry.get("key") != key or time.time() >= entry.get("expires_at", 0):
+        return None
+    return entry["expires_at"], entry["data"]
 
 
-def _get_openrouter_client() -> OpenAI:
-    return OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=os.getenv("OPENROUTER_API_KEY"),
-    )
+def _disk_set(key: str, expires_at: float, data):
+    path = _disk_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "expires_at": expires_at, "data": data}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"Could not write BI cache file for {key}: {e}")
 
 
-MODEL = "meta-llama/llama-3.1-8b-instruct"
+def _cache_get(key: str):
+    endpoint = _CACHE_ENDPOINTS.get(key.split(":", 1)[0], "bi")
+    entry = _CACHE.get(key)
+    if not (entry and time.time() < entry[0]) and CACHE_DIR:
+        entry = _disk_get(key)
+        if entry:
+            _CACHE[key] = entry
+    if entry and time.time() < entry[0]:
+        logger.info(f"BI cache HIT for key: {key}")
+        llm.record_cache(endpoint, hit=True)
+        return entry[1]
+    llm.record_cache(endpoint, hit=False)
+    return None
 
 
-def _call_ai(prompt: str, context: str = "") -> dict:
-    """Call AI with graceful degradation — never raises."""
+def _cache_set(key: str, data):
+    # Typed "<field>_value" siblings are parsed once here and cached with the result
+    ttl = FALLBACK_TTL_SECONDS if isinstance(data, dict) and data.get("_fallback") else CACHE_TTL_SECONDS
+    entry = _CACHE[key] = (time.time() + ttl, value_parser.attach_numeric_fields(data))
+    if CACHE_DIR:
+        _disk_set(key, *entry)
+
+
+PRODUCTS_SCHEMA = Schema("bi.products", required=["products"], fields={"products": list})
+RESEARCH_SCHEMA = Schema("bi.research", required=["demand_level", "investment_range"], fields={"top_products": list})
+SUPPLIERS_SCHEMA = Schema("bi.suppliers", required=["suppliers"], fields={"suppliers": list})
+MATERIALS_SCHEMA = Schema("bi.materials", required=["materials"], fields={"materials": list})
+RECIPE_SCHEMA = Schema("bi.recipe", required=["steps", "ingredients"], fields={"steps": list, "ingredients": list})
+
+# Cache key prefix -> endpoint name used in metrics
+_CACHE_ENDPOINTS = {
+    "bizproducts": PRODUCTS_SCHEMA.name,
+    "product": RESEARCH_SCHEMA.name,
+    "suppliers": SUPPLIERS_SCHEMA.name,
+    "materials": MATERIALS_SCHEMA.name,
+    "recipe": RECIPE_SCHEMA.name,
+}
+
+
+def _call_ai(prompt: str, context: str = "", schema: Schema = None, with_model: bool = False):
+    """Call AI with graceful degradation — never raises. with_model=True returns (data, model), (None, None) on failure."""
+    messages = []
+    if context:
+        messages.append({"role": "system", "content": context})
+    messages.append({"role": "user", "content": prompt})
     try:
-        client = _get_openrouter_client()
-        messages = []
-        if context:
-            messages.append({"role": "system", "content": context})
-        messages.append({"role": "user", "content": prompt})
-        
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=messages,
+        return llm.chat_json(
+            messages,
+            schema,
+            endpoint=schema.name if schema else "bi",
             temperature=0.4,
             max_tokens=1800,
+            with_model=with_model,
         )
-        raw = response.choices[0].message.content.strip()
-        
-        # Extract JSON from response
-        if "```json" in raw:
-            raw = raw.split("```json")[1].split("```")[0].strip()
-        elif "```" in raw:
-            raw = raw.split("```")[1].split("```")[0].strip()
-        
-        return json.loads(raw)
-    except json.JSONDecodeError as e:
+    except StructuredOutputError as e:
         logger.error(f"AI JSON parse error: {e}")
-        return None
     except Exception as e:
         logger.error(f"AI call failed: {e}")
-        return None
+    return (None, None) if with_model else None
+
 
+def _rupees(amount: float) -> str:
+    return f"₹{amount:,.2f}"
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 0. BUSINESS-SPECIFIC PRODUCT LIST
 # ─────────────────────────────────────────────────────────────────────────────
-def get_business_products(business_name: str) -> dict:
-    """Generate a list of realistic products for a given business type."""
-    cache_key = f"bizproducts:{business_name}"
-    cached = _cache_get(cache_key)
-    if cached:
-        return cached
-
-    prompt = f"""
+PRODUCTS_PROMPT = prompts.register(
+    PRODUCTS_SCHEMA.name,
+    """
 You are a business consultant. Generate a list of 8-10 specific, realistic products/services that a "{business_name}" business would sell in India.
 
 Important rules:
@@ -108,39 +155,60 @@ Return ONLY valid JSON:
 }}
 
 Business: {business_name}
-"""
-    result = _call_ai(prompt, "You are a business consultant specializing in Indian SME markets.")
+""",
+    system="You are a business consultant specializing in Indian SME markets.",
+)
+
+
+def get_business_products(business_name: str) -> dict:
+    """Generate a list of realistic products for a given business type."""
+    PRODUCTS_PROMPT.track(business_name=business_name)
+    cache_key = f"bizproducts:{PRODUCTS_PROMPT.version}:{normalise.business_type(business_name)}"
+    cached = _cache_get(cache_key)
+    if cached:
+        return cached
+
+    prompt = PRODUCTS_PROMPT.render(business_name=business_name)
+    result = _call_ai(prompt, PRODUCTS_PROMPT.system, PRODUCTS_SCHEMA)
 
     if not result or "products" not in result:
         # Sensible fallback based on business name keywords
+        llm.record_fallback(PRODUCTS_SCHEMA.name)
         result = _generate_fallback_products(business_name)
 
     _cache_set(cache_key, result)
     return result
 
 
+# Our most common business categories: (typical business name, name keywords, (product, price) list).
+# Also the default list of popular pairs for services/cache_warmup.py.
+FALLBACK_CATALOGUE = [
+    ("Tea Stall", ["tea", "chai", "coffee", "cafe"],
+     [("Masala Chai", 15), ("Cutting Chai", 10), ("Special Tea", 25), ("Cold Coffee", 60), ("Lemon Tea", 20)]),
+    ("Bakery", ["bakery", "bread", "cake", "sweet", "mithai"],
+     [("Fresh Bread Loaf", 35), ("Pav (6 pcs)", 20), ("Birthday Cake", 450), ("Kaju Katli (250g)", 180), ("Gulab Jamun (12 pcs)", 80)]),
+    ("Restaurant", ["restaurant", "dhaba", "food", "tiffin", "meal"],
+     [("Thali (Full)", 120), ("Roti + Sabzi", 60), ("Dal Rice", 80), ("Paneer Dish", 150), ("Biryani Bowl", 130)]),
+    ("Clothing Store", ["cloth", "garment", "fashion", "textile", "saree"],
+     [("Cotton T-Shirt", 250), ("Formal Shirt", 450), ("Saree", 800), ("Kurta", 350), ("Jeans", 600)]),
+    ("Vegetable Shop", ["vegetable", "fruit", "sabzi", "kirana", "grocery"],
+     [("Mixed Vegetables (1kg)", 40), ("Tomatoes (1kg)", 35), ("Onions (1kg)", 30), ("Potatoes (1kg)", 25), ("Fresh Fruits Basket", 150)]),
+    ("Mobile Repair Shop", ["mobile", "phone", "electronic", "repair"],
+     [("Screen Replacement", 800), ("Battery Replacement", 400), ("Phone Cover", 150), ("Charging Cable", 200), ("Earphones", 350)]),
+    ("Beauty Salon", ["beauty", "salon", "parlour", "hair"],
+     [("Haircut (Men)", 100), ("Haircut (Women)", 250), ("Facial", 400), ("Hair Colour", 600), ("Manicure", 300)]),
+    ("Auto Service Centre", ["auto", "bike", "vehicle", "service"],
+     [("Oil Change", 300), ("Tyre Puncture", 50), ("Engine Wash", 200), ("Brake Service", 500), ("Full Service", 1500)]),
+]
+
+
 def _generate_fallback_products(business_name: str) -> dict:
     """Generate basic fallback products based on business name keywords."""
     bn = business_name.lower()
     products = []
 
-    if any(k in bn for k in ["tea", "chai", "coffee", "cafe"]):
-        items = [("Masala Chai", 15), ("Cutting Chai", 10), ("Special Tea", 25), ("Cold Coffee", 60), ("Lemon Tea", 20)]
-    elif any(k in bn for k in ["bakery", "bread", "cake", "sweet", "mithai"]):
-        items = [("Fresh Bread Loaf", 35), ("Pav (6 pcs)", 20), ("Birthday Cake", 450), ("Kaju Katli (250g)", 180), ("Gulab Jamun (12 pcs)", 80)]
-    elif any(k in bn for k in ["restaurant", "dhaba", "food", "tiffin", "meal"]):
-        items = [("Thali (Full)", 120), ("Roti + Sabzi", 60), ("Dal Rice", 80), ("Paneer Dish", 150), ("Biryani Bowl", 130)]
-    elif any(k in bn for k in ["cloth", "garment", "fashion", "textile", "saree"]):
-        items = [("Cotton T-Shirt", 250), ("Formal Shirt", 450), ("Saree", 800), ("Kurta", 350), ("Jeans", 600)]
-    elif any(k in bn for k in ["vegetable", "fruit", "sabzi", "kirana", "grocery"]):
-        items = [("Mixed Vegetables (1kg)", 40), ("Tomatoes (1kg)", 35), ("Onions (1kg)", 30), ("Potatoes (1kg)", 25), ("Fresh Fruits Basket", 150)]
-    elif any(k in bn for k in ["mobile", "phone", "electronic", "repair"]):
-        items = [("Screen Replacement", 800), ("Battery Replacement", 400), ("Phone Cover", 150), ("Charging Cable", 200), ("Earphones", 350)]
-    elif any(k in bn for k in ["beauty", "salon", "parlour", "hair"]):
-        items = [("Haircut (Men)", 100), ("Haircut (Women)", 250), ("Facial", 400), ("Hair Colour", 600), ("Manicure", 300)]
-    elif any(k in bn for k in ["auto", "bike", "vehicle", "service"]):
-        items = [("Oil Change", 300), ("Tyre Puncture", 50), ("Engine Wash", 200), ("Brake Service", 500), ("Full Service", 1500)]
-    else:
+    items = next((items for _, keywords, items in FALLBACK_CATALOGUE if any(k in bn for k in keywords)), None)
+    if items is None:
         items = [
             (f"{business_name} Basic Package", 500),
             (f"{business_name} Premium Package", 1200),
@@ -159,17 +227,13 @@ def _generate_fallback_products(business_name: str) -> dict:
 # ─────────────────────────────────────────────────────────────────────────────
 # 1. PRODUCT RESEARCH
 # ─────────────────────────────────────────────────────────────────────────────
-def research_product_intelligence(business_type: str, product_name: str = "") -> dict:
-    cache_key = f"product:{business_type}:{product_name}"
-    cached = _cache_get(cache_key)
-    if cached:
-        return cached
-
-    prompt = f"""
+RESEARCH_PROMPT = prompts.register(
+    RESEARCH_SCHEMA.name,
+    """
 You are a market research analyst. Analyze the business/product below and return a JSON object.
 
 Business Type: {business_type}
-Product (if specified): {product_name or "general products in this category"}
+Product (if specified): {product_name}
 
 Return ONLY valid JSON:
 {{
@@ -193,10 +257,23 @@ Return ONLY valid JSON:
     }}
   ]
 }}
-"""
-    result = _call_ai(prompt, "You are a professional market research analyst.")
+""",
+    system="You are a professional market research analyst.",
+)
+
+
+def research_product_intelligence(business_type: str, product_name: str = "") -> dict:
+    RESEARCH_PROMPT.track(business_type=business_type, product_name=product_name)
+    cache_key = f"product:{RESEARCH_PROMPT.version}:{normalise.business_type(business_type)}:{normalise.product_name(product_name)}"
+    cached = _cache_get(cache_key)
+    if cached:
+        return cached
+
+    prompt = RESEARCH_PROMPT.render(business_type=business_type, product_name=product_name or "general products in this category")
+    result = _call_ai(prompt, RESEARCH_PROMPT.system, RESEARCH_SCHEMA)
     
     if not result:
+        llm.record_fallback(RESEARCH_SCHEMA.name)
         result = {
             "demand_level": "Medium",
             "demand_trend": "Stable",
@@ -218,18 +295,55 @@ Return ONLY valid JSON:
 # ─────────────────────────────────────────────────────────────────────────────
 # 2. ENRICHED SUPPLIERS
 # ─────────────────────────────────────────────────────────────────────────────
-def get_enriched_suppliers(business_type: str, product_name: str, city: str = "India") -> dict:
-    cache_key = f"suppliers:{business_type}:{product_name}:{city}"
-    cached = _cache_get(cache_key)
-    if cached:
-        return cached
-
-    prompt = f"""
+def _suppliers_from_plan(plan: dict) -> dict:
+    """Shape the DB sourcing plan like the AI supplier response."""
+    supplied: dict = {}
+    for line in plan["lines"]:
+        if line["supplier"]:
+            supplied.setdefault(line["supplier"]["supplier_id"], []).append(line)
+
+    suppliers = []
+    for lines in supplied.values():
+        supplier = lines[0]["supplier"]
+        suppliers.append({
+            "name": supplier["name"],
+            "country": "India",
+            "city": ", ".join(filter(None, [supplier.get("district"), supplier.get("state")])),
+            "email": supplier.get("email") or "",
+            "phone": supplier.get("phone") or "",
+            "moq": "Contact supplier",
+            "approx_cost": "; ".join(f"{_rupees(line['price'])} per {line['unit']} ({line['material']})" for line in lines),
+            "rating": 0.0,  # not tracked in the database
+            "export_capable": False,
+            "website": "",
+            "specialization": ", ".join(line["material"] for line in lines),
+            "delivery_time": "Contact supplier",
+            "payment_terms": "Contact supplier",
+            "pros": ["Registered MSME supplier"] + (["Primary supplier"] if supplier.get("is_primary_supplier") else []),
+            "cons": [],
+            "verified": True,
+        })
+
+    tips = f"Cheapest full sourcing plan: {_rupees(plan['plan_cost_per_batch'])} per {plan['batch_size']} units."
+    if plan["unsourced_materials"]:
+        tips += f" No listed supplier yet for: {', '.join(plan['unsourced_materials'])}."
+    return {
+        "suppliers": suppliers,
+        "alternative_countries": [],
+        "sourcing_tips": tips,
+        "sourcing_plan": plan,
+        "_source": "supplier_materials",
+    }
+
+
+SUPPLIERS_PROMPT = prompts.register(
+    SUPPLIERS_SCHEMA.name,
+    """
 You are a supply chain consultant. Find realistic verified suppliers for:
 
 Business Type: {business_type}
 Product: {product_name}
-Location preference: {city or "India"}
+Location preference: {city}
 
 Return ONLY valid JSON:
 {{
@@ -258,10 +372,29 @@ Return ONLY valid JSON:
 }}
 
 Include 5-7 diverse suppliers (mix of local, pan-India, and international where relevant).
-"""
-    result = _call_ai(prompt, "You are a professional supply chain consultant for Indian SMEs.")
+""",
+    system="You are a professional supply chain consultant for Indian SMEs.",
+)
+
+
+def get_enriched_suppliers(business_type: str, product_name: str, city: str = "India") -> dict:
+    SUPPLIERS_PROMPT.track(business_type=business_type, product_name=product_name, city=city)
+    cache_key = f"suppliers:{SUPPLIERS_PROMPT.version}:{normalise.business_type(business_type)}:{normalise.product_name(product_name)}:{normalise.city(city)}"
+    cached = _cache_get(cache_key)
+    if cached:
+        return cached
+
+    plan = supplier_index.sourcing_plan(supabase_db.get_client(), product_name, business_type)
+    if plan and plan["suppliers"]:
+        result = _suppliers_from_plan(plan)
+        _cache_set(cache_key, result)
+        return result
+
+    prompt = SUPPLIERS_PROMPT.render(business_type=business_type, product_name=product_name, city=city or "India")
+    result = _call_ai(prompt, SUPPLIERS_PROMPT.system, SUPPLIERS_SCHEMA)
 
     if not result:
+        llm.record_fallback(SUPPLIERS_SCHEMA.name)
         result = {
             "suppliers": [
                 {
@@ -295,13 +428,31 @@ Include 5-7 diverse suppliers (mix of local, pan-India, and international where
 # ─────────────────────────────────────────────────────────────────────────────
 # 3. PRODUCT-SPECIFIC RAW MATERIALS
 # ─────────────────────────────────────────────────────────────────────────────
-def get_product_materials(business_type: str, product_name: str) -> dict:
-    cache_key = f"materials:{business_type}:{product_name}"
-    cached = _cache_get(cache_key)
-    if cached:
-        return cached
-
-    prompt = f"""
+def _materials_from_bom(costing: dict) -> dict:
+    """Shape a BOM costing like the AI materials response, plus exact numbers."""
+    batch = costing["batch_size"]
+    materials = [
+        {
+            "name": line["name"],
+            "quantity_per_100_units": f"{line['quantity_per_batch']:g} {line['unit']} per {batch} units",
+            "cost_estimate": f"{_rupees(line['price_per_unit'])} per {line['unit']}",
+            "supplier_source": line.get("category") or "Local wholesale market",
+        }
+        for line in costing["materials"]
+    ]
+    critical = max(costing["materials"], key=lambda line: line["cost_per_unit"])
+    return {
+        "materials": materials,
+        "total_material_cost_per_100_units": _rupees(costing["batch_cost"]),
+        "critical_material": critical["name"],
+        "costing": costing,
+        "_source": "bom",
+    }
+
+
+MATERIALS_PROMPT = prompts.register(
+    MATERIALS_SCHEMA.name,
+    """
 You are a manufacturing consultant. List the raw materials needed for:
 
 Business Type: {business_type}
@@ -323,10 +474,29 @@ Return ONLY valid JSON:
   "total_material_cost_per_100_units": "₹2,000-₹5,000",
   "critical_material": "Name of the most critical/expensive material"
 }}
-"""
-    result = _call_ai(prompt, "You are a manufacturing and procurement consultant.")
+""",
+    system="You are a manufacturing and procurement consultant.",
+)
+
+
+def get_product_materials(business_type: str, product_name: str) -> dict:
+    MATERIALS_PROMPT.track(business_type=business_type, product_name=product_name)
+    cache_key = f"materials:{MATERIALS_PROMPT.version}:{normalise.business_type(business_type)}:{normalise.product_name(product_name)}"
+    cached = _cache_get(cache_key)
+    if cached:
+        return cached
+
+    costing = bom_costing.cost_product(supabase_db.get_client(), product_name, business_type)
+    if costing:
+        result = _materials_from_bom(costing)
+        _cache_set(cache_key, result)
+        return result
+
+    prompt = MATERIALS_PROMPT.render(business_type=business_type, product_name=product_name)
+    result = _call_ai(prompt, MATERIALS_PROMPT.system, MATERIALS_SCHEMA)
 
     if not result:
+        llm.record_fallback(MATERIALS_SCHEMA.name)
         result = {
             "materials": [],
             "total_material_cost_per_100_units": "Contact local suppliers for pricing",
@@ -341,13 +511,48 @@ Return ONLY valid JSON:
 # ─────────────────────────────────────────────────────────────────────────────
 # 4. PROCESS / PRODUCTION BREAKDOWN (ALL BUSINESS TYPES)
 # ─────────────────────────────────────────────────────────────────────────────
-def get_recipe_breakdown(business_type: str, product_name: str) -> dict:
-    cache_key = f"recipe:{business_type}:{product_name}"
-    cached = _cache_get(cache_key)
-    if cached:
-        return cached
+def _recipe_from_bom(costing: dict) -> dict:
+    """
+    Ingredients and money computed from the BOM — no invented numbers. Process
+    fields (steps, times, checklist) are not in the BOM; get_recipe_breakdown()
+    merges these over the AI breakdown, which supplies them. Without a known
+    selling price the price and profit keys are absent: see _BOM_PRICE_KEYS.
+    """
+    batch = costing["batch_size"]
+    unit_cost = costing["unit_cost"]
+    result = {
+        "is_food_product": True,
+        "recipe_name": costing["product_name"],
+        "batch_size": f"{batch} units",
+        "ingredients": [
+            {
+                "name": line["name"],
+                "quantity": f"{line['quantity_per_batch']:g} {line['unit']}",
+                "cost": _rupees(line["cost_per_batch"]),
+                "source": line.get("category") or "Local wholesale market",
+            }
+            for line in costing["materials"]
+        ],
+        "cost_per_unit": _rupees(unit_cost),
+        "costing": costing,
+        "_source": "bom",
+    }
+    selling_price = costing.get("selling_price")
+    if selling_price:
+        profit = selling_price - unit_cost
+        result["selling_price_per_unit"] = _rupees(selling_price)
+        result["profit_per_unit"] = _rupees(profit)
+        result["profit_margin"] = f"{profit / selling_price * 100:.1f}%"
+    return result
+
+
+# AI-invented money figures that must not sit next to a BOM cost they were not derived from
+_BOM_PRICE_KEYS = ("selling_price_per_unit", "profit_per_unit", "profit_margin")
 
-    prompt = f"""
+
+RECIPE_PROMPT = prompts.register(
+    RECIPE_SCHEMA.name,
+    """
 You are a business operations consultant. Provide a detailed production/process breakdown for:
 
 Business Type: {business_type}
@@ -395,10 +600,35 @@ Return ONLY valid JSON:
 }}
 
 Always set is_food_product to true so the UI renders the process tab for all business types.
-"""
-    result = _call_ai(prompt, "You are a professional business operations and production consultant.")
+""",
+    system="You are a professional business operations and production consultant.",
+)
+
+
+def get_recipe_breakdown(business_type: str, product_name: str, refresh: bool = False) -> dict:
+    """
+    AI breakdown kept in the artifact store; when the product has a bill of
+    materials its ingredients and costs replace the AI's estimates and the
+    steps stay. refresh=True regenerates the AI breakdown.
+    """
+    RECIPE_PROMPT.track(business_type=business_type, product_name=product_name)
+    cache_key = f"recipe:{RECIPE_PROMPT.version}:{normalise.business_type(business_type)}:{normalise.product_name(product_name)}"
+    cached = None if refresh else _cache_get(cache_key)
+    if cached:
+        return cached
+
+    prompt = RECIPE_PROMPT.render(business_type=business_type, product_name=product_name)
+    result = artifact_store.get_or_generate(
+        "recipe_breakdown",
+        {"business_type": normalise.business_type(business_type), "product_name": normalise.product_name(product_name)},
+        lambda: _call_ai(prompt, RECIPE_PROMPT.system, RECIPE_SCHEMA, with_model=True),
+        prompt_version=RECIPE_PROMPT.version,
+        models=model_router.answering_models(RECIPE_SCHEMA.name),
+        refresh=refresh,
+    )
 
     if not result:
+        llm.record_fallback(RECIPE_SCHEMA.name)
         result = {
             "is_food_product": True,
             "recipe_name": product_name,
@@ -407,8 +637,22 @@ Always set is_food_product to true so the UI renders the process tab for all bus
             "_fallback": True,
         }
 
+    costing = bom_costing.cost_product(supabase_db.get_client(), product_name, business_type)
+    if costing:
+        # The BOM supplies the cost, so the result is not a fallback even if the AI failed
+        result = {key: value for key, value in result.items() if key not in _BOM_PRICE_KEYS and key != "_fallback"}
+        result.update(_recipe_from_bom(costing))
+
     # Always force is_food_product=True so UI shows the tab for all businesses
     result["is_food_product"] = True
 
     _cache_set(cache_key, result)
     return result
+
+
+# After a prompt edit, prompts.warm_changed() re-runs these for the most requested inputs
+prompts.set_warmer(PRODUCTS_PROMPT.name, get_business_products)
+prompts.set_warmer(RESEARCH_PROMPT.name, research_product_intelligence)
+prompts.set_warmer(SUPPLIERS_PROMPT.name, get_enriched_suppliers)
+prompts.set_warmer(MATERIALS_PROMPT.name, get_product_materials)
+prompts.set_warmer(RECIPE_PROMPT.name, get_recipe_breakdown)
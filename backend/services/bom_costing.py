@@ -0,0 +1,195 @@
+"""
+BOM Costing Engine — material cost of products from the real bills of
+materials in products / raw_materials / product_materials.
+BOMs are loaded in bulk into compact coordinate arrays (product row,
+material column, quantity) and every product's unit cost is computed at load
+time with one vectorised multiply-accumulate over the BOM matrix.
+"""
+
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+
+from services import normalise
+from supabase_db import fetch_all_rows
+
+logger = logging.getLogger(__name__)
+
+BOM_TTL_SECONDS = 600
+RETRY_AFTER_FAILURE_SECONDS = 60
+DEFAULT_BATCH_SIZE = 100
+# Words that say nothing about which business a product belongs to
+_GENERIC_BUSINESS_WORDS = {"shop", "and", "centre", "service", "business"}
+
+
+def normalise_name(name: str) -> str:
+    """'White Bread (400g)' -> 'white bread' — drops pack-size notes and punctuation."""
+    name = re.sub(r"\([^)]*\)", " ", (name or "").lower())
+    return " ".join(re.sub(r"[^a-z0-9ऀ-ॿ]+", " ", name).split())
+
+
+def _business_words(business_type: str) -> frozenset:
+    """Distinguishing words of a business type: 'Chai ki Dukaan' -> {'tea'}."""
+    return frozenset(normalise.business_type(business_type).split()) - _GENERIC_BUSINESS_WORDS
+
+
+class BomEngine:
+    """Immutable snapshot of all BOMs; rebuilt wholesale on reload."""
+
+    def __init__(self, businesses: list, products: list, materials: list, bom_rows: list):
+        business_names = {b["id"]: b.get("name", "") for b in businesses}
+
+        self.materials = materials
+        self.material_col = {m["id"]: i for i, m in enumerate(materials)}
+        self.prices = np.array([float(m.get("avg_cost_per_unit") or 0.0) for m in materials], dtype=np.float64)
+
+        self.products = products
+        self.product_row = {p["id"]: i for i, p in enumerate(products)}
+        self.business_of = [_business_words(business_names.get(p.get("business_id"), "")) for p in products]
+        self.selling_prices = np.array([float(p.get("avg_selling_price") or 0.0) for p in products], dtype=np.float64)
+
+        self.by_name: dict = {}
+        self.name_words: list = []
+        for i, p in enumerate(products):
+            name = normalise_name(p.get("name"))
+            self.by_name.setdefault(name, []).append(i)
+            self.name_words.append(frozenset(name.split()))
+
+        # Coordinate-format BOM matrix: entry k means product rows[k] needs qty[k] of material cols[k]
+        entries = [
+            (self.product_row[r["product_id"]], self.material_col[r["material_id"]], float(r.get("quantity_required") or 0.0))
+            for r in bom_rows
+            if r.get("product_id") in self.product_row and r.get("material_id") in self.material_col
+        ]
+        entries.sort()
+        self.rows = np.array([e[0] for e in entries], dtype=np.int32)
+        self.cols = np.array([e[1] for e in entries], dtype=np.int32)
+        self.qty = np.array([e[2] for e in entries], dtype=np.float64)
+        # Start offset of each product's entries (rows is sorted)
+        self.row_start = np.searchsorted(self.rows, np.arange(len(products) + 1))
+
+        self.unit_costs = self.compute_unit_costs(self.prices)
+
+    def compute_unit_costs(self, prices: np.ndarray) -> np.ndarray:
+        """Unit material cost of every product for the given material price vector."""
+        return np.bincount(self.rows, weights=self.qty * prices[self.cols], minlength=len(self.products))
+
+    def has_bom(self, row: int) -> bool:
+        return self.row_start[row + 1] > self.row_start[row]
+
+    def find_product(self, product_name: str, business_type: str = ""):
+        """
+        Return the product row for a name, or None when there is no single
+        confident match (callers then fall back to the LLM). An exact
+        normalised name wins, preferring products of the matching business;
+        otherwise a whole-word match is tried among that business's products
+        only ("Birthday Cake" for "Cake" under Bakery, never "Vada Pav" for
+        "Pav"). Several equally good candidates count as no match.
+        """
+        key = normalise_name(product_name)
+        if not key:
+            return None
+        business = _business_words(business_type)
+
+        def of_business(rows):
+            return [i for i in rows if business and business & self.business_of[i]]
+
+        exact = [i for i in self.by_name.get(key, ()) if self.has_bom(i)]
+        if exact:
+            scoped = of_business(exact) or exact
+            return scoped[0] if len(scoped) == 1 else None
+
+        if not business:
+            return None
+        words = frozenset(key.split())
+        partial = of_business(
+            i for i, name_words in enumerate(self.name_words)
+            if self.has_bom(i) and (words <= name_words or name_words <= words)
+        )
+        return partial[0] if len(partial) == 1 else None
+
+    def bom_lines(self, row: int):
+        """(material columns, quantities per unit) for a product."""
+        start, stop = self.row_start[row], self.row_start[row + 1]
+        return self.cols[start:stop], self.qty[start:stop]
+
+    def cost(self, row: int, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+        cols, qty = self.bom_lines(row)
+        line_costs = qty * self.prices[cols]
+        unit_cost = float(self.unit_costs[row])
+        product = self.products[row]
+
+        lines = []
+        for col, q, line_cost in zip(cols.tolist(), qty.tolist(), line_costs.tolist()):
+            material = self.materials[col]
+            lines.append({
+                "material_id": material["id"],
+                "name": material.get("name"),
+                "unit": material.get("unit"),
+                "category": material.get("category"),
+                "quantity_per_unit": q,
+                "quantity_per_batch": q * batch_size,
+                "price_per_unit": float(self.prices[col]),
+                "cost_per_unit": line_cost,
+                "cost_per_batch": line_cost * batch_size,
+                "cost_share": (line_cost / unit_cost) if unit_cost else 0.0,
+            })
+
+        return {
+            "product_id": product["id"],
+            "product_name": product.get("name"),
+            "batch_size": batch_size,
+            "unit_cost": unit_cost,
+            "batch_cost": unit_cost * batch_size,
+            "selling_price": float(self.selling_prices[row]) or None,
+            "materials": lines,
+        }
+
+
+_engine = None
+_next_load_at = 0.0
+_lock = threading.Lock()
+
+
+def load(client) -> BomEngine:
+    """Bulk-load every BOM table and swap in a fresh engine."""
+    global _engine, _next_load_at
+    engine = BomEngine(
+        fetch_all_rows(client, "business_definitions", "id, name"),
+        fetch_all_rows(client, "products", "id, business_id, name, avg_selling_price"),
+        fetch_all_rows(client, "raw_materials", "id, name, unit, avg_cost_per_unit, category"),
+        fetch_all_rows(client, "product_materials", "product_id, material_id, quantity_required"),
+    )
+    _engine, _next_load_at = engine, time.time() + BOM_TTL_SECONDS
+    logger.info(f"BOM engine loaded ({len(engine.products)} products, {len(engine.materials)} materials, {len(engine.qty)} BOM lines)")
+    return engine
+
+
+def get_engine(client):
+    """Return the current engine, reloading after the TTL. None if the DB is unavailable."""
+    global _next_load_at
+    if client is None:
+        return _engine
+    if time.time() >= _next_load_at:
+        with _lock:
+            if time.time() >= _next_load_at:
+                try:
+                    load(client)
+                except Exception as e:
+                    _next_load_at = time.time() + RETRY_AFTER_FAILURE_SECONDS
+                    logger.error(f"BOM engine load failed: {e}")
+    return _engine
+
+
+def cost_product(client, product_name: str, business_type: str = "", batch_size: int = DEFAULT_BATCH_SIZE):
+    """Material costing for a product, or None when it has no BOM."""
+    engine = get_engine(client)
+    if engine is None:
+        return None
+    row = engine.find_product(product_name, business_type)
+    if row is None:
+        return None
+    return engine.cost(row, batch_size)
@@ -0,0 +1,95 @@
+"""
+Cache Warm-up Service — precomputes BI results for popular business / product pairs.
+After a deploy the BI caches are cold and the first users of "tea stall" or
+"bakery" wait on several sequential LLM calls. run() computes
+get_business_products, research_product_intelligence and get_recipe_breakdown
+for a list of pairs on a bounded worker pool, and every LLM call it makes also
+draws from the job's own requests-per-minute budget, so live traffic keeps the
+rest of the provider limit. Results land in the BI cache; only its
+file-backed level (BI_CACHE_DIR) is shared with other processes, so the
+standalone job requires BI_CACHE_DIR; the startup run (BI_WARM_ON_START)
+also fills the memory cache of the worker it runs in.
+
+    BI_WARM_PAIRS          "Tea Stall:Masala Chai|Cutting Chai;Bakery:Birthday Cake"
+                           (default: the categories in bi_service.FALLBACK_CATALOGUE)
+    BI_WARM_PRODUCTS       products per business taken from the default catalogue (3)
+    BI_WARM_CONCURRENCY    worker threads (4)
+    BI_WARM_RPM            LLM requests per minute for the whole job (20)
+    BI_WARM_ON_START       also run in the background at app startup (false)
+
+As a job: python warm_cache.py [--pairs ...] [--concurrency N] [--rpm N]
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services import bi_service, llm_limiter
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS_PER_BUSINESS = int(os.getenv("BI_WARM_PRODUCTS", "3"))
+CONCURRENCY = int(os.getenv("BI_WARM_CONCURRENCY", "4"))
+RPM = float(os.getenv("BI_WARM_RPM", "20"))
+WARM_ON_START = os.getenv("BI_WARM_ON_START", "false").lower() == "true"
+
+
+def parse_pairs(spec: str) -> list:
+    """'Business:Product A|Product B;Other:...' -> [(business, [products])]."""
+    pairs = []
+    for item in spec.split(";"):
+        business, _, products = item.partition(":")
+        if business.strip():
+            pairs.append((business.strip(), [p.strip() for p in products.split("|") if p.strip()]))
+    return pairs
+
+
+def popular_pairs() -> list:
+    """BI_WARM_PAIRS, or the top products of each common category."""
+    spec = os.getenv("BI_WARM_PAIRS", "")
+    if spec:
+        return parse_pairs(spec)
+    return [
+        (business, [name for name, _ in items[:PRODUCTS_PER_BUSINESS]])
+        for business, _, items in bi_service.FALLBACK_CATALOGUE
+    ]
+
+
+def run(pairs: list = None, concurrency: int = None, rpm: float = None) -> dict:
+    """Warm every pair; returns counts and timing. Never raises for a failed task."""
+    pairs = popular_pairs() if pairs is None else pairs
+    concurrency = max(1, concurrency or CONCURRENCY)
+    budget = llm_limiter.TokenBucket(RPM if rpm is None else rpm)
+
+    tasks = []
+    for business, products in pairs:
+        tasks.append((bi_service.get_business_products, (business,)))
+        for product in products:
+            tasks.append((bi_service.research_product_intelligence, (business, product)))
+            tasks.append((bi_service.get_recipe_breakdown, (business, product)))
+
+    def warm(task):
+        fn, args = task
+        try:
+            with llm_limiter.job_budget(budget):
+                result = fn(*args)
+            return "fallback" if isinstance(result, dict) and result.get("_fallback") else "ok"
+        except Exception as e:
+            logger.warning(f"Cache warm-up {fn.__name__}{args} failed: {e}")
+            return "failed"
+
+    started = time.perf_counter()
+    logger.info(f"Cache warm-up: {len(tasks)} tasks for {len(pairs)} businesses, concurrency={concurrency}, rpm={budget.per_minute:g}")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="cache-warmup") as pool:
+        outcomes = list(pool.map(warm, tasks))
+    summary = {
+        "businesses": len(pairs),
+        "tasks": len(tasks),
+        "ok": outcomes.count("ok"),
+        "fallback": outcomes.count("fallback"),
+        "failed": outcomes.count("failed"),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+    logger.info(f"Cache warm-up done: {summary}")
+    return summary
@@ -0,0 +1,208 @@
+"""
+Leaderboard Service — materialised in-memory leaderboard snapshot.
+The full user_points ranking is loaded once per TTL and kept current between
+reloads by applying point awards incrementally, so dashboard loads and
+"my rank plus neighbours" lookups never scan the table.
+Awards reach the database later, through the points buffer, so each one is
+kept until a reload is known to include it: a reload that started before the
+award was written applies it again on top of the fetched rows.
+"""
+
+import bisect
+import logging
+import threading
+import time
+
+from services.request_timing import span
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_TTL_SECONDS = 30
+LEADERBOARD_PAGE_SIZE = 1000  # PostgREST default max-rows
+MAX_LEADERBOARD_LIMIT = 200
+MAX_NEIGHBOURS = 25
+
+_SELECT = "user_id, total_points, updated_at, user_profiles(full_name, business_name, industry)"
+
+
+class Leaderboard:
+    """Sorted snapshot of user points with O(log n) rank lookups."""
+
+    def __init__(self, ttl: float = LEADERBOARD_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._keys: list = []      # sorted (-total_points, user_id)
+        self._rows: dict = {}      # user_id -> row as returned by PostgREST
+        self._unconfirmed: dict = {}   # event_id -> [user_id, points, written at or None]
+        self._loaded_at = 0.0
+
+    # ── snapshot management ──────────────────────────────────────────────
+    def is_stale(self) -> bool:
+        return (time.time() - self._loaded_at) >= self.ttl
+
+    def load(self, rows: list, fetched_at: float = None):
+        """
+        Replace the snapshot with `rows`, read from the database from `fetched_at`
+        on. Awards not yet written by then are applied on top; awards written
+        before it are in the rows and are forgotten.
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        entries = {}
+        for row in rows:
+            user_id = row.get("user_id")
+            if user_id:
+                entries[user_id] = dict(row, total_points=int(row.get("total_points") or 0))
+        keys = sorted((-r["total_points"], uid) for uid, r in entries.items())
+        with self._lock:
+            self._rows = entries
+            self._keys = keys
+            self._loaded_at = time.time()
+            for event_id, (user_id, points, written_at) in list(self._unconfirmed.items()):
+                if written_at is not None and written_at <= fetched_at:
+                    del self._unconfirmed[event_id]
+                elif user_id is not None:
+                    self._apply(user_id, points)
+
+    def refresh(self, fetch_rows):
+        """
+        Reload from the database unless another thread already is. Before the
+        first load there is nothing to serve, so callers wait for it instead.
+        """
+        cold = self._loaded_at == 0.0
+        if not self._refresh_lock.acquire(blocking=cold):
+            return
+        try:
+            if not self.is_stale():  # loaded by the thread we waited for
+                return
+            started = time.time()
+            self.load(fetch_rows(), started)
+            logger.info(f"Leaderboard snapshot reloaded ({len(self._rows)} users)")
+        finally:
+            self._refresh_lock.release()
+
+    # ── incremental updates ──────────────────────────────────────────────
+    def _apply(self, user_id: str, delta: int):
+        """Callers hold _lock."""
+        row = self._rows.get(user_id)
+        if row is None:
+            row = {"user_id": user_id, "total_points": 0, "user_profiles": None}
+            self._rows[user_id] = row
+        else:
+            old_key = (-row["total_points"], user_id)
+            idx = bisect.bisect_left(self._keys, old_key)
+            if idx < len(self._keys) and self._keys[idx] == old_key:
+                del self._keys[idx]
+        row["total_points"] += int(delta)
+        bisect.insort(self._keys, (-row["total_points"], user_id))
+
+    def apply_award(self, event_id: str, user_id: str, points: int):
+        """Apply an award that is queued but not yet written."""
+        with self._lock:
+            entry = self._unconfirmed.setdefault(event_id, [None, 0, None])
+            entry[0], entry[1] = user_id, int(points)
+            self._apply(user_id, points)
+
+    def mark_written(self, event_ids):
+        """The awards are in the database; the next reload started after now includes them."""
+        now = time.time()
+        with self._lock:
+            for event_id in event_ids:
+                # Unknown ids are kept too: the flush can beat apply_award of its own request
+                self._unconfirmed.setdefault(event_id, [None, 0, None])[2] = now
+
+    def drop_awards(self, event_ids):
+        """The awards will never be written (dead-lettered): take them back out."""
+        with self._lock:
+            for event_id in event_ids:
+                user_id, points, _ = self._unconfirmed.pop(event_id, (None, 0, None))
+                if user_id is not None:
+                    self._apply(user_id, -points)
+
+    def update_profile(self, user_id: str, profile: dict):
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is not None:
+                row["user_profiles"] = {
+                    "full_name": profile.get("full_name"),
+                    "business_name": profile.get("business_name"),
+                    "industry": profile.get("industry"),
+                }
+
+    # ── queries ──────────────────────────────────────────────────────────
+    def _slice(self, start: int, stop: int) -> list:
+        out = []
+        for pos in range(start, stop):
+            _, user_id = self._keys[pos]
+            out.append(dict(self._rows[user_id], rank=pos + 1))
+        return out
+
+    def top(self, limit: int) -> list:
+        with self._lock:
+            return self._slice(0, min(limit, len(self._keys)))
+
+    def around(self, user_id: str, radius: int):
+        """Return (own row, neighbour rows) or (None, []) for unranked users."""
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return None, []
+            pos = bisect.bisect_left(self._keys, (-row["total_points"], user_id))
+            start = max(0, pos - radius)
+            stop = min(len(self._keys), pos + radius + 1)
+            return dict(row, rank=pos + 1), self._slice(start, stop)
+
+
+_board = Leaderboard()
+
+
+def _fetch_all_rows(client) -> list:
+    # user_id breaks ties so pages neither skip nor repeat users with equal points
+    rows = []
+    start = 0
+    while True:
+        with span("db", "user_points.page"):
+            page = client.table("user_points") \
+                .select(_SELECT) \
+                .order("total_points", desc=True) \
+                .order("user_id") \
+                .range(start, start + LEADERBOARD_PAGE_SIZE - 1) \
+                .execute().data or []
+        rows.extend(page)
+        if len(page) < LEADERBOARD_PAGE_SIZE:
+            return rows
+        start += LEADERBOARD_PAGE_SIZE
+
+
+def _ensure_fresh(client):
+    if _board.is_stale():
+        _board.refresh(lambda: _fetch_all_rows(client))
+
+
+def get_top(client, limit: int = 50) -> list:
+    _ensure_fresh(client)
+    return _board.top(max(1, min(limit, MAX_LEADERBOARD_LIMIT)))
+
+
+def get_neighbours(client, user_id: str, radius: int = 3):
+    _ensure_fresh(client)
+    return _board.around(user_id, max(0, min(radius, MAX_NEIGHBOURS)))
+
+
+def record_award(event_id: str, user_id: str, points: int):
+    """Apply a queued award to the snapshot without touching the database."""
+    _board.apply_award(event_id, user_id, points)
+
+
+def record_written(events: list):
+    """points_buffer on_flushed hook: these awards are now in user_points."""
+    _board.mark_written(event["event_id"] for event in events)
+
+
+def record_dead_lettered(events: list):
+    """points_buffer on_dead_lettered hook: these awards will never be written."""
+    _board.drop_awards(event["event_id"] for event in events)
+
+
+def record_profile(user_id: str, profile: dict):
+    _board.update_profile(user_id, profile)
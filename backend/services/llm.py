@@ -0,0 +1,415 @@
+"""
+LLM Service — the one place that talks to OpenRouter.
+Holds the shared lazily-created client and the call helpers used by every
+endpoint: chat() for free text and chat_json() for schema-checked JSON with
+local repair and a bounded, budgeted retry.
+Every completion is streamed so time-to-first-byte, total latency and token
+usage are recorded per endpoint, next to cache hit/miss and fallback events,
+and is admitted by services/llm_limiter.py first (rate buckets, adaptive
+concurrency, circuit breaker). Unless a call names its model, the model comes
+from the endpoint's tier in services/model_router.py; endpoints that opt in
+are hedged with a duplicate request when the first token is late, within a
+hedge budget like the retry one.
+"""
+
+import contextvars
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context
+
+from services import llm_limiter, metrics, model_router, request_timing, structured_output
+from services.structured_output import Schema, StructuredOutputError
+
+logger = logging.getLogger(__name__)
+
+MODEL = model_router.DEFAULT_MODEL
+BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+# No API cost: serve completions from services/mock_llm.py through the same call path
+MOCK_AI = os.getenv("MOCK_AI", "False").lower() == "true"
+
+CHARS_PER_TOKEN = 4             # rough prompt-size estimate for the TPM bucket
+DEFAULT_COMPLETION_TOKENS = 1000
+
+MAX_RETRIES = 1                 # per call, after local repair has failed
+RETRY_BUDGET_RATIO = 0.1        # retries may add at most 10% to call volume...
+RETRY_BUDGET_MIN = 3            # ...plus a few per window so low traffic can still retry
+RETRY_BUDGET_WINDOW_SECONDS = 60
+
+HEDGE_BUDGET_RATIO = float(os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.05"))   # hedges per hedgeable call
+HEDGE_BUDGET_MIN = int(os.getenv("LLM_HEDGE_BUDGET_MIN", "2"))
+
+_client = None
+_client_lock = threading.Lock()
+# (endpoint, schema) of the completion in flight; lets the mock client answer in shape
+_current_call = contextvars.ContextVar("llm_call", default=None)
+
+LLM_REQUESTS = metrics.Counter("llm_requests_total", "Chat completions by endpoint, model and status", ("endpoint", "model", "status"))
+LLM_TOKENS = metrics.Counter("llm_tokens_total", "Tokens used by endpoint and kind (prompt/completion)", ("endpoint", "kind"))
+LLM_TTFB = metrics.Histogram("llm_ttfb_seconds", "Time to first streamed token", ("endpoint",))
+LLM_LATENCY = metrics.Histogram("llm_latency_seconds", "Total completion latency", ("endpoint",))
+LLM_CACHE = metrics.Counter("llm_cache_total", "Result cache lookups in front of the LLM", ("endpoint", "result"))
+LLM_FALLBACKS = metrics.Counter("llm_fallbacks_total", "Responses served from a static fallback instead of the LLM", ("endpoint",))
+
+
+def get_client():
+    """Shared client, created on first use (the openai package is slow to import)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if MOCK_AI:
+                    from services import mock_llm
+                    _client = mock_llm.MockClient()
+                else:
+                    from openai import OpenAI
+                    _client = OpenAI(base_url=BASE_URL, api_key=os.getenv("OPENROUTER_API_KEY"))
+    return _client
+
+
+def current_call():
+    """(endpoint, schema) of the completion being made in this context."""
+    return _current_call.get() or ("default", None)
+
+
+class RetryBudget:
+    """Sliding-window cap on extra attempts (retries, hedges) relative to first attempts."""
+
+    def __init__(self, ratio: float, minimum: int, window: float):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.window = window
+        self._calls: deque = deque()
+        self._retries: deque = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        for events in (self._calls, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_call(self):
+        with self._lock:
+            now = time.time()
+            self._trim(now)
+            self._calls.append(now)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            now = time.time()
+            self._trim(now)
+            if len(self._retries) >= self.minimum + self.ratio * len(self._calls):
+                return False
+            self._retries.append(now)
+            return True
+
+
+retry_budget = RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN, RETRY_BUDGET_WINDOW_SECONDS)
+hedge_budget = RetryBudget(HEDGE_BUDGET_RATIO, HEDGE_BUDGET_MIN, RETRY_BUDGET_WINDOW_SECONDS)
+
+
+# ─── Per-request accounting (exposed as response headers) ─────────────────────
+def _request_usage():
+    if not has_request_context():
+        return None
+    usage = getattr(g, "llm_usage", None)
+    if usage is None:
+        usage = g.llm_usage = {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "latency": 0.0, "ttfb": None, "cache": [], "fallback": [],
+        }
+    return usage
+
+
+def record_cache(endpoint: str, hit: bool):
+    LLM_CACHE.inc(endpoint=endpoint, result="hit" if hit else "miss")
+    usage = _request_usage()
+    if usage is not None:
+        usage["cache"].append("hit" if hit else "miss")
+
+
+def record_fallback(endpoint: str):
+    LLM_FALLBACKS.inc(endpoint=endpoint)
+    usage = _request_usage()
+    if usage is not None:
+        usage["fallback"].append(endpoint)
+
+
+def _record_call(endpoint: str, model: str, status: str, latency: float, ttfb, prompt_tokens: int, completion_tokens: int):
+    LLM_REQUESTS.inc(endpoint=endpoint, model=model, status=status)
+    LLM_LATENCY.observe(latency, endpoint=endpoint)
+    if ttfb is not None:
+        LLM_TTFB.observe(ttfb, endpoint=endpoint)
+    LLM_TOKENS.inc(prompt_tokens, endpoint=endpoint, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, endpoint=endpoint, kind="completion")
+    model_router.record(model, status, latency, ttfb)
+    logger.info(
+        f"LLM [{endpoint}] {status} model={model} latency={latency * 1000:.0f}ms "
+        f"ttfb={ttfb * 1000 if ttfb is not None else -1:.0f}ms tokens={prompt_tokens}+{completion_tokens}"
+    )
+
+    usage = _request_usage()
+    if usage is not None:
+        usage["calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["completion_tokens"] += completion_tokens
+        usage["latency"] += latency
+        if usage["ttfb"] is None and ttfb is not None:
+            usage["ttfb"] = ttfb
+
+
+def add_usage_headers(response):
+    """after_request hook: X-LLM-* headers and Server-Timing for this request's LLM work."""
+    usage = getattr(g, "llm_usage", None)
+    if not usage:
+        return response
+    response.headers["X-LLM-Calls"] = str(usage["calls"])
+    response.headers["X-LLM-Prompt-Tokens"] = str(usage["prompt_tokens"])
+    response.headers["X-LLM-Completion-Tokens"] = str(usage["completion_tokens"])
+    if usage["cache"]:
+        response.headers["X-LLM-Cache"] = ",".join(usage["cache"])
+    if usage["fallback"]:
+        response.headers["X-LLM-Fallback"] = ",".join(usage["fallback"])
+    timing = [f"llm;dur={usage['latency'] * 1000:.1f}"]
+    if usage["ttfb"] is not None:
+        timing.append(f"llm-ttfb;dur={usage['ttfb'] * 1000:.1f}")
+    response.headers.add("Server-Timing", ", ".join(timing))
+    return response
+
+
+def init_app(app):
+    app.after_request(add_usage_headers)
+
+
+# ─── Calls ────────────────────────────────────────────────────────────────────
+def chat(messages: list, endpoint: str = "default", model: str = None, with_model: bool = False, **params):
+    """
+    Single streamed completion; returns the stripped reply text. Raises on API errors.
+    Without `model` the endpoint's routed model is used, hedged if the endpoint opted in.
+    with_model=True returns (text, model that answered), which differs from the
+    routed model when a hedge won.
+    """
+    outer = _current_call.get()
+    token = _current_call.set((endpoint, outer[1] if outer and outer[0] == endpoint else None))
+    try:
+        with request_timing.span("llm", endpoint):
+            if not model:
+                route = model_router.route(endpoint)
+                delay = model_router.hedge_delay(endpoint, route)
+                if delay is not None:
+                    text, model = _hedged_completion(messages, endpoint, route, delay, params)
+                    return (text, model) if with_model else text
+                model = route.primary
+            text = _stream_completion(messages, endpoint, model, params)
+            return (text, model) if with_model else text
+    finally:
+        _current_call.reset(token)
+
+
+def _estimate_tokens(messages: list, params: dict) -> int:
+    prompt = sum(len(str(m.get("content", ""))) for m in messages) // CHARS_PER_TOKEN
+    return prompt + int(params.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+
+def _close_stream(stream):
+    """
+    Close a completion stream from any thread. The socket is shut down first:
+    closing alone does not wake a read blocked in another thread, shutdown does.
+    """
+    try:
+        network_stream = stream.response.extensions.get("network_stream")
+        sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+        if sock is not None:
+            sock.shutdown(socket.SHUT_RDWR)
+    except (AttributeError, OSError):
+        pass
+    try:
+        stream.close()
+    except Exception as e:
+        logger.debug(f"Closing a cancelled LLM stream: {e}")
+
+
+class StreamHandle:
+    """
+    Cancellation handle for one streamed attempt. cancel() closes the attempt's
+    HTTP stream right away, whether or not a token has arrived; an attempt
+    cancelled before its stream opens closes it as soon as it does.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stream = None
+        self.cancelled = False
+
+    def attach(self, stream) -> bool:
+        """Register the open stream; False (and the stream is closed) when already cancelled."""
+        with self._lock:
+            if not self.cancelled:
+                self._stream = stream
+                return True
+        _close_stream(stream)
+        return False
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            stream, self._stream = self._stream, None
+        if stream is not None:
+            _close_stream(stream)
+
+
+def _stream_completion(messages: list, endpoint: str, model: str, params: dict,
+                       progress: threading.Event = None, handle: StreamHandle = None) -> str:
+    """`progress` is set on the first token; handle.cancel() aborts the stream from another thread."""
+    with llm_limiter.admit(endpoint, _estimate_tokens(messages, params)) as admission:
+        started = time.perf_counter()
+        ttfb = None
+        parts = []
+        usage = None
+        status = "ok"
+        try:
+            if handle is not None and handle.cancelled:
+                status = "cancelled"
+                return ""
+            stream = get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **params,
+            )
+            if handle is not None and not handle.attach(stream):
+                status = "cancelled"
+                return ""
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if ttfb is None:
+                            ttfb = time.perf_counter() - started
+                            if progress is not None:
+                                progress.set()
+                        parts.append(delta)
+            if handle is not None and handle.cancelled:
+                status = "cancelled"
+                return ""
+        except Exception:
+            if handle is not None and handle.cancelled:
+                status = "cancelled"    # the read failed because the winner closed our stream
+                return ""
+            status = "error"
+            raise
+        finally:
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            _record_call(endpoint, model, status, time.perf_counter() - started, ttfb, prompt_tokens, completion_tokens)
+            admission.record_tokens(prompt_tokens + completion_tokens)
+    return "".join(parts).strip()
+
+
+def _hedged_completion(messages: list, endpoint: str, route, delay: float, params: dict) -> tuple:
+    """
+    Start the primary; if it has neither streamed a token nor finished within
+    `delay`, and the hedge budget allows, send the same request to the tier's
+    hedge model. The first good reply wins and the other attempt's HTTP stream
+    is closed at once, so it stops costing tokens; an error is raised only
+    when every attempt failed (the primary's is preferred).
+    Returns (text, model that answered).
+    """
+    hedge_budget.record_call()
+    done = queue.Queue()
+    progress = threading.Event()
+    handles = {}
+    models = {"primary": route.primary, "hedge": route.hedge_model}
+
+    def start(attempt: str, model: str):
+        handle = handles[attempt] = StreamHandle()
+        context = contextvars.copy_context()   # request context, current call, g.llm_usage
+
+        def run():
+            try:
+                done.put((attempt, context.run(_stream_completion, messages, endpoint, model, params, progress, handle), None))
+            except Exception as e:
+                done.put((attempt, None, e))
+            finally:
+                progress.set()
+
+        threading.Thread(target=run, name=f"llm-{endpoint}-{attempt}", daemon=True).start()
+
+    start("primary", models["primary"])
+    if not progress.wait(delay):
+        if hedge_budget.try_spend():
+            logger.info(f"LLM [{endpoint}] no first token from {route.primary} after {delay:.2f}s; hedging to {route.hedge_model}")
+            start("hedge", models["hedge"])
+        else:
+            model_router.record_hedge(endpoint, "denied")
+
+    error = None
+    for _ in range(len(handles)):
+        attempt, text, e = done.get()
+        if e is None:
+            for other, handle in handles.items():
+                if other != attempt:
+                    handle.cancel()
+            if len(handles) > 1:
+                model_router.record_hedge(endpoint, attempt)
+            return text, models[attempt]
+        if error is None or attempt == "primary":
+            error = e
+    if len(handles) > 1:
+        model_router.record_hedge(endpoint, "none")
+    raise error
+
+
+def chat_json(messages: list, schema: Schema = None, endpoint: str = "default",
+              model: str = None, max_retries: int = MAX_RETRIES, with_model: bool = False, **params):
+    """
+    Completion parsed into data matching `schema`; with_model=True returns
+    (data, model that produced the accepted reply), as chat() does.
+    Local repair is tried before any retry; a retry sends the bad reply back
+    with the parse error and is only made while the shared retry budget allows.
+    Raises StructuredOutputError (with .raw) when no usable reply was produced.
+    """
+    retry_budget.record_call()
+    token = _current_call.set((endpoint, schema))
+    try:
+        data, answered_by = _chat_json(messages, schema, endpoint, model, max_retries, params)
+        return (data, answered_by) if with_model else data
+    finally:
+        _current_call.reset(token)
+
+
+def _chat_json(messages: list, schema: Schema, endpoint: str, model: str, max_retries: int, params: dict):
+    messages = list(messages)
+    retries = 0
+    budget_denied = False
+    while True:
+        raw, answered_by = chat(messages, endpoint=endpoint, model=model, with_model=True, **params)
+        try:
+            data, parsed = structured_output.parse(raw, schema)
+        except StructuredOutputError as e:
+            if retries >= max_retries:
+                structured_output.record(endpoint, "failed", retries, budget_denied)
+                raise
+            if not retry_budget.try_spend():
+                budget_denied = True
+                structured_output.record(endpoint, "failed", retries, budget_denied)
+                raise
+            retries += 1
+            logger.warning(f"LLM [{endpoint}] unusable reply ({e}); retrying")
+            messages += [
+                {"role": "assistant", "content": raw},
+                {"role": "user", "content": f"That reply could not be used: {e}. "
+                                            f"Reply again with only {schema.describe() if schema else 'valid JSON'}, no other text."},
+            ]
+            continue
+
+        structured_output.record(endpoint, "retried_ok" if retries else parsed, retries)
+        return data, answered_by
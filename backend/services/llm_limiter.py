@@ -0,0 +1,271 @@
+"""
+LLM Limiter Service — provider-aware admission control in front of every LLM call.
+Token buckets keep us under the provider's requests-per-minute and
+tokens-per-minute limits; an AIMD concurrency limit halves on 429s, shrinks
+on slow completions and grows back while calls are healthy; and a circuit
+breaker opens after repeated rate-limit / provider failures so callers go
+straight to their cached or fallback answers instead of queueing into the limit.
+
+    LLM_RPM / LLM_TPM                      bucket sizes per minute (0 = unlimited)
+    LLM_MIN_CONCURRENCY / LLM_MAX_CONCURRENCY / LLM_INITIAL_CONCURRENCY
+    LLM_LATENCY_TARGET_SECONDS             completions slower than this shrink the limit
+    LLM_MAX_QUEUE / LLM_QUEUE_TIMEOUT_SECONDS
+    LLM_BREAKER_FAILURES / LLM_BREAKER_RESET_SECONDS
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from services import metrics
+from services.resilience import CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+RPM = float(os.getenv("LLM_RPM", "60"))
+TPM = float(os.getenv("LLM_TPM", "100000"))
+MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+LATENCY_TARGET_SECONDS = float(os.getenv("LLM_LATENCY_TARGET_SECONDS", "20"))
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "50"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+
+DECREASE_ON_RATE_LIMIT = 0.5
+DECREASE_ON_SLOW = 0.9
+DECREASE_COOLDOWN_SECONDS = 1.0   # one decrease per burst of failures, not one per failed call
+
+LLM_QUEUE_DEPTH = metrics.Gauge("llm_limiter_queue_depth", "LLM calls waiting for admission")
+LLM_IN_FLIGHT = metrics.Gauge("llm_limiter_in_flight", "LLM calls currently admitted")
+LLM_CONCURRENCY_LIMIT = metrics.Gauge("llm_limiter_concurrency_limit", "Current AIMD concurrency limit")
+LLM_REJECTED = metrics.Counter("llm_limiter_rejected_total", "LLM calls refused before reaching the provider", ("endpoint", "reason"))
+LLM_QUEUE_WAIT = metrics.Histogram("llm_limiter_wait_seconds", "Time spent waiting for admission", ("endpoint",))
+LLM_RATE_LIMITED = metrics.Counter("llm_rate_limited_total", "429 responses from the provider", ("endpoint",))
+
+# Extra requests-per-minute bucket for background jobs, on top of the global buckets
+_job_budget = contextvars.ContextVar("llm_job_budget", default=None)
+
+
+class LLMUnavailableError(RuntimeError):
+    """No answer for now: circuit open, queue full, admission timed out or the provider said 429."""
+
+    def __init__(self, reason: str, retry_after: float = 0.0):
+        super().__init__(f"LLM unavailable ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return isinstance(error, LLMUnavailableError) or getattr(error, "status_code", None) == 429
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60; reservations may borrow ahead and wait."""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.per_minute, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` now; returns the seconds to wait before using it (0 if available)."""
+        if self.per_minute <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def adjust(self, amount: float):
+        """Give back (positive) or take more (negative) once the real usage is known."""
+        if self.per_minute <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.per_minute, self.tokens + amount)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight calls with a bounded wait queue."""
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.waiting = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    def acquire(self, timeout: float) -> str:
+        """'' on success, otherwise the rejection reason."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self.in_flight >= int(self.limit) and self.waiting >= MAX_QUEUE:
+                return "queue_full"
+            self.waiting += 1
+            LLM_QUEUE_DEPTH.set(self.waiting)
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return "queue_timeout"
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                LLM_IN_FLIGHT.set(self.in_flight)
+                return ""
+            finally:
+                self.waiting -= 1
+                LLM_QUEUE_DEPTH.set(self.waiting)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            LLM_IN_FLIGHT.set(self.in_flight)
+            self._cond.notify()
+
+    def on_success(self, latency: float):
+        with self._cond:
+            if latency > LATENCY_TARGET_SECONDS:
+                self._decrease(DECREASE_ON_SLOW)
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+                LLM_CONCURRENCY_LIMIT.set(self.limit)
+                self._cond.notify()
+
+    def on_overload(self):
+        with self._cond:
+            self._decrease(DECREASE_ON_RATE_LIMIT)
+
+    def _decrease(self, factor: float):
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN_SECONDS:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+        logger.info(f"LLM concurrency limit -> {self.limit:.1f}")
+
+
+requests_bucket = TokenBucket(RPM)
+tokens_bucket = TokenBucket(TPM)
+concurrency = AdaptiveConcurrency(INITIAL_CONCURRENCY, MIN_CONCURRENCY, MAX_CONCURRENCY)
+breaker = CircuitBreaker(
+    "openrouter",
+    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+)
+
+
+class Admission:
+    """Handed to the caller while admitted; report the real token usage through it."""
+
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+
+    def record_tokens(self, actual_tokens: int):
+        if actual_tokens:
+            tokens_bucket.adjust(self.estimated_tokens - actual_tokens)
+            self.estimated_tokens = actual_tokens
+
+
+def _retry_after(error: Exception) -> float:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after", 1.0))
+    except (AttributeError, TypeError, ValueError):
+        return 1.0
+
+
+def _reject(endpoint: str, reason: str, retry_after: float = 0.0):
+    LLM_REJECTED.inc(endpoint=endpoint, reason=reason)
+    logger.warning(f"LLM [{endpoint}] rejected: {reason}")
+    raise LLMUnavailableError(reason, retry_after)
+
+
+@contextmanager
+def job_budget(bucket: TokenBucket):
+    """
+    LLM calls made inside the block also take a request from `bucket`, waiting
+    as long as needed (no queue timeout), so a background job stays within its
+    own rate budget and leaves the rest of the provider limit to live traffic.
+    """
+    token = _job_budget.set(bucket)
+    try:
+        yield
+    finally:
+        _job_budget.reset(token)
+
+
+@contextmanager
+def admit(endpoint: str, estimated_tokens: int):
+    """
+    Wait for a slot and rate budget, then run the call. Raises LLMUnavailableError
+    instead of sending when the circuit is open or admission would take longer
+    than LLM_QUEUE_TIMEOUT_SECONDS, and in place of a provider 429, so callers
+    handle every "not now" the same way. Outcomes feed AIMD and the breaker.
+    """
+    budget = _job_budget.get()
+    if budget is not None:
+        time.sleep(budget.reserve(1))
+    try:
+        breaker.before_call()
+    except CircuitOpenError as e:
+        _reject(endpoint, "circuit_open", e.retry_in)
+
+    started = time.monotonic()
+    reason = concurrency.acquire(QUEUE_TIMEOUT_SECONDS)
+    if reason:
+        breaker.cancel_trial()
+        _reject(endpoint, reason, 1.0)
+
+    try:
+        wait = max(requests_bucket.reserve(1), tokens_bucket.reserve(estimated_tokens))
+        if time.monotonic() - started + wait > QUEUE_TIMEOUT_SECONDS:
+            requests_bucket.adjust(1)
+            tokens_bucket.adjust(estimated_tokens)
+            breaker.cancel_trial()
+            _reject(endpoint, "rate_budget", wait)
+        if wait:
+            time.sleep(wait)
+        LLM_QUEUE_WAIT.observe(time.monotonic() - started, endpoint=endpoint)
+
+        call_started = time.monotonic()
+        try:
+            yield Admission(estimated_tokens)
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            if status == 429:
+                LLM_RATE_LIMITED.inc(endpoint=endpoint)
+                concurrency.on_overload()
+                breaker.record_failure()
+                raise LLMUnavailableError("rate_limited", _retry_after(e)) from e
+            if status is None or status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()  # 4xx: our request, not the provider
+            raise
+        concurrency.on_success(time.monotonic() - call_started)
+        breaker.record_success()
+    finally:
+        concurrency.release()
+
+
+def snapshot() -> dict:
+    return {
+        "concurrency_limit": round(concurrency.limit, 2),
+        "in_flight": concurrency.in_flight,
+        "queue_depth": concurrency.waiting,
+        "circuit": breaker.snapshot(),
+    }
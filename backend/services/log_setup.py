@@ -0,0 +1,145 @@
+"""
+Log Setup — non-blocking logging pipeline for the backend.
+Request threads only put records on a bounded in-memory queue; a background
+QueueListener thread formats them and writes to stderr and a size-rotated
+file. High-volume DEBUG lines are sampled per call site, and records are
+dropped rather than blocking when the queue is full; both are counted in
+/metrics (log_records_dropped_total, log_debug_suppressed_total).
+
+Configuration (environment):
+    LOG_LEVEL           root level (default INFO)
+    LOG_LEVELS          per-logger levels, e.g. "services.llm=DEBUG,werkzeug=WARNING"
+    LOG_FILE            rotated log file (default backend_debug.log; empty disables)
+    LOG_MAX_BYTES       rotate size (default 10 MB)
+    LOG_BACKUP_COUNT    rotated files kept (default 5)
+    LOG_QUEUE_SIZE      max queued records (default 10000)
+    LOG_DEBUG_BURST     DEBUG records per call site per second kept in full (default 20)
+    LOG_DEBUG_SAMPLE    after the burst, keep 1 in N (default 100)
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+from services import metrics
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Chatty third-party loggers, quietened unless LOG_LEVELS says otherwise
+DEFAULT_LEVELS = {
+    "httpx": "WARNING",
+    "httpcore": "WARNING",
+    "hpack": "WARNING",
+    "urllib3": "WARNING",
+    "openai": "WARNING",
+}
+
+LOG_DROPPED = metrics.Counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+LOG_SUPPRESSED = metrics.Counter("log_debug_suppressed_total", "DEBUG log records skipped by per-call-site sampling")
+
+_listener = None
+_lock = threading.Lock()
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keep every record above DEBUG. DEBUG records are keyed by call site
+    (file + line): the first `burst` per second pass, then 1 in `every`.
+    """
+
+    def __init__(self, burst: int, every: int):
+        super().__init__()
+        self.burst = burst
+        self.every = max(every, 1)
+        self._windows: dict = {}    # (pathname, lineno) -> [window second, seen]
+        self._lock = threading.Lock()
+
+    def filter(self, record) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        key = (record.pathname, record.lineno)
+        now = int(time.time())
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or window[0] != now:
+                if len(self._windows) > 10_000:
+                    self._windows.clear()
+                window = self._windows[key] = [now, 0]
+            window[1] += 1
+            seen = window[1]
+        if seen <= self.burst or (seen - self.burst) % self.every == 0:
+            return True
+        LOG_SUPPRESSED.inc()
+        return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller: a full queue drops the record."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure():
+    """Install the queue pipeline on the root logger. Safe to call more than once."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        outputs = [logging.StreamHandler()]
+        log_file = os.getenv("LOG_FILE", "backend_debug.log")
+        if log_file:
+            outputs.append(logging.handlers.RotatingFileHandler(
+                log_file,
+                maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+                backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+                encoding="utf-8",
+            ))
+        for output in outputs:
+            output.setFormatter(formatter)
+
+        log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        handler = DroppingQueueHandler(log_queue)
+        handler.addFilter(DebugSampler(
+            int(os.getenv("LOG_DEBUG_BURST", "20")),
+            int(os.getenv("LOG_DEBUG_SAMPLE", "100")),
+        ))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        for name, level in {**DEFAULT_LEVELS, **_parse_levels(os.getenv("LOG_LEVELS", ""))}.items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown)
+
+
+def shutdown():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
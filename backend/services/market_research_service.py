@@ -0,0 +1,178 @@
+"""
+Market Research Service — in-memory index over market_research_links.
+The table is loaded once at startup, indexed by business type and location,
+and reloaded when a cheap change probe (row count + latest updated_at) moves.
+Responses are cached per (business_type, location) filter combination.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REFRESH_CHECK_SECONDS = 60
+MAX_CACHED_FILTERS = 512
+
+CATEGORY_ORDER = ["government_schemes", "market_trends", "product_research", "industry_reports"]
+
+# Rows tagged with these values apply to every business type / location
+_WILDCARD_TYPES = {"all"}
+_WILDCARD_LOCATIONS = {"all", "india"}
+
+_COLUMNS = "id, business_type, location, category, title, url, description, is_verified, is_government, updated_at"
+
+# Served only when the table has never been loaded (no database configured)
+FALLBACK_LINKS = [
+    {
+        "category": "government_schemes",
+        "items": [
+            {"title": "MSME - Ministry of Micro, Small and Medium Enterprises", "url": "https://msme.gov.in/", "verified": True},
+            {"title": "Startup India", "url": "https://www.startupindia.gov.in/", "verified": True},
+            {"title": "DGFT - Directorate General of Foreign Trade", "url": "https://dgft.gov.in/", "verified": True},
+            {"title": "GeM - Government e-Marketplace", "url": "https://gem.gov.in/", "verified": True},
+            {"title": "Udyam Registration Portal", "url": "https://udyamregistration.gov.in/", "verified": True}
+        ]
+    },
+    {
+        "category": "market_trends",
+        "items": [
+            {"title": "IBEF - India Brand Equity Foundation", "url": "https://www.ibef.org/", "verified": True},
+            {"title": "NITI Aayog", "url": "https://www.niti.gov.in/", "verified": True}
+        ]
+    },
+    {
+        "category": "product_research",
+        "items": [
+            {"title": "CSIR - Council of Scientific & Industrial Research", "url": "https://www.csir.res.in/", "verified": True}
+        ]
+    },
+    {
+        "category": "industry_reports",
+        "items": [
+            {"title": "Ministry of Commerce & Industry", "url": "https://commerce.gov.in/", "verified": True},
+            {"title": "RBI - Reserve Bank of India", "url": "https://www.rbi.org.in/", "verified": True}
+        ]
+    }
+]
+
+
+def _norm(value: str) -> str:
+    return " ".join((value or "").lower().split())
+
+
+class _Index:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.signature = None
+        self.rows: list = []
+        self.by_type: dict = {}
+        self.responses: dict = {}
+        self.checked_at = 0.0
+
+
+_index = _Index()
+
+
+def _fetch_signature(client):
+    """(row count, latest updated_at) — changes on insert, update and delete."""
+    response = client.table("market_research_links") \
+        .select("updated_at", count="exact") \
+        .order("updated_at", desc=True) \
+        .limit(1) \
+        .execute()
+    latest = response.data[0]["updated_at"] if response.data else None
+    return response.count, latest
+
+
+def load(client):
+    """(Re)build the index from the table."""
+    signature = _fetch_signature(client)
+    rows = client.table("market_research_links").select(_COLUMNS).execute().data or []
+
+    by_type: dict = {}
+    for row in rows:
+        row["_type"] = _norm(row.get("business_type"))
+        row["_location"] = _norm(row.get("location"))
+        by_type.setdefault(row["_type"], []).append(row)
+
+    with _index.lock:
+        _index.rows = rows
+        _index.by_type = by_type
+        _index.responses = {}
+        _index.signature = signature
+        _index.loaded = True
+        _index.checked_at = time.time()
+    logger.info(f"Market research index loaded ({len(rows)} links)")
+
+
+def warm(client):
+    """Startup hook — load in a background thread so boot is not blocked."""
+    def _run():
+        try:
+            load(client)
+        except Exception as e:
+            logger.error(f"Market research index load failed: {e}")
+    threading.Thread(target=_run, name="market-research-warm", daemon=True).start()
+
+
+def _refresh_if_changed(client):
+    with _index.lock:
+        due = (time.time() - _index.checked_at) >= REFRESH_CHECK_SECONDS
+        if due:
+            _index.checked_at = time.time()  # claim the check for this thread
+    if not due:
+        return
+    try:
+        if not _index.loaded or _fetch_signature(client) != _index.signature:
+            load(client)
+    except Exception as e:
+        logger.error(f"Market research refresh check failed: {e}")
+
+
+def _select(business_type: str, location: str) -> list:
+    if business_type in _WILDCARD_TYPES:
+        candidates = _index.rows
+    else:
+        candidates = _index.by_type.get(business_type, [])
+        for wildcard in _WILDCARD_TYPES:
+            candidates = candidates + _index.by_type.get(wildcard, [])
+
+    if location in _WILDCARD_LOCATIONS:
+        return candidates
+    return [row for row in candidates if row["_location"] in _WILDCARD_LOCATIONS or row["_location"] == location]
+
+
+def _group(rows: list) -> list:
+    grouped: dict = {}
+    for row in rows:
+        grouped.setdefault(row["category"], []).append({
+            "title": row["title"],
+            "url": row["url"],
+            "description": row.get("description"),
+            "verified": row.get("is_verified", True),
+            "is_government": row.get("is_government", False),
+        })
+    order = CATEGORY_ORDER + sorted(c for c in grouped if c not in CATEGORY_ORDER)
+    return [{"category": c, "items": grouped[c]} for c in order if c in grouped]
+
+
+def get_links(client, business_type: str = "All", location: str = "India") -> list:
+    """Return links grouped by category for the given filters."""
+    if client is not None:
+        _refresh_if_changed(client)
+    if not _index.loaded:
+        return FALLBACK_LINKS
+
+    key = (_norm(business_type) or "all", _norm(location) or "india")
+    cached = _index.responses.get(key)
+    if cached is not None:
+        return cached
+
+    with _index.lock:
+        links = _group(_select(*key))
+        if len(_index.responses) >= MAX_CACHED_FILTERS:
+            _index.responses.clear()
+        _index.responses[key] = links
+    return links
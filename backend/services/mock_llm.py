@@ -0,0 +1,417 @@
+"""
+Mock LLM Service — an in-process stand-in for the OpenRouter client (MOCK_AI=true).
+llm.get_client() hands out MockClient instead of the OpenAI client, so mock
+mode runs the real call path: streaming, token accounting, structured-output
+parsing and repair, retries, result caches and fallbacks. Replies are
+schema-correct fixtures per endpoint; latency, token rate, rate-limit errors
+and malformed JSON are configurable, which makes the mode usable for load tests.
+
+    MOCK_LLM_TTFB_MS             mean time to first token (default 0)
+    MOCK_LLM_LATENCY_DIST        fixed | normal | lognormal (default lognormal)
+    MOCK_LLM_LATENCY_SIGMA       spread: lognormal sigma, or stddev / mean for normal (default 0.5)
+    MOCK_LLM_TOKENS_PER_SECOND   streaming rate, 0 = instant (default 0)
+    MOCK_LLM_RATE_LIMIT_RATE     fraction of calls answered with a 429 (default 0)
+    MOCK_LLM_MALFORMED_RATE      fraction of replies sent fenced/truncated/as prose (default 0)
+    MOCK_LLM_SEED                seed for repeatable runs
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import httpx
+from openai import RateLimitError
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+CHUNK_TOKENS = 4
+MALFORMED_KINDS = ("fenced", "truncated", "prose")
+
+
+# ─── Fixtures ─────────────────────────────────────────────────────────────────
+SMARTBIZ_REPLIES = {
+    "ASK_IDEA": "That sounds like a great starting point! Before we dive in, what's your approximate budget for this business?",
+    "ASK_BUDGET": "I see. Budgeting is crucial! Now, do you have a specific location or area in mind where you want to set things up?",
+    "ASK_LOCATION_PREFERENCE": "Excellent! Location can make or break a business. Please tell me the exact city or area you're thinking of.",
+    "ASK_CUSTOM_LOCATION": "Got it. Anand is a vibrant area! Should we proceed with this location or would you like to consider somewhere else?",
+    "GENERATE_RECOMMENDATIONS": "Based on what you've told me, I have some great business ideas for you. Would you like to see them?",
+    "SUPPLIER_GUIDANCE": "Great! I've found some officially registered suppliers from government data that might help you. These are verified MSME enterprises that could be potential suppliers or partners for your business.",
+}
+
+MOCK_SUPPLIER = {
+    "name": "Devani Reverence India",
+    "location": "GHAZIABAD, UTTAR PRADESH",
+    "type": "Micro",
+    "activity": "Manufacturing",
+    "status": "Active",
+    "price": "Approx ₹55/kg",
+    "contact": "Dist: GHAZIABAD",
+}
+
+
+def _smartbiz(prompt: str) -> dict:
+    step = re.search(r"CURRENT_STEP:\s*(\w+)", prompt)
+    step = step.group(1) if step else "ASK_IDEA"
+    message = re.search(r'USER_LATEST_MESSAGE:\s*"(.*?)"', prompt, re.DOTALL)
+    return {
+        "reply": SMARTBIZ_REPLIES.get(step, f"I've noted that. Let's move to the next phase: {step}. Ready?"),
+        "extracted_info": {},
+        "comparison_data": [MOCK_SUPPLIER] if step in ("RAW_MATERIALS", "SUPPLIER_GUIDANCE", "SELLING_GUIDE") else [],
+        "step_completed": bool(message and message.group(1).strip()),
+    }
+
+
+FIXTURES = {
+    "smartbiz_agent": _smartbiz,
+    "recommendations": {
+        "ideas": [{
+            "id": "mock-1",
+            "name": "Organic Cafe",
+            "description": "A cozy cafe serving organic snacks and beverages.",
+            "investmentRange": "₹4,00,000 - ₹6,00,000",
+            "expectedRevenue": "₹80,000/month",
+            "profitMargin": "20-30%",
+            "riskLevel": "Medium",
+            "breakEvenTime": "8-12 months",
+            "icon": "☕",
+        }],
+    },
+    "predict_budget": {
+        "predicted_budget": 500000,
+        "budget_breakdown": {
+            "infrastructure": 150000,
+            "equipment": 100000,
+            "inventory": 80000,
+            "marketing": 50000,
+            "licenses": 20000,
+            "working_capital": 100000,
+        },
+        "business_type": "Food & Beverage",
+        "scale": "small",
+        "location_factor": "urban",
+    },
+    "identify_raw_materials": {
+        "raw_materials": [
+            {"name": "Flour", "specification": "Wheat flour, 50kg bags", "estimated_cost": "₹1,500-2,000 per bag"},
+            {"name": "Sugar", "specification": "Refined sugar, 25kg bags", "estimated_cost": "₹1,000-1,200 per bag"},
+            {"name": "Packaging Materials", "specification": "Food-grade boxes and bags", "estimated_cost": "₹5,000-10,000 monthly"},
+        ],
+        "supplier_platforms": [
+            {"name": "IndiaMART", "url": "https://www.indiamart.com/", "type": "B2B Marketplace"},
+            {"name": "TradeIndia", "url": "https://www.tradeindia.com/", "type": "B2B Marketplace"},
+            {"name": "MSME Suppliers", "url": "/marketplace", "type": "Government Verified"},
+        ],
+    },
+    "generate_advertisements": {
+        "templates": [
+            {
+                "id": "template-1",
+                "design_concept": "Modern minimalist with product showcase",
+                "caption": "🎉 Introducing our business! Quality products at affordable prices. Visit us today! 🛍️",
+                "hashtags": ["#NewBusiness", "#LocalBusiness", "#SmallBusiness", "#ShopLocal", "#SupportLocal"],
+                "target_audience": "Local community, age 25-45, interested in quality products",
+                "posting_schedule": "Monday & Thursday, 10:00 AM - 11:00 AM",
+                "platform": "Instagram & Facebook",
+            },
+            {
+                "id": "template-2",
+                "design_concept": "Vibrant colors with customer testimonials",
+                "caption": "💯 Join hundreds of happy customers! Limited time offer - 20% off on first purchase! 🎁",
+                "hashtags": ["#SpecialOffer", "#Discount", "#QualityProducts", "#CustomerFirst"],
+                "target_audience": "Deal seekers, age 20-50, value-conscious shoppers",
+                "posting_schedule": "Wednesday & Saturday, 6:00 PM - 7:00 PM",
+                "platform": "Instagram Stories & Posts",
+            },
+        ],
+        "posting_strategy": {
+            "frequency": "3-4 posts per week",
+            "best_times": ["10:00 AM", "6:00 PM", "8:00 PM"],
+            "content_mix": "60% product showcase, 30% customer stories, 10% behind-the-scenes",
+        },
+    },
+    "analyze_social_media": {
+        "posting_patterns": {
+            "recommended_frequency": "4-5 posts per week",
+            "best_times": ["10:00 AM", "2:00 PM", "7:00 PM"],
+            "engagement_peak": "Evenings 6-9 PM",
+            "top_content_types": ["Reels", "Carousel Posts", "Stories"],
+        },
+        "ai_suggestions": {
+            "content_ideas": [
+                "Behind-the-scenes of your business operations",
+                "Customer testimonials and success stories",
+                "Product demonstrations and tutorials",
+            ],
+            "hashtag_strategy": ["Use 10-15 hashtags per post", "Mix of popular and niche hashtags"],
+            "growth_tips": ["Post consistently at optimal times", "Use Instagram Reels for maximum reach"],
+        },
+        "weekly_strategy": {
+            "monday": {"content": "Motivational post or week preview", "type": "Post", "time": "10:00 AM"},
+            "wednesday": {"content": "Customer testimonial", "type": "Carousel", "time": "7:00 PM"},
+            "friday": {"content": "Weekend offer or promotion", "type": "Post", "time": "5:00 PM"},
+        },
+    },
+    "generate_business_names": {
+        "suggestions": [
+            {"name": "FreshBite Kitchen", "category": "Professional", "tagline": "Healthy meals delivered fresh to your door", "domain_available": True},
+            {"name": "NutriNest", "category": "Creative", "tagline": "Your nest for nutritious living", "domain_available": False},
+            {"name": "FlavorHub", "category": "Trendy", "tagline": "Where flavors meet convenience", "domain_available": True},
+            {"name": "The Wellness Table", "category": "Premium", "tagline": "Elevated dining for health-conscious professionals", "domain_available": True},
+            {"name": "GreenPlate Co.", "category": "Professional", "tagline": "Sustainable meals for modern lifestyles", "domain_available": False},
+        ],
+    },
+    "generate_chat_title": "Business Startup Planning",
+    "generate_ad_posts": [
+        {
+            "type": "Promotional Launch",
+            "headline": "Grand Opening!",
+            "caption": "We are excited to bring you the best in town. Quality. Trust. Excellence.",
+            "cta": "Visit us today!",
+            "hashtags": "#NewBusiness #StartupIndia #Quality",
+            "suggested_time": "9:00 AM - 11:00 AM (Peak engagement)",
+        },
+        {
+            "type": "Problem-Solution",
+            "headline": "Looking for something reliable?",
+            "caption": "We provide affordable and quality solutions tailored for you.",
+            "cta": "DM us now!",
+            "hashtags": "#Solutions #Affordable #TrustUs",
+            "suggested_time": "6:00 PM - 8:00 PM (Evening engagement)",
+        },
+        {
+            "type": "Trust Building",
+            "headline": "Why Choose Us?",
+            "caption": "✔ High Quality\n✔ Affordable Pricing\n✔ Fast Delivery\n✔ Customer Satisfaction Guaranteed",
+            "cta": "Follow us for updates!",
+            "hashtags": "#TrustWorthy #QualityFirst #CustomerFirst",
+            "suggested_time": "12:00 PM - 2:00 PM (Lunch break)",
+        },
+    ],
+    "generate_success_guide": {
+        "weekly_goals": ["Set up social media profiles", "Create first marketing post", "Research 3 competitors", "Define target customer"],
+        "marketing_checklist": ["Create Google My Business listing", "Set up WhatsApp Business", "Design basic logo", "Prepare launch announcement"],
+        "cost_control_checklist": ["Track all expenses daily", "Set monthly budget limits", "Negotiate with suppliers", "Avoid unnecessary purchases"],
+        "growth_strategies": ["Focus on customer retention", "Collect customer feedback", "Offer referral incentives", "Expand product/service range gradually"],
+        "export_readiness": ["Research export regulations", "Identify potential markets", "Get export licenses", "Find logistics partners"],
+    },
+    "bi.products": {
+        "products": [
+            {"id": "p1", "name": "Masala Chai", "description": "Spiced milk tea", "avg_selling_price": 20, "category": "Beverage"},
+            {"id": "p2", "name": "Samosa (2 pcs)", "description": "Fried potato pastry", "avg_selling_price": 30, "category": "Snack"},
+            {"id": "p3", "name": "Bun Maska", "description": "Buttered sweet bun", "avg_selling_price": 40, "category": "Snack"},
+        ],
+    },
+    "bi.research": {
+        "demand_level": "High",
+        "demand_trend": "Rising",
+        "profit_margin_estimate": "25-40%",
+        "investment_range": "₹50,000 - ₹2,00,000",
+        "risk_score": 4,
+        "top_markets": ["India"],
+        "market_size": "₹5,000 Cr+ annually in India",
+        "competition_level": "Medium",
+        "best_season": "Year-round",
+        "top_products": [{
+            "name": "Masala Chai", "country_of_origin": "India", "global_demand": "High",
+            "price_range": "₹10-₹40", "margin_estimate": "40-60%", "investment_range": "₹20,000-₹80,000",
+        }],
+    },
+    "bi.suppliers": {
+        "suppliers": [{
+            "name": "Assam Tea Traders", "country": "India", "city": "Guwahati",
+            "email": "sales@example.com", "phone": "+91 361 000 0000", "moq": "25 kg",
+            "approx_cost": "₹350-₹450 per kg", "rating": 4.1, "export_capable": True,
+            "website": "www.example.com", "specialization": "CTC and orthodox tea",
+            "delivery_time": "5-7 days", "payment_terms": "50% advance", "pros": ["GST billing"],
+            "cons": ["Min order required"], "verified": True,
+        }],
+        "alternative_countries": ["Sri Lanka"],
+        "sourcing_tips": "Buy from auctions or direct from gardens for better margins.",
+    },
+    "bi.materials": {
+        "materials": [{
+            "name": "Tea leaves", "quantity_per_100_units": "0.5 kg per 100 units",
+            "cost_estimate": "₹350-₹450 per kg", "supplier_source": "Local wholesale market",
+            "storage_requirement": "Airtight, cool and dry", "shelf_life": "12 months",
+            "quality_tip": "Check aroma and leaf colour",
+        }],
+        "total_material_cost_per_100_units": "₹300-₹500",
+        "critical_material": "Milk",
+    },
+    "bi.recipe": {
+        "is_food_product": True,
+        "recipe_name": "Masala Chai",
+        "batch_size": "100 cups",
+        "prep_time": "10 minutes",
+        "cook_time": "15 minutes",
+        "total_time": "25 minutes",
+        "yield_ratio": "10 litres = 100 cups",
+        "ingredients": [{"name": "Milk", "quantity": "6 litres", "cost": "₹360", "source": "Local dairy"}],
+        "steps": [{"step_number": 1, "title": "Boil water", "description": "Boil water with spices", "duration": "5 minutes", "tip": "Crush spices fresh"}],
+        "cost_per_unit": "₹6",
+        "selling_price_per_unit": "₹15-₹20",
+        "profit_per_unit": "₹9-₹14",
+        "profit_margin": "60-70%",
+        "quality_checklist": ["Consistent colour", "Served hot"],
+        "packaging_tip": "Use paper cups with lids for takeaway",
+    },
+}
+
+_SIMPLE_TYPES = (dict, list, str, int, float, bool)
+
+
+def _from_schema(schema) -> object:
+    """Minimal data satisfying a schema with no fixture."""
+    if schema is None:
+        return {}
+    if schema.root is list:
+        return []
+    data = {}
+    for key in schema.required:
+        expected = schema.fields.get(key, str)
+        expected = expected[0] if isinstance(expected, tuple) else expected
+        data[key] = expected() if expected in _SIMPLE_TYPES else ""
+    return data
+
+
+def reply_for(endpoint: str, schema, messages: list) -> str:
+    """Reply text for a call: fixture JSON, plain text for text endpoints."""
+    fixture = FIXTURES.get(endpoint)
+    if callable(fixture):
+        fixture = fixture("\n".join(str(m.get("content", "")) for m in messages))
+    if fixture is None:
+        fixture = _from_schema(schema)
+    if isinstance(fixture, str):
+        return fixture
+    return json.dumps(fixture, ensure_ascii=False)
+
+
+def malform(content: str, kind: str) -> str:
+    if kind == "fenced":
+        # Repairable locally: fences, prose around the object, a trailing comma
+        return f"Here is the result:\n```json\n{content[:-1]},{content[-1]}\n```"
+    if kind == "truncated":
+        return content[:max(1, int(len(content) * 0.8))]
+    return "Sorry, I can only help with business planning questions."
+
+
+# ─── Client ───────────────────────────────────────────────────────────────────
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class MockClient:
+    """Duck-types OpenAI(...): client.chat.completions.create(model=..., messages=..., stream=...)."""
+
+    def __init__(self, ttfb_ms: float = None, latency_dist: str = None, latency_sigma: float = None,
+                 tokens_per_second: float = None, rate_limit_rate: float = None,
+                 malformed_rate: float = None, seed: int = None):
+        self.ttfb_ms = ttfb_ms if ttfb_ms is not None else _env_float("MOCK_LLM_TTFB_MS", 0)
+        self.latency_dist = latency_dist or os.getenv("MOCK_LLM_LATENCY_DIST", "lognormal")
+        self.latency_sigma = latency_sigma if latency_sigma is not None else _env_float("MOCK_LLM_LATENCY_SIGMA", 0.5)
+        self.tokens_per_second = tokens_per_second if tokens_per_second is not None else _env_float("MOCK_LLM_TOKENS_PER_SECOND", 0)
+        self.rate_limit_rate = rate_limit_rate if rate_limit_rate is not None else _env_float("MOCK_LLM_RATE_LIMIT_RATE", 0)
+        self.malformed_rate = malformed_rate if malformed_rate is not None else _env_float("MOCK_LLM_MALFORMED_RATE", 0)
+        seed = seed if seed is not None else os.getenv("MOCK_LLM_SEED")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        logger.info(
+            f"Mock LLM client: ttfb={self.ttfb_ms}ms ({self.latency_dist}, sigma={self.latency_sigma}) "
+            f"tps={self.tokens_per_second or 'instant'} 429_rate={self.rate_limit_rate} malformed_rate={self.malformed_rate}"
+        )
+
+    def _roll(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def _ttfb(self) -> float:
+        mean = self.ttfb_ms / 1000
+        if mean <= 0 or self.latency_dist == "fixed":
+            return max(0.0, mean)
+        with self._lock:
+            if self.latency_dist == "normal":
+                return max(0.0, self._random.gauss(mean, mean * self.latency_sigma))
+            # lognormal with the configured mean: long right tail like real providers
+            mu = math.log(mean) - self.latency_sigma ** 2 / 2
+            return self._random.lognormvariate(mu, self.latency_sigma)
+
+    def create(self, model: str, messages: list, stream: bool = False, stream_options: dict = None, **params):
+        from services import llm  # llm imports this module lazily; avoid the cycle at import time
+
+        endpoint, schema = llm.current_call()
+        # a streamed reply answers with headers at once and waits for its first token
+        # in the body, so a stream can be closed during that wait; a plain one cannot
+        ttfb = self._ttfb()
+        if not stream:
+            time.sleep(ttfb)
+        if self._roll() < self.rate_limit_rate:
+            request = httpx.Request("POST", "http://mock-llm/chat/completions")
+            raise RateLimitError("Rate limit exceeded (mock)", response=httpx.Response(429, request=request), body=None)
+
+        content = reply_for(endpoint, schema, messages)
+        if self._roll() < self.malformed_rate:
+            content = malform(content, MALFORMED_KINDS[int(self._roll() * len(MALFORMED_KINDS))])
+
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // CHARS_PER_TOKEN
+        completion_tokens = max(1, len(content) // CHARS_PER_TOKEN)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        base = {"id": f"mock-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": model}
+
+        if stream:
+            include_usage = bool((stream_options or {}).get("include_usage"))
+            return MockStream(self._chunks(content, usage if include_usage else None, base), ttfb,
+                              CHUNK_TOKENS / self.tokens_per_second if self.tokens_per_second > 0 else 0)
+        if self.tokens_per_second > 0:
+            time.sleep(completion_tokens / self.tokens_per_second)
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(**base, object="chat.completion", usage=usage,
+                               choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")])
+
+    def _chunks(self, content: str, usage, base: dict):
+        step = CHUNK_TOKENS * CHARS_PER_TOKEN
+        for start in range(0, len(content), step):
+            delta = SimpleNamespace(content=content[start:start + step])
+            yield SimpleNamespace(**base, object="chat.completion.chunk", usage=None,
+                                  choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)])
+        yield SimpleNamespace(**base, object="chat.completion.chunk", usage=None,
+                              choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=None), finish_reason="stop")])
+        if usage is not None:
+            yield SimpleNamespace(**base, object="chat.completion.chunk", usage=usage, choices=[])
+
+
+class MockStream:
+    """
+    Iterates like openai.Stream: the first chunk after `ttfb`, content chunks
+    `delay` apart. close() works from any thread and ends a pending read at
+    once with the error a closed connection gives.
+    """
+
+    def __init__(self, chunks, ttfb: float, delay: float):
+        self._chunks = chunks
+        self._ttfb = ttfb
+        self._delay = delay
+        self._closed = threading.Event()
+
+    def __iter__(self):
+        for i, chunk in enumerate(self._chunks):
+            has_content = bool(chunk.choices and chunk.choices[0].delta.content)
+            wait = self._ttfb if i == 0 else self._delay if has_content else 0
+            if (wait and self._closed.wait(wait)) or self._closed.is_set():
+                raise httpx.ReadError("mock stream closed")
+            yield chunk
+
+    def close(self):
+        self._closed.set()
@@ -0,0 +1,212 @@
+"""
+Model Router Service — picks the model for each LLM call from the endpoint's tier.
+Short, latency-sensitive replies (chat titles, business names, ad captions)
+go to a small fast model, structured BI research goes to a larger one and
+everything else stays on the standard model. Per-model latency and success
+rate are kept here for /api/llm-stats and exported on /metrics.
+
+Hedging is opt-in per endpoint (LLM_HEDGE_ENDPOINTS). For those, when the
+primary has not streamed a first token after its recent TTFB percentile,
+llm.chat() sends a duplicate request to the tier's secondary model (or the
+primary again when there is none) and keeps whichever answers first. Until a
+model has enough TTFB samples the tier's fixed delay is used instead.
+
+    LLM_MODEL                                   standard tier primary (as before)
+    LLM_MODEL_FAST / LLM_MODEL_STANDARD / LLM_MODEL_LARGE
+    LLM_MODEL_<TIER>_SECONDARY                  hedge target ("" = the primary again)
+    LLM_HEDGE_AFTER_<TIER>                      fixed hedge delay before there are samples (0 = never hedge)
+    LLM_ENDPOINT_TIERS                          overrides, e.g. "generate_chat_title=standard,bi.recipe=large"
+    LLM_HEDGE_ENDPOINTS                         endpoints that may hedge, e.g. "recommendations,bi.recipe" (default none)
+    LLM_HEDGE_PERCENTILE                        TTFB percentile to wait for before hedging (default 0.95)
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "meta-llama/llama-3.1-8b-instruct")
+
+FAST, STANDARD, LARGE = "fast", "standard", "large"
+
+# (primary, secondary, hedge after seconds)
+_TIER_DEFAULTS = {
+    FAST: ("meta-llama/llama-3.2-3b-instruct", DEFAULT_MODEL, 3.0),
+    STANDARD: (DEFAULT_MODEL, "mistralai/mistral-7b-instruct", 8.0),
+    LARGE: ("meta-llama/llama-3.1-70b-instruct", DEFAULT_MODEL, 12.0),
+}
+
+# Endpoint (the Schema name passed to llm.chat / chat_json) -> tier; unlisted endpoints are standard
+ENDPOINT_TIERS = {
+    "generate_chat_title": FAST,
+    "generate_business_names": FAST,
+    "generate_ad_posts": FAST,
+    "bi.products": LARGE,
+    "bi.research": LARGE,
+    "bi.suppliers": LARGE,
+    "bi.materials": LARGE,
+    "bi.recipe": LARGE,
+}
+
+STATS_WINDOW = 200      # recent calls per model kept for latency percentiles
+
+HEDGE_ENDPOINTS = {e.strip() for e in os.getenv("LLM_HEDGE_ENDPOINTS", "").split(",") if e.strip()}
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = 20  # TTFB samples before the percentile replaces the tier's fixed delay
+
+LLM_MODEL_LATENCY = metrics.Histogram("llm_model_latency_seconds", "Completion latency by model", ("model",))
+LLM_HEDGES = metrics.Counter("llm_hedges_total", "Hedged requests, by which attempt answered", ("endpoint", "winner"))
+LLM_HEDGES_DENIED = metrics.Counter("llm_hedges_denied_total", "Hedges skipped because the hedge budget was spent", ("endpoint",))
+
+
+class Route:
+    def __init__(self, tier: str, primary: str, secondary: str, hedge_after: float):
+        self.tier = tier
+        self.primary = primary
+        self.secondary = secondary if secondary != primary else ""
+        self.hedge_after = hedge_after
+
+    @property
+    def hedge_model(self) -> str:
+        return self.secondary or self.primary
+
+    def to_dict(self) -> dict:
+        return {"tier": self.tier, "primary": self.primary, "secondary": self.secondary or None,
+                "hedge_after_seconds": self.hedge_after or None}
+
+
+def _tier_route(tier: str) -> Route:
+    primary, secondary, hedge_after = _TIER_DEFAULTS[tier]
+    name = tier.upper()
+    try:
+        hedge_after = float(os.getenv(f"LLM_HEDGE_AFTER_{name}", hedge_after))
+    except ValueError:
+        logger.warning(f"Ignoring invalid LLM_HEDGE_AFTER_{name}")
+    return Route(
+        tier,
+        os.getenv(f"LLM_MODEL_{name}") or primary,
+        os.getenv(f"LLM_MODEL_{name}_SECONDARY", secondary),
+        hedge_after,
+    )
+
+
+def _endpoint_overrides() -> dict:
+    overrides = {}
+    for item in os.getenv("LLM_ENDPOINT_TIERS", "").split(","):
+        endpoint, _, tier = item.partition("=")
+        if not endpoint.strip():
+            continue
+        if tier.strip() not in _TIER_DEFAULTS:
+            logger.warning(f"LLM_ENDPOINT_TIERS: unknown tier {tier.strip()!r} for {endpoint.strip()}")
+            continue
+        overrides[endpoint.strip()] = tier.strip()
+    return overrides
+
+
+TIERS = {tier: _tier_route(tier) for tier in _TIER_DEFAULTS}
+ENDPOINT_TIERS.update(_endpoint_overrides())
+
+
+def route(endpoint: str) -> Route:
+    return TIERS[ENDPOINT_TIERS.get(endpoint, STANDARD)]
+
+
+def answering_models(endpoint: str) -> tuple:
+    """Models a reply for `endpoint` can come from, primary first; the hedge model only if the endpoint hedges."""
+    r = route(endpoint)
+    if endpoint in HEDGE_ENDPOINTS and r.hedge_after > 0 and r.hedge_model != r.primary:
+        return r.primary, r.hedge_model
+    return (r.primary,)
+
+
+def hedge_delay(endpoint: str, route: Route):
+    """Seconds to wait for the primary's first token before hedging, or None to not hedge."""
+    if endpoint not in HEDGE_ENDPOINTS or route.hedge_after <= 0:
+        return None
+    with _stats_lock:
+        stats = _stats.get(route.primary)
+        ttfbs = list(stats.ttfbs) if stats else []
+    if len(ttfbs) < HEDGE_MIN_SAMPLES:
+        return route.hedge_after
+    return _percentile(ttfbs, HEDGE_PERCENTILE)
+
+
+# ─── Per-model outcomes ───────────────────────────────────────────────────────
+class _ModelStats:
+    def __init__(self):
+        self.ok = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.latencies: deque = deque(maxlen=STATS_WINDOW)
+        self.ttfbs: deque = deque(maxlen=STATS_WINDOW)
+
+
+_stats: dict = {}
+_stats_lock = threading.Lock()
+
+
+def record(model: str, status: str, latency: float, ttfb=None):
+    """One finished call: status is "ok", "error" or "cancelled" (lost a hedge)."""
+    if status == "ok":
+        LLM_MODEL_LATENCY.observe(latency, model=model)
+    with _stats_lock:
+        stats = _stats.get(model)
+        if stats is None:
+            stats = _stats[model] = _ModelStats()
+        if status == "ok":
+            stats.ok += 1
+            stats.latencies.append(latency)
+        elif status == "cancelled":
+            stats.cancelled += 1
+        else:
+            stats.errors += 1
+        if ttfb is not None:
+            stats.ttfbs.append(ttfb)
+
+
+def record_hedge(endpoint: str, winner: str):
+    """winner: "primary", "hedge", "none" when both attempts failed, or "denied" (over budget)."""
+    if winner == "denied":
+        LLM_HEDGES_DENIED.inc(endpoint=endpoint)
+    else:
+        LLM_HEDGES.inc(endpoint=endpoint, winner=winner)
+
+
+def _percentile(values, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+
+def get_stats() -> dict:
+    """Per model: call counts, success rate and recent latency / TTFB percentiles."""
+    with _stats_lock:
+        items = [(model, s.ok, s.errors, s.cancelled, list(s.latencies), list(s.ttfbs)) for model, s in _stats.items()]
+    result = {}
+    for model, ok, errors, cancelled, latencies, ttfbs in sorted(items):
+        finished = ok + errors
+        result[model] = {
+            "ok": ok,
+            "errors": errors,
+            "cancelled": cancelled,
+            "success_rate": round(ok / finished, 3) if finished else None,
+            "latency_p50": _percentile(latencies, 0.5),
+            "latency_p95": _percentile(latencies, 0.95),
+            "ttfb_p50": _percentile(ttfbs, 0.5),
+            "ttfb_p95": _percentile(ttfbs, 0.95),
+        }
+    return result
+
+
+def snapshot() -> dict:
+    return {
+        "tiers": {tier: r.to_dict() for tier, r in TIERS.items()},
+        "endpoints": dict(sorted(ENDPOINT_TIERS.items())),
+        "hedging": {endpoint: hedge_delay(endpoint, route(endpoint)) for endpoint in sorted(HEDGE_ENDPOINTS)},
+        "models": get_stats(),
+    }
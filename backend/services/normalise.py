@@ -0,0 +1,99 @@
+"""
+Normalise Service — canonical forms of the free-text BI inputs used in cache keys.
+"Bakery", "bakery " and "BAKERY." are the same question, as are "Chai ki
+dukaan" and "Tea Shop" or Bombay and Mumbai, but as raw strings each one is a
+separate cache entry and a separate LLM call. business_type(), product_name()
+and city() fold case, Unicode forms, whitespace and punctuation, and map
+common Hindi / Hinglish words and old city names onto one spelling. The
+canonical strings only build keys; prompts still see what the user typed.
+"""
+
+import unicodedata
+
+# Hindi / Hinglish (Latin and Devanagari) -> English, word by word
+SYNONYMS = {
+    "chai": "tea", "chay": "tea", "chaay": "tea", "चाय": "tea",
+    "sabzi": "vegetable", "sabji": "vegetable", "subzi": "vegetable", "sabziyan": "vegetable", "सब्ज़ी": "vegetable", "सब्जी": "vegetable",
+    "phal": "fruit", "fal": "fruit", "फल": "fruit",
+    "doodh": "milk", "dudh": "milk", "दूध": "milk",
+    "aloo": "potato", "alu": "potato", "आलू": "potato",
+    "pyaz": "onion", "pyaaz": "onion", "kanda": "onion", "प्याज": "onion",
+    "tamatar": "tomato", "टमाटर": "tomato",
+    "mithai": "sweet", "मिठाई": "sweet",
+    "kapda": "cloth", "kapde": "cloth", "kapada": "cloth", "कपड़ा": "cloth",
+    "chapati": "roti", "chapathi": "roti", "phulka": "roti",
+    "namkeen": "snack", "nashta": "snack",
+    "dukaan": "shop", "dukan": "shop", "दुकान": "shop",
+    "kirana": "grocery", "किराना": "grocery",
+    "bhandar": "store",
+    "wala": "shop", "wale": "shop", "wali": "shop", "वाला": "shop",
+    "center": "centre",
+}
+
+# Words for "a place that sells things" in business types; one of them is as good as another
+_SHOP_WORDS = {"shop", "shops", "store", "stores", "stall", "stalls", "outlet", "outlets"}
+_FILLER_WORDS = {"ki", "ka", "ke", "की", "का", "के", "the", "a", "an"}
+
+# Plural goods in business types ("Vegetables shop" = "Vegetable shop"). An explicit
+# list: stripping every trailing "s" turns "clothes" into "clothe" and "mens" into "men".
+PLURALS = {
+    "vegetables": "vegetable", "fruits": "fruit", "sweets": "sweet", "snacks": "snack",
+    "spices": "spice", "flowers": "flower", "cakes": "cake", "pickles": "pickle",
+    "juices": "juice", "groceries": "grocery", "bakeries": "bakery",
+    "toys": "toy", "books": "book", "shoes": "shoe", "bags": "bag", "sarees": "saree",
+    "mobiles": "mobile", "phones": "phone", "tailors": "tailor",
+}
+
+# Old or alternative names -> the current official spelling
+CITY_ALIASES = {
+    "bombay": "mumbai",
+    "bangalore": "bengaluru", "bengalooru": "bengaluru",
+    "madras": "chennai",
+    "calcutta": "kolkata",
+    "poona": "pune",
+    "gurgaon": "gurugram",
+    "baroda": "vadodara",
+    "trivandrum": "thiruvananthapuram",
+    "cochin": "kochi",
+    "mysore": "mysuru",
+    "mangalore": "mangaluru",
+    "benares": "varanasi", "banaras": "varanasi",
+    "allahabad": "prayagraj",
+    "pondicherry": "puducherry",
+    "new delhi": "delhi",
+    "pan india": "india", "all india": "india", "anywhere in india": "india",
+}
+DEFAULT_CITY = "india"
+
+
+def text(value) -> str:
+    """Unicode NFKC, case-folded, punctuation and symbols as spaces, single spaces."""
+    value = unicodedata.normalize("NFKC", str(value or "")).casefold().replace("&", " and ")
+    value = "".join(" " if unicodedata.category(ch)[0] in "PSZC" else ch for ch in value)
+    return " ".join(value.split())
+
+
+_SYNONYMS = {text(word): canonical for word, canonical in SYNONYMS.items()}
+
+
+def _words(value: str) -> list:
+    return [_SYNONYMS.get(word, word) for word in text(value).split() if word not in _FILLER_WORDS]
+
+
+def business_type(value) -> str:
+    """'Chai ki Dukaan' / 'Tea stall' / 'TEA SHOP' -> 'tea shop'."""
+    words = ["shop" if word in _SHOP_WORDS else PLURALS.get(word, word) for word in _words(value)]
+    return " ".join(word for i, word in enumerate(words) if i == 0 or word != words[i - 1])
+
+
+def product_name(value) -> str:
+    """'Masala Chai ' / 'masala-chai' -> 'masala tea'."""
+    return " ".join(_words(value))
+
+
+def city(value) -> str:
+    """'Bombay, Maharashtra' -> 'mumbai'; empty -> 'india'."""
+    first = str(value or "").split(",")[0]
+    name = text(first)
+    name = CITY_ALIASES.get(name, name)
+    return name or DEFAULT_CITY
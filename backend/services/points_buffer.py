@@ -0,0 +1,373 @@
+"""
+Points Buffer — write-behind queue for point awards.
+Events are accepted immediately, appended to a local log so they survive a
+restart, coalesced per user and flushed in batches to the award_points_batch
+RPC on a timer or once the batch size threshold is reached.
+Idempotency is by event_id: duplicates are dropped here and by the database.
+
+Each process appends to its own log (POINTS_LOG_PATH with the pid inserted,
+e.g. points_events.1234.log) and holds a lock on it while running. On start
+a process adopts the logs of processes that are gone, so the events of a
+crashed worker are replayed by whichever worker starts next.
+
+A batch the database rejects (bad user_id, constraint violation) is split in
+halves until the offending events are isolated; those are retried on later
+flushes and moved to the dead-letter log after POINTS_MAX_ATTEMPTS, so one
+poison event never holds up the awards queued behind it. Connection errors
+and outages requeue the whole batch and back off.
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: one process, nothing to coordinate
+    fcntl = None
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("POINTS_FLUSH_INTERVAL", "2.0"))
+FLUSH_BATCH_SIZE = int(os.getenv("POINTS_FLUSH_BATCH_SIZE", "200"))
+LOG_PATH = os.getenv("POINTS_LOG_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "points_events.log"))
+DEAD_LETTER_PATH = os.getenv("POINTS_DEAD_LETTER_PATH", os.path.join(os.path.dirname(LOG_PATH), "points_dead_letter.log"))
+LOG_FSYNC = os.getenv("POINTS_LOG_FSYNC", "False").lower() == "true"
+MAX_ATTEMPTS = int(os.getenv("POINTS_MAX_ATTEMPTS", "5"))  # rejections before an event is dead-lettered
+SEEN_EVENT_IDS = 100_000  # recent ids remembered for duplicate detection
+MAX_RETRY_BACKOFF_SECONDS = 60.0
+
+POINTS_DEAD_LETTERED = metrics.Counter("points_dead_lettered_total", "Point events moved to the dead-letter log")
+POINTS_REJECTED = metrics.Counter("points_rejected_total", "Point events rejected by the database (retried or dead-lettered)")
+
+# SQLSTATE classes that mean "this data is wrong", not "the database is unavailable":
+# 22 data exception (e.g. malformed uuid), 23 integrity violation (unknown user_id), P0 raised by the function
+REJECTION_SQLSTATE_CLASSES = ("22", "23", "P0")
+
+
+def is_rejection(exc: Exception) -> bool:
+    """True when the database refused the data itself (PostgREST APIError with a data SQLSTATE)."""
+    code = str(getattr(exc, "code", "") or "")
+    return len(code) == 5 and code[:2] in REJECTION_SQLSTATE_CLASSES
+
+
+def _lock_file(fh) -> bool:
+    """Take an exclusive, non-blocking lock on an open log; False if another process holds it."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class PointsBuffer:
+    """Durable, coalescing write-behind buffer in front of a bulk flush function."""
+
+    def __init__(self, flush_fn, log_path: str = LOG_PATH,
+                 flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 batch_size: int = FLUSH_BATCH_SIZE,
+                 dead_letter_path: str = DEAD_LETTER_PATH,
+                 max_attempts: int = MAX_ATTEMPTS,
+                 is_rejection=is_rejection,
+                 on_dead_lettered=None):
+        self._flush_fn = flush_fn
+        self._on_dead_lettered = on_dead_lettered
+        root, ext = os.path.splitext(log_path)
+        self._log_pattern = (log_path, f"{root}.*{ext}")
+        self._log_path = f"{root}.{os.getpid()}{ext}"
+        self._dead_letter_path = dead_letter_path
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._is_rejection = is_rejection
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending: "OrderedDict[str, list]" = OrderedDict()  # user_id -> events
+        self._pending_count = 0
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._attempts: dict = {}  # event_id -> rejections so far
+        self._log = None
+        self._thread = None
+        self._failures = 0
+
+    # ── lifecycle ────────────────────────────────────────────────────────
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._log = open(self._log_path, "a+", encoding="utf-8")
+            if not _lock_file(self._log):
+                raise RuntimeError(f"Points log {self._log_path} is locked by another process")
+            replayed = self._replay(self._log)
+            adopted = self._adopt_orphaned_logs()
+            replayed += sum(count for _, _, count in adopted)
+            # Adopted events are in our own log before their old files go away
+            self._rewrite_log()
+            for path, fh, _ in adopted:
+                os.remove(path)
+                fh.close()
+            self._thread = threading.Thread(target=self._run, name="points-buffer", daemon=True)
+            self._thread.start()
+        if replayed:
+            logger.info(f"Points buffer replayed {replayed} unflushed events into {self._log_path}")
+            self._wake.set()
+
+    def _replay(self, fh) -> int:
+        """Queue the events in an open log; callers hold _lock."""
+        fh.seek(0)
+        count = 0
+        for line in fh:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line from a crash mid-write
+                continue
+            if self._remember(event["event_id"]):
+                self._pending.setdefault(event["user_id"], []).append(event)
+                self._pending_count += 1
+                count += 1
+        return count
+
+    def _adopt_orphaned_logs(self) -> list:
+        """
+        Replay the logs of processes that no longer hold their lock.
+        Returns [(path, open locked handle, events replayed)]; callers remove them.
+        """
+        adopted = []
+        legacy, pattern = self._log_pattern
+        for path in sorted({legacy, *glob.glob(pattern)} - {self._log_path}):
+            try:
+                fh = open(path, "r", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            try:
+                # Locked: its worker is alive. Different inode or gone: compacted
+                # by its owner or adopted by another process while we waited
+                if _lock_file(fh) and os.path.exists(path) and os.stat(path).st_ino == os.fstat(fh.fileno()).st_ino:
+                    adopted.append((path, fh, self._replay(fh)))
+                    continue
+            except OSError:
+                pass
+            fh.close()
+        return adopted
+
+    # ── producer side ────────────────────────────────────────────────────
+    def _remember(self, event_id: str) -> bool:
+        if event_id in self._seen:
+            return False
+        self._seen[event_id] = None
+        if len(self._seen) > SEEN_EVENT_IDS:
+            self._seen.popitem(last=False)
+        return True
+
+    def submit(self, user_id: str, activity_type: str, points: int,
+               description: str = "", event_id: str = None):
+        """Queue an award. Returns the event_id, or None for a duplicate."""
+        event = {
+            "event_id": event_id or str(uuid.uuid4()),
+            "user_id": user_id,
+            "activity_type": activity_type,
+            "points": int(points),
+            "description": description,
+        }
+        with self._lock:
+            if not self._remember(event["event_id"]):
+                return None
+            self._log.write(json.dumps(event) + "\n")
+            self._log.flush()
+            if LOG_FSYNC:
+                os.fsync(self._log.fileno())
+            self._pending.setdefault(user_id, []).append(event)
+            self._pending_count += 1
+            full = self._pending_count >= self._batch_size
+        if full:
+            self._wake.set()
+        return event["event_id"]
+
+    def pending_count(self) -> int:
+        return self._pending_count
+
+    # ── consumer side ────────────────────────────────────────────────────
+    def _take_batch(self) -> list:
+        """Pop whole users' events until the batch is full (coalesced per user)."""
+        batch = []
+        with self._lock:
+            while self._pending and len(batch) < self._batch_size:
+                _, events = self._pending.popitem(last=False)
+                batch.extend(events)
+            self._pending_count -= len(batch)
+        return batch
+
+    def _requeue(self, batch: list, front: bool = True):
+        """Put events back: at the head after an outage, at the tail for retries of rejected events."""
+        with self._lock:
+            for event in (reversed(batch) if front else batch):
+                events = self._pending.setdefault(event["user_id"], [])
+                if front:
+                    events.insert(0, event)
+                    self._pending.move_to_end(event["user_id"], last=False)
+                else:
+                    events.append(event)
+            self._pending_count += len(batch)
+
+    def _rewrite_log(self):
+        """Rewrite the log so it only holds events still waiting to be flushed; callers hold _lock."""
+        tmp_path = self._log_path + ".tmp"
+        fh = open(tmp_path, "w", encoding="utf-8")
+        _lock_file(fh)
+        for events in self._pending.values():
+            for event in events:
+                fh.write(json.dumps(event) + "\n")
+        fh.flush()
+        os.replace(tmp_path, self._log_path)
+        self._log.close()
+        self._log = fh
+
+    def _compact_log(self):
+        with self._lock:
+            self._rewrite_log()
+
+    def _forget_attempts(self, events: list):
+        if self._attempts:
+            for event in events:
+                self._attempts.pop(event["event_id"], None)
+
+    def _write_split(self, batch: list):
+        """
+        Write a rejected batch in halves, recursively, down to single events.
+        Returns (events written, events rejected on their own); errors that
+        are not rejections propagate.
+        """
+        if len(batch) == 1:
+            return 0, batch
+        written, rejected = 0, []
+        middle = len(batch) // 2
+        for half in (batch[:middle], batch[middle:]):
+            try:
+                self._flush_fn(half)
+                self._forget_attempts(half)
+                written += len(half)
+            except Exception as e:
+                if not self._is_rejection(e):
+                    raise
+                half_written, half_rejected = self._write_split(half)
+                written += half_written
+                rejected.extend(half_rejected)
+        return written, rejected
+
+    def _dead_letter(self, events: list, error: str):
+        with open(self._dead_letter_path, "a", encoding="utf-8") as fh:
+            for event in events:
+                fh.write(json.dumps({"event": event, "error": error, "attempts": self._max_attempts, "at": time.time()}) + "\n")
+        POINTS_DEAD_LETTERED.inc(len(events))
+        logger.error(f"Points buffer dead-lettered {len(events)} events to {self._dead_letter_path}: {error}")
+        if self._on_dead_lettered:
+            try:
+                self._on_dead_lettered(events)
+            except Exception as e:
+                logger.warning(f"Points buffer on_dead_lettered hook failed: {e}")
+
+    def flush(self) -> int:
+        """Flush everything pending. Returns the number of events written."""
+        written = 0
+        retry, dead, error = [], [], ""
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                try:
+                    self._flush_fn(batch)
+                    self._forget_attempts(batch)
+                    written += len(batch)
+                except Exception as e:
+                    if not self._is_rejection(e):
+                        logger.error(f"Points buffer flush failed ({len(batch)} events): {e}")
+                        self._requeue(batch)
+                        self._failures += 1
+                        break
+                    try:
+                        batch_written, rejected = self._write_split(batch)
+                    except Exception as outage:
+                        # Halves already written are dropped by event_id when retried
+                        logger.error(f"Points buffer flush failed ({len(batch)} events): {outage}")
+                        self._requeue(batch)
+                        self._failures += 1
+                        break
+                    written += batch_written
+                    POINTS_REJECTED.inc(len(rejected))
+                    for event in rejected:
+                        attempts = self._attempts.get(event["event_id"], 0) + 1
+                        if attempts >= self._max_attempts:
+                            self._attempts.pop(event["event_id"], None)
+                            dead.append(event)
+                        else:
+                            self._attempts[event["event_id"]] = attempts
+                            retry.append(event)
+                    if rejected:
+                        logger.warning(f"Points buffer: {len(rejected)} events rejected ({e}); {len(dead)} dead-lettered so far")
+                    error = str(e)
+                    continue
+                self._failures = 0
+            if dead:
+                self._dead_letter(dead, error)
+            # Retried on the next flush, behind everything queued meanwhile
+            if retry:
+                self._requeue(retry, front=False)
+            if written or dead:
+                self._compact_log()
+        return written
+
+    def _run(self):
+        while True:
+            backoff = min(self._flush_interval * (2 ** self._failures), MAX_RETRY_BACKOFF_SECONDS)
+            self._wake.wait(backoff)
+            self._wake.clear()
+            if self._pending_count:
+                self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer(client, on_flushed=None, on_dead_lettered=None) -> PointsBuffer:
+    """
+    Return the process-wide buffer, starting it on first use.
+    on_flushed(events) is called with every batch of events written, and
+    on_dead_lettered(events) with the events given up on.
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                def _flush(events):
+                    client.rpc("award_points_batch", {"p_events": events}).execute()
+                    if on_flushed:
+                        on_flushed(events)
+                buffer = PointsBuffer(_flush, on_dead_lettered=on_dead_lettered)
+                buffer.start()
+                atexit.register(shutdown)
+                _buffer = buffer
+    return _buffer
+
+
+def shutdown():
+    """Best-effort flush at interpreter exit; anything left stays in the log."""
+    if _buffer is not None:
+        try:
+            _buffer.flush()
+        except Exception as e:
+            logger.error(f"Points buffer final flush failed: {e}")
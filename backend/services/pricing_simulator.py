@@ -0,0 +1,173 @@
+"""
+Pricing Simulator — what-if batch pricing over a product's real BOM.
+Samples thousands of scenarios (selling price, monthly volume, per-material
+price shocks) and evaluates them at once with vectorised NumPy math, returning
+margin, profit and break-even distributions. No LLM call.
+"""
+
+import logging
+import math
+import time
+
+import numpy as np
+
+from services import bom_costing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCENARIOS = 10_000
+MAX_SCENARIOS = 200_000
+DEFAULT_PRICE_SPREAD = 0.10          # ±10% around avg_selling_price when no range is given
+DEFAULT_VOLUME_RANGE = (500, 1500)   # units per month
+DEFAULT_SHOCK_RANGE = (-0.10, 0.20)  # material price change, as a fraction
+PERCENTILES = [5, 25, 50, 75, 95]
+HISTOGRAM_BINS = 20
+
+
+class SimulationError(ValueError):
+    """Raised for inputs the simulator cannot run with."""
+
+
+def _number(value, name: str, integer: bool = False):
+    """A finite number from JSON input (numeric strings allowed), else SimulationError."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if isinstance(value, bool) or not math.isfinite(number) or (integer and not number.is_integer()):
+        raise SimulationError(f"{name} must be {'an integer' if integer else 'a number'}")
+    return int(number) if integer else number
+
+
+def _range(value, default, name: str, minimum: float = None):
+    if value is None:
+        return default
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise SimulationError(f"{name} must be a [min, max] pair")
+    low, high = _number(value[0], f"{name} min"), _number(value[1], f"{name} max")
+    if low > high:
+        raise SimulationError(f"{name} min must not exceed max")
+    if minimum is not None and low < minimum:
+        raise SimulationError(f"{name} must not go below {minimum:g}")
+    return low, high
+
+
+def _summary(values: np.ndarray) -> dict:
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return {"mean": None, "percentiles": {}, "finite_share": 0.0}
+    pct = np.percentile(finite, PERCENTILES)
+    return {
+        "mean": float(finite.mean()),
+        "percentiles": {f"p{p}": float(v) for p, v in zip(PERCENTILES, pct)},
+        "finite_share": finite.size / values.size,
+    }
+
+
+def _histogram(values: np.ndarray) -> dict:
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return {"counts": [], "edges": []}
+    counts, edges = np.histogram(finite, bins=HISTOGRAM_BINS)
+    return {"counts": counts.tolist(), "edges": edges.tolist()}
+
+
+def simulate(base_prices: np.ndarray, quantities: np.ndarray, price_range, volume_range,
+             shock_low: np.ndarray, shock_high: np.ndarray, fixed_costs: float = 0.0,
+             scenarios: int = DEFAULT_SCENARIOS, seed=None) -> dict:
+    """
+    Core vectorised evaluation.
+    base_prices / quantities / shock_low / shock_high are aligned per BOM line.
+    """
+    rng = np.random.default_rng(seed)
+    n = scenarios
+
+    prices = rng.uniform(price_range[0], price_range[1], n)
+    volumes = rng.uniform(volume_range[0], volume_range[1], n)
+    shocks = rng.uniform(shock_low, shock_high, (n, base_prices.size))
+
+    # (n × m) shocked material prices @ (m,) quantities -> (n,) unit costs
+    unit_costs = (base_prices * (1.0 + shocks)) @ quantities
+    unit_margin = prices - unit_costs
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin_pct = np.where(prices > 0, unit_margin / prices * 100.0, np.nan)
+        break_even = np.where(unit_margin > 0, fixed_costs / unit_margin, np.inf)
+    monthly_profit = unit_margin * volumes - fixed_costs
+
+    result = {
+        "scenarios": n,
+        "unit_cost": _summary(unit_costs),
+        "margin_pct": dict(_summary(margin_pct), histogram=_histogram(margin_pct)),
+        "monthly_profit": dict(_summary(monthly_profit), histogram=_histogram(monthly_profit)),
+        "probability_negative_margin": float((unit_margin <= 0).mean()),
+        "probability_loss": float((monthly_profit < 0).mean()),
+    }
+    if fixed_costs > 0:
+        result["break_even_units"] = _summary(break_even)
+        result["probability_break_even_within_volume"] = float((break_even <= volumes).mean())
+    return result
+
+
+def simulate_product(client, product_name: str, business_type: str = "", price_range=None,
+                     volume_range=None, material_shocks: dict = None, fixed_costs: float = 0.0,
+                     scenarios: int = DEFAULT_SCENARIOS, seed=None):
+    """
+    Run a simulation for a product with a BOM. Returns None when it has none.
+
+    material_shocks maps a material name (or "default") to a [min, max]
+    fractional price change, e.g. {"default": [-0.1, 0.2], "Butter": [0, 0.5]}.
+    """
+    # Request values arrive straight from JSON: check them before any work
+    scenarios = DEFAULT_SCENARIOS if scenarios is None else _number(scenarios, "scenarios", integer=True)
+    if not 1 <= scenarios <= MAX_SCENARIOS:
+        raise SimulationError(f"scenarios must be between 1 and {MAX_SCENARIOS}")
+    fixed_costs = _number(fixed_costs or 0, "fixed_costs")
+    if fixed_costs < 0:
+        raise SimulationError("fixed_costs must not be negative")
+    if material_shocks is not None and not isinstance(material_shocks, dict):
+        raise SimulationError("material_shocks must be an object of material name -> [min, max]")
+    if seed is not None:
+        seed = _number(seed, "seed", integer=True)
+        if seed < 0:
+            raise SimulationError("seed must not be negative")
+
+    engine = bom_costing.get_engine(client)
+    if engine is None:
+        return None
+    row = engine.find_product(product_name, business_type)
+    if row is None:
+        return None
+
+    selling_price = float(engine.selling_prices[row])
+    default_price = (selling_price * (1 - DEFAULT_PRICE_SPREAD), selling_price * (1 + DEFAULT_PRICE_SPREAD)) if selling_price else None
+    price_range = _range(price_range, default_price, "price_range", minimum=0)
+    if price_range is None:
+        raise SimulationError("price_range is required: product has no avg_selling_price")
+    volume_range = _range(volume_range, DEFAULT_VOLUME_RANGE, "volume_range", minimum=0)
+
+    cols, quantities = engine.bom_lines(row)
+    shocks = {bom_costing.normalise_name(k): v for k, v in (material_shocks or {}).items()}
+    # A shock below -1 (-100%) would make a material price negative
+    default_shock = _range(shocks.pop("default", None), DEFAULT_SHOCK_RANGE, "material_shocks.default", minimum=-1)
+    names = [engine.materials[c].get("name") for c in cols.tolist()]
+    bounds = [_range(shocks.get(bom_costing.normalise_name(name)), default_shock, f"material_shocks[{name}]", minimum=-1)
+              for name in names]
+    shock_low = np.array([b[0] for b in bounds], dtype=np.float64)
+    shock_high = np.array([b[1] for b in bounds], dtype=np.float64)
+
+    started = time.perf_counter()
+    result = simulate(engine.prices[cols], quantities, price_range, volume_range,
+                      shock_low, shock_high, fixed_costs, scenarios, seed)
+    result.update({
+        "product_name": engine.products[row].get("name"),
+        "base_unit_cost": float(engine.unit_costs[row]),
+        "inputs": {
+            "price_range": list(price_range),
+            "volume_range": list(volume_range),
+            "fixed_costs": fixed_costs,
+            "material_shocks": {name: list(b) for name, b in zip(names, bounds)},
+            "seed": seed,
+        },
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    })
+    return result
@@ -0,0 +1,214 @@
+"""
+Profiling Service — opt-in profiling of live requests.
+A request is profiled when it carries X-Profile: sample|cprofile together
+with a valid X-Admin-Token, or when it is picked by PROFILE_SAMPLE_RATE
+(optionally limited to PROFILE_ROUTES). Two modes:
+
+- sample:   one shared background thread snapshots the stacks of the
+            profiled request threads every PROFILE_INTERVAL_MS and folds them
+            into "frame;frame;frame count" lines (flamegraph.pl / speedscope).
+- cprofile: deterministic cProfile of the request thread, merged per route.
+
+Results are aggregated per route rule and served by the admin endpoint.
+"""
+
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+from services.request_timing import is_admin_request
+
+MODES = ("sample", "cprofile")
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+SAMPLE_MODE = os.getenv("PROFILE_MODE", "sample")
+SAMPLE_ROUTES = {r.strip() for r in os.getenv("PROFILE_ROUTES", "").split(",") if r.strip()}
+INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+MAX_STACK_DEPTH = 128
+MAX_STACKS_PER_ROUTE = 5000
+
+_lock = threading.Lock()
+_folded: dict = {}       # route -> Counter(folded stack -> samples)
+_cprofile: dict = {}     # route -> pstats.Stats
+_requests: dict = {}     # (mode, route) -> profiled request count
+
+# cProfile hooks are per-process: only one request may hold the profiler
+_cprofile_lock = threading.Lock()
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _fold(frame) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class _Sampler:
+    """Single daemon thread sampling every registered request thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.targets: dict = {}          # thread id -> route
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def add(self, thread_id: int, route: str):
+        with self.lock:
+            self.targets[thread_id] = route
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def remove(self, thread_id: int):
+        with self.lock:
+            self.targets.pop(thread_id, None)
+            if not self.targets:
+                self.wake.clear()
+
+    def _run(self):
+        while True:
+            self.wake.wait()
+            time.sleep(self.interval)
+            with self.lock:
+                targets = dict(self.targets)
+            if not targets:
+                continue
+            frames = sys._current_frames()
+            samples = [(route, _fold(frames[tid])) for tid, route in targets.items() if tid in frames]
+            with _lock:
+                for route, stack in samples:
+                    stacks = _folded.setdefault(route, Counter())
+                    if stack in stacks or len(stacks) < MAX_STACKS_PER_ROUTE:
+                        stacks[stack] += 1
+
+
+_sampler = _Sampler(INTERVAL_SECONDS)
+
+
+def _route() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def _selected_mode():
+    requested = request.headers.get("X-Profile")
+    if requested:
+        if requested in MODES and is_admin_request():
+            return requested
+        return None
+    if SAMPLE_RATE > 0 and (not SAMPLE_ROUTES or _route() in SAMPLE_ROUTES) and random.random() < SAMPLE_RATE:
+        return SAMPLE_MODE if SAMPLE_MODE in MODES else "sample"
+    return None
+
+
+def _start():
+    mode = _selected_mode()
+    if mode is None:
+        return
+    route = _route()
+    if mode == "cprofile":
+        if not _cprofile_lock.acquire(blocking=False):
+            mode = "sample"   # another request holds cProfile; fall back to sampling
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            g.profiler = profiler
+    if mode == "sample":
+        _sampler.add(threading.get_ident(), route)
+    g.profile_mode = mode
+    g.profile_route = route
+
+
+def _tag(response):
+    mode = getattr(g, "profile_mode", None)
+    if mode:
+        response.headers["X-Profiled"] = mode
+    return response
+
+
+def _stop(exc=None):
+    mode = getattr(g, "profile_mode", None)
+    if mode is None:
+        return
+    route = g.profile_route
+    if mode == "sample":
+        _sampler.remove(threading.get_ident())
+    else:
+        profiler = g.profiler
+        profiler.disable()
+        _cprofile_lock.release()
+        with _lock:
+            if route in _cprofile:
+                _cprofile[route].add(profiler)
+            else:
+                _cprofile[route] = pstats.Stats(profiler)
+    with _lock:
+        _requests[(mode, route)] = _requests.get((mode, route), 0) + 1
+    g.profile_mode = None
+
+
+# ─── Reports ──────────────────────────────────────────────────────────────────
+def summary() -> list:
+    with _lock:
+        return [
+            {"mode": mode, "route": route, "requests": count,
+             "samples": sum(_folded.get(route, {}).values()) if mode == "sample" else None}
+            for (mode, route), count in sorted(_requests.items())
+        ]
+
+
+def folded(route: str = None) -> str:
+    """Sampled stacks in folded format. Without a route filter each stack is rooted at its route rule."""
+    with _lock:
+        items = {r: dict(c) for r, c in _folded.items() if route is None or r == route}
+    lines = []
+    for r, stacks in sorted(items.items()):
+        for stack, count in sorted(stacks.items(), key=lambda kv: -kv[1]):
+            lines.append(f"{stack} {count}" if route else f"{r};{stack} {count}")
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def cprofile_top(route: str, limit: int = 50, sort: str = "cumulative") -> list:
+    with _lock:
+        stats = _cprofile.get(route)
+        if stats is None:
+            return []
+        rows = list(stats.stats.items())
+    key = 3 if sort == "cumulative" else 2
+    rows.sort(key=lambda kv: kv[1][key], reverse=True)
+    return [
+        {
+            "function": f"{os.path.basename(file)}:{line}({func})",
+            "calls": nc,
+            "primitive_calls": cc,
+            "self_ms": round(tt * 1000, 3),
+            "cumulative_ms": round(ct * 1000, 3),
+        }
+        for (file, line, func), (cc, nc, tt, ct, _callers) in rows[:limit]
+    ]
+
+
+def reset():
+    with _lock:
+        _folded.clear()
+        _cprofile.clear()
+        _requests.clear()
+
+
+def init_app(app):
+    app.before_request(_start)
+    app.after_request(_tag)
+    app.teardown_request(_stop)
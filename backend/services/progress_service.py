@@ -0,0 +1,148 @@
+"""
+Progress Service — per-user cache for user_progress rows.
+The cache is per process. Points and ads changed through this worker
+invalidate the entry at once and bump a per-user version, which wakes the SSE
+stream in app.py. Writes this worker never sees (the frontend writing
+user_progress directly, other workers) are picked up when the entry expires,
+so cached rows lag them by at most PROGRESS_TTL_SECONDS.
+
+Streams never poll: they wait for a version bump. For users with an open
+stream one background thread re-reads the row every PROGRESS_TTL_SECONDS and
+bumps the version when it changed, so a user costs one read per interval
+however many streams (tabs, devices) they have open.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from services.request_timing import span
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_TTL_SECONDS = float(os.getenv("PROGRESS_TTL_SECONDS", "5"))  # bound on staleness for outside writes
+
+_CACHE: dict = {}      # user_id -> (timestamp, data, etag)
+_VERSIONS: dict = {}   # user_id -> int, bumped on every invalidation
+_changed = threading.Condition()
+_read_locks: dict = {}     # user_id -> Lock, so concurrent misses share one read
+_watched: dict = {}        # user_id -> open streams
+_watch_state = {"thread": None, "get_client": None}
+
+
+def _etag_for(data) -> str:
+    body = json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(body).hexdigest()
+
+
+def _read(client, user_id: str):
+    with span("db", "user_progress.select"):
+        response = client.table("user_progress") \
+            .select("*") \
+            .eq("user_id", user_id) \
+            .single() \
+            .execute()
+    return response.data
+
+
+def _store(user_id: str, data, seen_version: int):
+    """Cache a row read at seen_version; False (nothing cached) if it was invalidated meanwhile. Callers hold _changed."""
+    if _VERSIONS.get(user_id, 0) != seen_version:
+        return False
+    _CACHE[user_id] = (time.time(), data, _etag_for(data))
+    return True
+
+
+def get_progress(client, user_id: str):
+    """Return (progress row, etag), reading through the cache."""
+    entry = _CACHE.get(user_id)
+    if entry and (time.time() - entry[0]) < PROGRESS_TTL_SECONDS:
+        return entry[1], entry[2]
+
+    with _changed:
+        lock = _read_locks.setdefault(user_id, threading.Lock())
+    with lock:
+        entry = _CACHE.get(user_id)
+        if entry and (time.time() - entry[0]) < PROGRESS_TTL_SECONDS:
+            return entry[1], entry[2]   # read by the thread we waited for
+        seen_version = version(user_id)
+        data = _read(client, user_id)
+        with _changed:
+            _store(user_id, data, seen_version)
+    return data, _etag_for(data)
+
+
+def version(user_id: str) -> int:
+    return _VERSIONS.get(user_id, 0)
+
+
+def invalidate(user_id: str):
+    """Drop the cached row and wake any stream waiting on this user."""
+    with _changed:
+        _CACHE.pop(user_id, None)
+        _VERSIONS[user_id] = _VERSIONS.get(user_id, 0) + 1
+        _changed.notify_all()
+
+
+def wait_for_change(user_id: str, seen_version: int, timeout: float) -> int:
+    """Block until the user's version moves past seen_version or timeout; return the current version."""
+    deadline = time.time() + timeout
+    with _changed:
+        while _VERSIONS.get(user_id, 0) == seen_version:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            _changed.wait(remaining)
+        return _VERSIONS.get(user_id, 0)
+
+
+# ─── Shared refresh for users with open streams ──────────────────────────────
+@contextmanager
+def watch(user_id: str, get_client):
+    """Keep the user's row refreshed (and streams woken on outside changes) while the block runs."""
+    with _changed:
+        _watched[user_id] = _watched.get(user_id, 0) + 1
+        _watch_state["get_client"] = get_client
+        if _watch_state["thread"] is None:
+            _watch_state["thread"] = threading.Thread(target=_refresh_watched, name="progress-refresh", daemon=True)
+            _watch_state["thread"].start()
+    try:
+        yield
+    finally:
+        with _changed:
+            _watched[user_id] -= 1
+            if not _watched[user_id]:
+                del _watched[user_id]
+
+
+def refresh(client, user_id: str) -> bool:
+    """Re-read the row; if it differs from the cached one, cache it and wake the user's streams."""
+    seen_version = version(user_id)
+    data = _read(client, user_id)
+    with _changed:
+        entry = _CACHE.get(user_id)
+        if entry and entry[2] == _etag_for(data):
+            _CACHE[user_id] = (time.time(), entry[1], entry[2])
+            return False
+        if not _store(user_id, data, seen_version):
+            return False    # invalidated while we read; the invalidation woke the streams
+        _VERSIONS[user_id] = seen_version + 1
+        _changed.notify_all()
+        return True
+
+
+def _refresh_watched():
+    while True:
+        time.sleep(PROGRESS_TTL_SECONDS)
+        with _changed:
+            users = list(_watched)
+            get_client = _watch_state["get_client"]
+        for user_id in users:
+            try:
+                refresh(get_client(), user_id)
+            except Exception as e:
+                logger.warning(f"Progress refresh for {user_id} failed: {e}")
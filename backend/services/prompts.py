@@ -0,0 +1,239 @@
+"""
+Prompts Service — registry of the prompt templates whose results are cached.
+Each template is registered once with a content hash of its system and user
+text; the hash is part of every cache and artifact key built from the prompt,
+so editing a prompt invalidates its old results instead of serving them until
+they expire. The registry also counts which inputs each prompt is asked for
+most and persists those counts, so after a deploy that changed a prompt the
+most popular keys can be regenerated in the background (warm_changed()).
+All workers share the stats file: a background thread in each merges the
+requests counted since its last save into the file under a file lock, every
+SAVE_INTERVAL_SECONDS and at exit, so requests never wait on the file. Only
+one worker at a time runs the warm-up, and it re-reads the recorded versions
+first, so a deploy's changed prompts are warmed once, not once per worker.
+
+    PROMPT_STATS_PATH    JSON file for versions and popularity (default backend/prompt_stats.json)
+    PROMPT_WARM_TOP      popular keys to regenerate per changed prompt at startup (0 = off)
+"""
+
+import atexit
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: one process, nothing to coordinate
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STATS_PATH = os.getenv("PROMPT_STATS_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompt_stats.json"))
+WARM_TOP = int(os.getenv("PROMPT_WARM_TOP", "20"))
+MAX_TRACKED_KEYS = 1000      # per prompt; the least requested half is dropped when full
+SAVE_INTERVAL_SECONDS = 60
+
+_registry: dict = {}        # name -> Prompt
+_warmers: dict = {}         # name -> callable(**inputs)
+_popularity: dict = {}      # name -> Counter(json inputs -> requests)
+_unsaved: dict = {}         # name -> Counter of the requests counted since the last save
+_saved_versions: dict = {}  # name -> version recorded in STATS_PATH
+_recorded_versions: dict = {}   # name -> version this process recorded since the last save
+_lock = threading.Lock()
+_state = {"loaded": False, "dirty": False, "saver": None}
+_warming = contextvars.ContextVar("prompt_warming", default=False)   # warm-up calls are not popularity
+
+
+class Prompt:
+    def __init__(self, name: str, template: str, system: str = ""):
+        self.name = name
+        self.template = template
+        self.system = system
+        self.version = hashlib.sha256(f"{system}\0{template}".encode("utf-8")).hexdigest()[:12]
+
+    def render(self, **values) -> str:
+        """The user prompt: template.format(**values) (literal braces are doubled)."""
+        return self.template.format(**values)
+
+    def track(self, **inputs):
+        """Count one request for these inputs (hits included) towards popularity."""
+        if _warming.get():
+            return
+        key = json.dumps(inputs, sort_keys=True, ensure_ascii=False)
+        with _lock:
+            _load()
+            for tracked in (_popularity, _unsaved):
+                counts = tracked.setdefault(self.name, Counter())
+                counts[key] += 1
+                if len(counts) > MAX_TRACKED_KEYS:
+                    tracked[self.name] = Counter(dict(counts.most_common(MAX_TRACKED_KEYS // 2)))
+            _state["dirty"] = True
+            if _state["saver"] is None:
+                _state["saver"] = threading.Thread(target=_save_periodically, name="prompt-stats", daemon=True)
+                _state["saver"].start()
+
+
+def register(name: str, template: str, system: str = "") -> Prompt:
+    prompt = Prompt(name, template, system)
+    with _lock:
+        _registry[name] = prompt
+    return prompt
+
+
+def set_warmer(name: str, warm):
+    """warm(**inputs) regenerates (and caches) the result for one tracked key."""
+    with _lock:
+        _warmers[name] = warm
+
+
+def popular(name: str, top: int) -> list:
+    """The `top` most requested inputs for a prompt, most popular first."""
+    with _lock:
+        _load()
+        counts = _popularity.get(name) or Counter()
+        return [json.loads(key) for key, _ in counts.most_common(top)]
+
+
+# ─── Persistence ──────────────────────────────────────────────────────────────
+def _read() -> dict:
+    try:
+        with open(STATS_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read prompt stats from {STATS_PATH}: {e}")
+        return {}
+
+
+def _load():
+    """Read STATS_PATH once; callers hold _lock."""
+    if _state["loaded"]:
+        return
+    _state["loaded"] = True
+    data = _read()
+    _saved_versions.update(data.get("versions") or {})
+    for name, counts in (data.get("popular") or {}).items():
+        _popularity[name] = Counter(counts) + _popularity.get(name, Counter())
+
+
+def save():
+    """
+    Merge this process's new counts and recorded versions into STATS_PATH.
+    Read, merge and atomic rename happen under an exclusive lock on
+    STATS_PATH.lock, so concurrent workers add to each other's counts instead
+    of overwriting them.
+    """
+    with _lock:
+        _load()
+        if not _state["dirty"]:
+            return
+        deltas = {name: Counter(counts) for name, counts in _unsaved.items()}
+        versions = dict(_recorded_versions)
+        _unsaved.clear()
+        _recorded_versions.clear()
+        _state["dirty"] = False
+    try:
+        with open(f"{STATS_PATH}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            data = _read()
+            merged_versions = {**(data.get("versions") or {}), **versions}
+            merged = {name: Counter(counts) for name, counts in (data.get("popular") or {}).items()}
+            for name, counts in deltas.items():
+                merged[name] = Counter(dict((merged.get(name, Counter()) + counts).most_common(MAX_TRACKED_KEYS)))
+            tmp_path = f"{STATS_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "versions": merged_versions,
+                    "popular": {name: dict(counts.most_common()) for name, counts in merged.items()},
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, STATS_PATH)
+    except OSError as e:
+        logger.warning(f"Could not write prompt stats to {STATS_PATH}: {e}")
+        with _lock:     # keep the unsaved counts for the next attempt
+            for name, counts in deltas.items():
+                _unsaved.setdefault(name, Counter()).update(counts)
+            for name, version in versions.items():
+                _recorded_versions.setdefault(name, version)
+            _state["dirty"] = True
+        return
+    with _lock:     # adopt what the other workers saved
+        _saved_versions.update(merged_versions)
+        for name, counts in merged.items():
+            _popularity[name] = counts + _unsaved.get(name, Counter())
+
+
+def _save_periodically():
+    while True:
+        time.sleep(SAVE_INTERVAL_SECONDS)
+        save()
+
+
+atexit.register(save)
+
+
+# ─── Warm-up after a prompt change ────────────────────────────────────────────
+def changed() -> list:
+    """Registered prompts whose version differs from the one last recorded."""
+    with _lock:
+        _load()
+        return [p for name, p in _registry.items() if _saved_versions.get(name) not in (None, p.version)]
+
+
+def warm_changed(top: int = None):
+    """
+    Regenerate the `top` most popular keys of every prompt that changed since
+    the versions were last recorded, then record the current versions.
+    Prompts seen for the first time are only recorded. Returns without doing
+    anything while another worker is warming.
+    """
+    with open(f"{STATS_PATH}.warm.lock", "a") as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                logger.info("Prompt warm-up is running in another worker; skipping")
+                return
+        with _lock:     # versions recorded by a worker that warmed before us
+            _load()
+            _saved_versions.update(_read().get("versions") or {})
+        _warm_changed(WARM_TOP if top is None else top)
+
+
+def _warm_changed(top: int):
+    for prompt in changed():
+        warm = _warmers.get(prompt.name)
+        if not warm or top <= 0:
+            continue
+        keys = popular(prompt.name, top)
+        logger.info(f"Prompt {prompt.name} changed ({_saved_versions.get(prompt.name)} -> {prompt.version}); warming {len(keys)} keys")
+        token = _warming.set(True)
+        try:
+            for inputs in keys:
+                try:
+                    warm(**inputs)
+                except Exception as e:
+                    logger.warning(f"Warm-up of {prompt.name} {inputs} failed: {e}")
+        finally:
+            _warming.reset(token)
+    with _lock:
+        _load()
+        for name, prompt in _registry.items():
+            if _saved_versions.get(name) != prompt.version:
+                _saved_versions[name] = _recorded_versions[name] = prompt.version
+                _state["dirty"] = True
+    save()
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            name: {"version": p.version, "tracked_keys": len(_popularity.get(name) or ())}
+            for name, p in sorted(_registry.items())
+        }
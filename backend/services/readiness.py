@@ -0,0 +1,92 @@
+"""
+Readiness Service — warm-up tracking for the app's dependencies.
+Each dependency registers a warm function (create a client, load an index).
+warm_up() runs them in a background thread at startup, so a worker accepts
+traffic immediately while the slow work happens; /api/ready reports the state
+of each dependency and answers 503 until every required one is warm.
+Failed dependencies are retried by later readiness checks, except one-shot
+jobs registered with retry=False (a retry would repeat their LLM calls).
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RETRY_FAILED_SECONDS = 30
+
+_checks: dict = {}      # name -> (warm_fn, required, retry)
+_state: dict = {}       # name -> {"status", "seconds", "error", "at"}
+_lock = threading.Lock()
+_warming = threading.Event()
+_started_at = time.time()
+
+
+def register(name: str, warm, required: bool = True, retry: bool = True):
+    """warm() should raise, or return False, when the dependency is unavailable."""
+    with _lock:
+        _checks[name] = (warm, required, retry)
+        _state[name] = {"status": "pending", "seconds": None, "error": None, "at": None}
+
+
+def _warm_one(name: str):
+    warm = _checks[name][0]
+    with _lock:
+        _state[name].update(status="warming", error=None)
+    started = time.perf_counter()
+    try:
+        ok = warm() is not False
+        error = None if ok else "unavailable"
+    except Exception as e:
+        ok, error = False, str(e)
+    elapsed = round(time.perf_counter() - started, 3)
+    with _lock:
+        _state[name].update(status="ready" if ok else "failed", seconds=elapsed, error=error, at=time.time())
+    if ok:
+        logger.info(f"Warm-up: {name} ready in {elapsed * 1000:.0f}ms")
+    else:
+        logger.warning(f"Warm-up: {name} failed after {elapsed * 1000:.0f}ms ({error})")
+
+
+def _run(names: list):
+    try:
+        for name in names:
+            _warm_one(name)
+    finally:
+        _warming.clear()
+
+
+def warm_up(background: bool = True):
+    """Warm every pending dependency, and failed ones whose retry interval has passed."""
+    now = time.time()
+    with _lock:
+        if _warming.is_set():
+            return
+        names = [
+            name for name, state in _state.items()
+            if state["status"] == "pending"
+            or (state["status"] == "failed" and _checks[name][2]
+                and now - (state["at"] or 0) >= RETRY_FAILED_SECONDS)
+        ]
+        if not names:
+            return
+        _warming.set()
+    if background:
+        threading.Thread(target=_run, args=(names,), name="warm-up", daemon=True).start()
+    else:
+        _run(names)
+
+
+def status() -> dict:
+    with _lock:
+        dependencies = {name: dict(state, required=_checks[name][1]) for name, state in _state.items()}
+    for state in dependencies.values():
+        state.pop("at")
+    ready = all(s["status"] == "ready" for s in dependencies.values() if s["required"])
+    return {
+        "ready": ready,
+        "warm": all(s["status"] == "ready" for s in dependencies.values()),
+        "uptime_seconds": round(time.time() - _started_at, 1),
+        "dependencies": dependencies,
+    }
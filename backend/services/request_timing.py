@@ -0,0 +1,146 @@
+"""
+Request Timing — per-route latency histograms and span breakdowns.
+init_app() installs before/after hooks on the Flask app (covering every
+blueprint), times request JSON parsing and response serialisation, and lets
+code mark database / LLM / storage work with span(). Requests slower than
+SLOW_REQUEST_SECONDS are kept with their full span list in a ring buffer for
+the admin endpoint. Cost per request is a few perf_counter() calls.
+"""
+
+import hmac
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from flask import Request, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from services import metrics
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+SLOW_REQUEST_BUFFER = int(os.getenv("SLOW_REQUEST_BUFFER", "200"))
+MAX_SPANS_PER_REQUEST = 200
+
+HTTP_LATENCY = metrics.Histogram("http_request_duration_seconds", "Request latency by route", ("method", "route", "status"))
+HTTP_SPANS = metrics.Histogram("http_span_duration_seconds", "Per-request time spent in db / llm / storage / parse / serialize work", ("route", "kind"))
+
+_slow_requests: deque = deque(maxlen=SLOW_REQUEST_BUFFER)
+_slow_lock = threading.Lock()
+
+
+def _route() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+@contextmanager
+def span(kind: str, name: str = ""):
+    """Time a block as `kind` work ("db", "llm", "storage", ...). No-op outside a request."""
+    if not has_request_context() or getattr(g, "timing_start", None) is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ended = time.perf_counter()
+        totals = g.timing_totals
+        totals[kind] = totals.get(kind, 0.0) + (ended - started)
+        if len(g.timing_spans) < MAX_SPANS_PER_REQUEST:
+            g.timing_spans.append((kind, name, started - g.timing_start, ended - started))
+
+
+class TimedRequest(Request):
+    """Counts request body JSON decoding as a "parse" span."""
+
+    def get_json(self, *args, **kwargs):
+        with span("parse"):
+            return super().get_json(*args, **kwargs)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Counts jsonify() serialisation as a "serialize" span."""
+
+    def dumps(self, obj, **kwargs):
+        with span("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+def _before():
+    g.timing_start = time.perf_counter()
+    g.timing_totals = {}
+    g.timing_spans = []
+
+
+def _after(response):
+    started = getattr(g, "timing_start", None)
+    if started is None:
+        return response
+    duration = time.perf_counter() - started
+    route = _route()
+    totals = g.timing_totals
+
+    HTTP_LATENCY.observe(duration, method=request.method, route=route, status=response.status_code)
+    for kind, seconds in totals.items():
+        HTTP_SPANS.observe(seconds, route=route, kind=kind)
+
+    timing = [f"{kind};dur={seconds * 1000:.1f}" for kind, seconds in totals.items() if kind != "llm"]
+    timing.append(f"total;dur={duration * 1000:.1f}")
+    response.headers.add("Server-Timing", ", ".join(timing))
+
+    if duration >= SLOW_REQUEST_SECONDS:
+        _record_slow(route, response.status_code, duration, totals, g.timing_spans)
+    return response
+
+
+def _record_slow(route: str, status: int, duration: float, totals: dict, spans: list):
+    accounted = sum(totals.values())
+    entry = {
+        "at": time.time(),
+        "method": request.method,
+        "route": route,
+        "path": request.path,
+        "status": status,
+        "duration_ms": round(duration * 1000, 1),
+        "breakdown_ms": {kind: round(seconds * 1000, 1) for kind, seconds in totals.items()},
+        "unaccounted_ms": round(max(duration - accounted, 0.0) * 1000, 1),
+        "spans": [
+            {"kind": kind, "name": name, "offset_ms": round(offset * 1000, 1), "duration_ms": round(length * 1000, 1)}
+            for kind, name, offset, length in spans
+        ],
+    }
+    with _slow_lock:
+        _slow_requests.append(entry)
+
+
+def slow_requests(limit: int = 50, route: str = None) -> list:
+    """Most recent slow requests first."""
+    with _slow_lock:
+        entries = list(_slow_requests)
+    if route:
+        entries = [e for e in entries if e["route"] == route]
+    return entries[::-1][:limit]
+
+
+def is_admin_request() -> bool:
+    """
+    True when X-Admin-Token (or an "Authorization: Bearer" token, which is what
+    Prometheus scrape configs send) matches ADMIN_TOKEN. Admin endpoints are
+    closed while it is unset.
+    """
+    expected = os.getenv("ADMIN_TOKEN")
+    supplied = request.headers.get("X-Admin-Token", "")
+    if not supplied:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        supplied = token.strip() if scheme.lower() == "bearer" else ""
+    # Bytes: compare_digest rejects str with non-ASCII characters, which headers can carry
+    return bool(expected) and hmac.compare_digest(supplied.encode("utf-8"), expected.encode("utf-8"))
+
+
+def init_app(app):
+    app.request_class = TimedRequest
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before)
+    app.after_request(_after)
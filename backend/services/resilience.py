@@ -0,0 +1,91 @@
+"""
+Resilience Service — circuit breaker and retry backoff for outbound calls.
+A breaker opens after a run of consecutive failures and fails fast while open,
+so a struggling dependency is not hammered by every request thread; after the
+reset timeout one trial call is let through (half-open) and its result closes
+or re-opens the circuit. Backoff delays are exponential with full jitter.
+"""
+
+import logging
+import random
+import threading
+import time
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+BREAKER_TRANSITIONS = metrics.Counter("circuit_breaker_transitions_total", "Circuit breaker state changes", ("name", "state"))
+BREAKER_REJECTED = metrics.Counter("circuit_breaker_rejected_total", "Calls failed fast by an open circuit", ("name",))
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open; retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        if state != self.state:
+            self.state = state
+            BREAKER_TRANSITIONS.inc(name=self.name, state=state)
+            log = logger.warning if state == OPEN else logger.info
+            log(f"Circuit {self.name}: {state} (failures={self.failures})")
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            retry_in = self.opened_at + self.reset_timeout - time.time()
+            if self.state == OPEN and retry_in <= 0:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        BREAKER_REJECTED.inc(name=self.name)
+        raise CircuitOpenError(self.name, max(0.0, retry_in))
+
+    def cancel_trial(self):
+        """The admitted call never reached the dependency; let another one be the trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+                self._transition(OPEN)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"name": self.name, "state": self.state, "failures": self.failures}
+
+
+def backoff_delay(attempt: int, base: float = 0.2, cap: float = 2.0) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (1-based)."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
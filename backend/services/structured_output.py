@@ -0,0 +1,216 @@
+"""
+Structured Output — parse, repair and validate JSON returned by the LLM.
+Each endpoint declares a Schema; replies are parsed as-is first, then run
+through a cheap local repair pass (code fences, prose around the object,
+smart/single quotes, trailing commas, Python literals, unclosed strings and
+brackets) before anyone pays for a retry. Outcomes are counted per endpoint
+so repair and retry rates are visible; a reply that only needed its code
+fence removed counts as "fenced", not as repaired.
+"""
+
+import json
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "‘": "'", "’": "'"})
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a reply cannot be turned into data matching its schema."""
+
+    def __init__(self, message: str, raw: str = ""):
+        super().__init__(message)
+        self.raw = raw
+
+
+class Schema:
+    """
+    Minimal declaration of the shape an endpoint expects.
+
+    root:     dict or list
+    required: top-level keys that must be present (dict roots)
+    fields:   key -> expected type (or tuple of types), checked when present
+    """
+
+    def __init__(self, name: str, root=dict, required=(), fields=None):
+        self.name = name
+        self.root = root
+        self.required = tuple(required)
+        self.fields = fields or {}
+
+    def coerce(self, data):
+        """Fix shape mismatches that are safe to fix. Returns (data, changed)."""
+        if self.root is list and isinstance(data, dict):
+            # {"ads": [...]} or a single object where a list was asked for
+            inner = next((v for v in data.values() if isinstance(v, list)), None)
+            return (inner if inner is not None else [data]), True
+        return data, False
+
+    def errors(self, data) -> list:
+        if not isinstance(data, self.root):
+            return [f"expected a JSON {'array' if self.root is list else 'object'}"]
+        if self.root is not dict:
+            return []
+        problems = [f"missing key '{key}'" for key in self.required if key not in data]
+        for key, expected in self.fields.items():
+            if key in data and data[key] is not None and not isinstance(data[key], expected):
+                problems.append(f"'{key}' has the wrong type")
+        return problems
+
+    def describe(self) -> str:
+        if self.root is list:
+            return "a JSON array"
+        if self.required:
+            return "a JSON object with keys: " + ", ".join(self.required)
+        return "a JSON object"
+
+
+# ─── Repair ───────────────────────────────────────────────────────────────────
+def strip_fences(text: str) -> str:
+    match = _FENCE.search(text)
+    return (match.group(1) if match else text).strip()
+
+
+def _drop_trailing_comma(out: list):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(text: str) -> str:
+    """
+    Rewrite near-JSON into JSON in one string-aware pass. Starts at the first
+    '{' or '[', stops once the top-level value is closed, and closes anything
+    left open by a truncated reply.
+    """
+    text = text.translate(_SMART_QUOTES)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text
+    text = text[min(starts):]
+
+    out: list = []
+    stack: list = []
+    quote = None
+    escaped = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+                out.append(ch)
+            elif ch == "\\":
+                escaped = True
+                out.append(ch)
+            elif ch == quote:
+                quote = None
+                out.append('"')
+            elif ch == '"':
+                out.append('\\"')          # inside a single-quoted string
+            elif ch == "\n":
+                out.append("\\n")
+            else:
+                out.append(ch)
+        elif ch in "\"'":
+            quote = ch
+            out.append('"')
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if not stack:
+                break
+            out.append(stack.pop())        # also fixes a mismatched closer
+            if not stack:
+                break
+        elif ch.isalpha():
+            j = i
+            while j < len(text) and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            out.append(_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    if quote:
+        out.append('"')
+    if stack:
+        _drop_trailing_comma(out)
+        if out and out[-1] == ":":
+            out.append("null")
+        while stack:
+            _drop_trailing_comma(out)
+            out.append(stack.pop())
+    return "".join(out)
+
+
+def parse(text: str, schema: Schema = None):
+    """
+    Parse a reply against a schema. Returns (data, outcome), outcome being
+    "clean", "fenced" (valid JSON inside a code fence) or "repaired", or
+    raises StructuredOutputError carrying the raw text.
+    """
+    raw = text or ""
+    body = strip_fences(raw)
+    outcome = "fenced" if body != raw.strip() else "clean"
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError:
+        try:
+            data = json.loads(repair_json(body))
+        except json.JSONDecodeError as e:
+            raise StructuredOutputError(f"invalid JSON ({e.msg})", raw)
+        outcome = "repaired"
+
+    if schema is not None:
+        data, coerced = schema.coerce(data)
+        if coerced:
+            outcome = "repaired"
+        problems = schema.errors(data)
+        if problems:
+            raise StructuredOutputError("; ".join(problems), raw)
+    return data, outcome
+
+
+# ─── Stats ────────────────────────────────────────────────────────────────────
+OUTCOMES = ("clean", "fenced", "repaired", "retried_ok", "failed")
+
+_stats: dict = {}
+_stats_lock = threading.Lock()
+
+
+def record(endpoint: str, outcome: str = None, retries: int = 0, budget_denied: bool = False):
+    """Count one structured call: its final outcome and how many retries it used."""
+    with _stats_lock:
+        counts = _stats.setdefault(endpoint, {"calls": 0, "retries": 0, "budget_denied": 0, **{o: 0 for o in OUTCOMES}})
+        counts["calls"] += 1
+        counts["retries"] += retries
+        counts["budget_denied"] += int(budget_denied)
+        if outcome:
+            counts[outcome] += 1
+    if outcome in ("repaired", "retried_ok", "failed"):
+        logger.info(f"Structured output [{endpoint}]: {outcome} (retries={retries})")
+
+
+def get_stats() -> dict:
+    """Per-endpoint counters plus fence / repair / retry / failure rates."""
+    with _stats_lock:
+        snapshot = {endpoint: dict(counts) for endpoint, counts in _stats.items()}
+    for counts in snapshot.values():
+        calls = counts["calls"] or 1
+        counts["fenced_rate"] = counts["fenced"] / calls
+        counts["repair_rate"] = counts["repaired"] / calls
+        counts["retry_rate"] = counts["retries"] / calls
+        counts["failure_rate"] = counts["failed"] / calls
+    return snapshot
@@ -0,0 +1,145 @@
+"""
+Supplier Index — material -> ranked suppliers, built from supplier_materials.
+Loaded in bulk and kept in memory; joined against the BOM costing engine to
+answer "cheapest full sourcing plan for product X" in a single pass.
+"""
+
+import logging
+import threading
+import time
+
+from services import bom_costing
+from supabase_db import fetch_all_rows
+
+logger = logging.getLogger(__name__)
+
+INDEX_TTL_SECONDS = 600
+RETRY_AFTER_FAILURE_SECONDS = 60
+
+_COLUMNS = (
+    "supplier_id, material_id, price_offer, is_primary_supplier, "
+    "suppliers(id, enterprise_name, district, state, enterprise_type, contact_phone, contact_email)"
+)
+
+
+def _rank_key(offer: dict):
+    # Cheapest first; unpriced offers after priced ones; primary supplier breaks ties
+    price = offer["price_offer"]
+    return (price is None, price if price is not None else 0.0, not offer["is_primary_supplier"], offer["name"] or "")
+
+
+class SupplierIndex:
+    """Immutable snapshot: material_id -> offers ranked by price."""
+
+    def __init__(self, rows: list):
+        self.offers: dict = {}
+        for row in rows:
+            supplier = row.get("suppliers") or {}
+            price = row.get("price_offer")
+            self.offers.setdefault(row["material_id"], []).append({
+                "supplier_id": row["supplier_id"],
+                "name": supplier.get("enterprise_name"),
+                "district": supplier.get("district"),
+                "state": supplier.get("state"),
+                "enterprise_type": supplier.get("enterprise_type"),
+                "phone": supplier.get("contact_phone"),
+                "email": supplier.get("contact_email"),
+                "price_offer": float(price) if price is not None else None,
+                "is_primary_supplier": bool(row.get("is_primary_supplier")),
+            })
+        for offers in self.offers.values():
+            offers.sort(key=_rank_key)
+
+    def ranked(self, material_id: str) -> list:
+        return self.offers.get(material_id, [])
+
+
+_index = None
+_next_load_at = 0.0
+_lock = threading.Lock()
+
+
+def load(client) -> SupplierIndex:
+    global _index, _next_load_at
+    index = SupplierIndex(fetch_all_rows(client, "supplier_materials", _COLUMNS))
+    _index, _next_load_at = index, time.time() + INDEX_TTL_SECONDS
+    logger.info(f"Supplier index loaded ({len(index.offers)} materials)")
+    return index
+
+
+def get_index(client):
+    """Return the current index, reloading after the TTL. None if never loaded."""
+    global _next_load_at
+    if client is None:
+        return _index
+    if time.time() >= _next_load_at:
+        with _lock:
+            if time.time() >= _next_load_at:
+                try:
+                    load(client)
+                except Exception as e:
+                    _next_load_at = time.time() + RETRY_AFTER_FAILURE_SECONDS
+                    logger.error(f"Supplier index load failed: {e}")
+    return _index
+
+
+def sourcing_plan(client, product_name: str, business_type: str = "",
+                  batch_size: int = bom_costing.DEFAULT_BATCH_SIZE):
+    """
+    Cheapest full sourcing plan for a product: for every BOM line pick the
+    best-priced supplier (falling back to the market price when no supplier
+    offers the material). Returns None when the product has no BOM.
+    """
+    engine = bom_costing.get_engine(client)
+    index = get_index(client)
+    if engine is None:
+        return None
+    row = engine.find_product(product_name, business_type)
+    if row is None:
+        return None
+
+    cols, qty = engine.bom_lines(row)
+    lines = []
+    plan_unit_cost = 0.0
+    suppliers: dict = {}
+    unsourced = []
+    for col, q in zip(cols.tolist(), qty.tolist()):
+        material = engine.materials[col]
+        market_price = float(engine.prices[col])
+        offers = index.ranked(material["id"]) if index else []
+        best = offers[0] if offers else None
+        price = best["price_offer"] if best and best["price_offer"] is not None else market_price
+        line_cost = q * price
+        plan_unit_cost += line_cost
+
+        if best:
+            suppliers.setdefault(best["supplier_id"], best)
+        else:
+            unsourced.append(material.get("name"))
+
+        lines.append({
+            "material_id": material["id"],
+            "material": material.get("name"),
+            "unit": material.get("unit"),
+            "quantity_per_unit": q,
+            "quantity_per_batch": q * batch_size,
+            "market_price": market_price,
+            "price": price,
+            "cost_per_batch": line_cost * batch_size,
+            "supplier": best,
+            "alternatives": len(offers) - 1 if offers else 0,
+        })
+
+    market_unit_cost = float(engine.unit_costs[row])
+    return {
+        "product_id": engine.products[row]["id"],
+        "product_name": engine.products[row].get("name"),
+        "batch_size": batch_size,
+        "lines": lines,
+        "suppliers": list(suppliers.values()),
+        "unsourced_materials": unsourced,
+        "plan_cost_per_unit": plan_unit_cost,
+        "plan_cost_per_batch": plan_unit_cost * batch_size,
+        "market_cost_per_batch": market_unit_cost * batch_size,
+        "savings_per_batch": (market_unit_cost - plan_unit_cost) * batch_size,
+    }
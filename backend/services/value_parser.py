@@ -0,0 +1,142 @@
+"""
+Value Parser — typed numbers from the free-text amounts the AI returns.
+Turns Indian-formatted strings such as "₹50,000 - ₹2,00,000", "₹1.5 lakh",
+"₹5,000 Cr+ annually", "₹200-₹400 per kg", "under ₹100" or "25-40%" into
+{"min", "max", "unit", "per"} so downstream code never re-parses them.
+"""
+
+import re
+
+# Keys whose string values are parsed; a typed copy is stored under "<key>_value"
+NUMERIC_FIELDS = {
+    "investment_range",
+    "approx_cost",
+    "cost_estimate",
+    "total_material_cost_per_100_units",
+    "profit_margin_estimate",
+    "margin_estimate",
+    "price_range",
+    "market_size",
+    "cost",
+    "cost_per_unit",
+    "selling_price_per_unit",
+    "profit_per_unit",
+    "profit_margin",
+}
+
+VALUE_SUFFIX = "_value"
+
+_MULTIPLIERS = {
+    "k": 1e3, "thousand": 1e3,
+    "l": 1e5, "lac": 1e5, "lacs": 1e5, "lakh": 1e5, "lakhs": 1e5,
+    "m": 1e6, "mn": 1e6, "million": 1e6,
+    "cr": 1e7, "crore": 1e7, "crores": 1e7,
+    "b": 1e9, "bn": 1e9, "billion": 1e9,
+}
+
+_NUM = r"(\d[\d,]*(?:\.\d+)?|\.\d+)"
+_SCALE = r"(?:\s*(thousand|lakhs?|lacs?|crores?|million|billion|mn|bn|cr|k|l|m|b)(?![a-z]))?"
+_CURRENCY_MARK = r"(₹|\brs\.?|\binr\b)?\s*"
+# A minus sign that starts an amount ("-20%", "-₹500"), not one between two numbers
+_SIGN = r"(?<![\w.%)])(-\s*)?"
+# One amount, or a range of two joined by a range separator; a currency mark
+# or scale word may sit on either end ("₹2-5 lakh", "₹200 - ₹400", "25-40%")
+_AMOUNT = re.compile(
+    _SIGN + _CURRENCY_MARK + r"(-\s*)?" + _NUM + _SCALE
+    + r"(?:(\s*%)?\s*(?:-|–|—|\bto\b)\s*(-\s*)?" + _CURRENCY_MARK + _NUM + _SCALE + r")?"
+    + r"(?![\d.])(\s*(?:%|\bper\s*cent\b|percent\b))?(\s*rupees?\b)?",
+    re.IGNORECASE,
+)
+_PER = re.compile(
+    r"(?:\bper\b(?!\s*cent\b)|/)\s*((?:\d[\d,.]*\s*)?[a-z][a-z .]*?)(?=$|[,;()\d]|\s+(?:or|and|for|from)\b)",
+    re.IGNORECASE,
+)
+_COUNTED = re.compile(r"\s*[a-z]", re.IGNORECASE)
+_ASIDE = re.compile(r"\([^)]*\)")
+_OPEN_ENDED = re.compile(r"\d\s*[a-z]*\s*\+|\babove\b|\bover\b|\bmore than\b", re.IGNORECASE)
+_UPPER_BOUND = re.compile(r"\b(?:under|below|up\s*to|upto|less than|at most)\b", re.IGNORECASE)
+
+
+def _amounts(text: str) -> list:
+    """Every amount or range in text as (low, high or None, unit or None)."""
+    found = []
+    for m in _AMOUNT.finditer(text):
+        sign_a, cur_a, sign_after_mark, a, scale_a, percent_a, sign_b, cur_b, b, scale_b, percent, rupees = m.groups()
+        mult_a = _MULTIPLIERS.get((scale_a or "").lower())
+        mult_b = _MULTIPLIERS.get((scale_b or "").lower())
+        unit = "INR" if (cur_a or cur_b or rupees) else "%" if percent or percent_a else None
+        if unit is None and _COUNTED.match(text, m.end()):
+            continue  # "2 months", "100 units": a count, not an amount
+        low, high = float(a.replace(",", "")), float(b.replace(",", "")) if b else None
+        # "₹2-5 lakh": the scale word on the upper bound also applies to a bare,
+        # smaller lower bound (but not in "₹50,000 to ₹1 lakh")
+        if mult_a is None and high is not None and low <= high:
+            mult_a = mult_b
+        low *= (mult_a or 1.0) * (-1 if sign_a or sign_after_mark else 1)
+        if high is not None:
+            high *= (mult_b or 1.0) * (-1 if sign_b else 1)
+        found.append((low, high, unit))
+    return found
+
+
+def parse_amount(text):
+    """
+    Parse one amount/range string. Returns None when it holds no number
+    (e.g. "Market rate", "₹XX") or when it is unclear which number is meant.
+
+    Two numbers only form a range when joined by "-", "–" or "to"; numbers
+    in parentheses or after "per" ("₹800 per 100 units") are not amounts.
+    A leading minus is kept ("-20%" is a loss). "under", "below", "up to" and
+    "less than" make the amount an upper bound with no min; "above", "over",
+    "more than" and "+" a lower bound with no max.
+    When the text names a currency (or a percentage) only amounts marked
+    with it count, and exactly one amount or range must remain.
+    """
+    if isinstance(text, (int, float)) and not isinstance(text, bool):
+        return {"min": float(text), "max": float(text), "unit": None, "per": None}
+    if not isinstance(text, str):
+        return None
+
+    text = _ASIDE.sub(" ", text)
+    per = _PER.search(text)
+    amounts = _amounts(text[:per.start()] if per else text)
+    for unit in ("INR", "%"):
+        marked = [amount for amount in amounts if amount[2] == unit]
+        if marked:
+            amounts = marked
+            break
+    if len(amounts) != 1:
+        return None
+
+    low, high, unit = amounts[0]
+    if high is None:
+        if _UPPER_BOUND.search(text):
+            low, high = None, low
+        else:
+            high = None if _OPEN_ENDED.search(text) else low
+    elif high < low:
+        low, high = high, low
+    return {
+        "min": low,
+        "max": high,
+        "unit": unit,
+        "per": " ".join(per.group(1).lower().split()) if per else None,
+    }
+
+
+def attach_numeric_fields(data):
+    """
+    Walk an AI result in place and add "<key>_value" next to every known
+    amount field. Returns the same object for chaining.
+    """
+    if isinstance(data, dict):
+        for key in list(data.keys()):
+            value = data[key]
+            if key in NUMERIC_FIELDS and isinstance(value, str):
+                data[key + VALUE_SUFFIX] = parse_amount(value)
+            else:
+                attach_numeric_fields(value)
+    elif isinstance(data, list):
+        for item in data:
+            attach_numeric_fields(item)
+    return data
@@ -1,23 +1,159 @@
 """
 Supabase Database Helper for Backend
-Fetches supplier data from Supabase database
+The one data-access module: every route, service and script gets its client
+from get_client(). PostgREST and Storage share one pooled HTTP/2 session with
+explicit timeouts; idempotent reads are retried with backoff, and all calls go
+through a circuit breaker so an outage fails fast instead of tying up workers.
+health() is a cheap probe for readiness checks.
 """
 
+import logging
 import os
-from supabase import create_client, Client
+import threading
+import time
 
-# Initialize Supabase client
-SUPABASE_URL = os.getenv("SUPABASE_URL", "")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")  # Use service key for backend
+import httpx
 
-supabase_client: Client = None
+from services import metrics
+from services.request_timing import span
+from services.resilience import CircuitBreaker, CircuitOpenError, backoff_delay
 
-if SUPABASE_URL and SUPABASE_KEY:
-    try:
-        supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("DEBUG: Supabase client initialized successfully")
-    except Exception as e:
-        print(f"ERROR: Failed to initialize Supabase client: {e}")
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "10"))
+POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+READ_RETRIES = int(os.getenv("SUPABASE_READ_RETRIES", "2"))
+RETRY_BACKOFF_SECONDS = float(os.getenv("SUPABASE_RETRY_BACKOFF", "0.2"))
+RETRY_STATUSES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+
+HEALTH_TABLE = os.getenv("SUPABASE_HEALTH_TABLE", "business_definitions")
+HEALTH_CACHE_SECONDS = 5
+
+DB_RETRIES = metrics.Counter("supabase_retries_total", "Supabase reads retried after a transient failure", ("method",))
+
+breaker = CircuitBreaker(
+    "supabase",
+    failure_threshold=int(os.getenv("SUPABASE_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("SUPABASE_BREAKER_RESET_SECONDS", "30")),
+)
+
+_client = None
+_client_failed = False
+_client_lock = threading.Lock()
+_health = {"at": 0.0, "result": None}
+
+
+class _ResilientTransport(httpx.HTTPTransport):
+    """Pooled transport: retries idempotent reads, reports every outcome to the breaker."""
+
+    def handle_request(self, request):
+        retryable = request.method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                response = super().handle_request(request)
+            except httpx.TransportError:
+                breaker.record_failure()
+                if not retryable or attempt >= READ_RETRIES:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()  # 4xx too: the service is answering
+                    return response
+                breaker.record_failure()
+                if not retryable or attempt >= READ_RETRIES:
+                    return response
+                response.close()
+            attempt += 1
+            DB_RETRIES.inc(method=request.method)
+            time.sleep(backoff_delay(attempt, RETRY_BACKOFF_SECONDS))
+
+
+def _http_client() -> httpx.Client:
+    timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+    transport = _ResilientTransport(http2=HTTP2, limits=limits)
+    return httpx.Client(transport=transport, timeout=timeout, follow_redirects=True)
+
+
+def get_client():
+    """
+    Shared Supabase client, created on first use (the supabase package is slow
+    to import, so it is not imported until needed). None without credentials.
+    """
+    global _client, _client_failed
+    if _client is None and not _client_failed:
+        with _client_lock:
+            if _client is None and not _client_failed:
+                url = os.getenv("SUPABASE_URL", "")
+                key = os.getenv("SUPABASE_SERVICE_KEY", "")  # Use service key for backend
+                if not (url and key):
+                    logger.warning("Supabase credentials not found in environment")
+                    _client_failed = True
+                    return None
+                try:
+                    from supabase import create_client
+                    from supabase.lib.client_options import SyncClientOptions
+                    _client = create_client(url, key, options=SyncClientOptions(httpx_client=_http_client()))
+                    logger.info("Supabase client initialized successfully")
+                except Exception as e:
+                    logger.error(f"Failed to initialize Supabase client: {e}")
+                    _client_failed = True
+    return _client
+
+
+def health() -> dict:
+    """One-row read against HEALTH_TABLE, cached for a few seconds."""
+    now = time.time()
+    if _health["result"] is not None and now - _health["at"] < HEALTH_CACHE_SECONDS:
+        return _health["result"]
+    client = get_client()
+    started = time.perf_counter()
+    error = None
+    if client is None:
+        error = "not configured"
+    else:
+        try:
+            with span("db", "health"):
+                client.table(HEALTH_TABLE).select("id").limit(1).execute()
+        except CircuitOpenError as e:
+            error = str(e)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    result = {
+        "ok": error is None,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        "circuit": breaker.snapshot(),
+        "error": error,
+    }
+    _health.update(at=now, result=result)
+    return result
+
+
+PAGE_SIZE = 1000  # PostgREST default max-rows
+
+
+def fetch_all_rows(client, table: str, columns: str = "*", order: str = "id") -> list:
+    """
+    Read a whole table in PostgREST-sized pages.
+    Used by the in-memory indexes that bulk-load reference data. Pages are
+    ordered by `order`, a unique column: without a stable order PostgREST
+    may return overlapping pages, skipping or repeating rows.
+    """
+    rows = []
+    start = 0
+    while True:
+        with span("db", f"{table}.page"):
+            page = client.table(table).select(columns).order(order) \
+                .range(start, start + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
 
 
 def fetch_suppliers_from_db():
@@ -25,12 +161,14 @@ def fetch_suppliers_from_db():
     Fetch all suppliers from Supabase database
     Returns data in format compatible with existing AI agent
     """
-    if not supabase_client:
-        print("DEBUG: Supabase client not available, using dummy data")
+    client = get_client()
+    if not client:
+        logger.debug("Supabase client not available, using dummy data")
         return None
     
     try:
-        response = supabase_client.table('suppliers').select('*').execute()
+        with span("db", "suppliers.select"):
+            response = client.table('suppliers').select('*').execute()
         
         if not response.data:
             return None
@@ -52,9 +190,9 @@ def fetch_suppliers_from_db():
                 "contact_email": supplier.get('contact_email')
             })
         
-        print(f"DEBUG: Fetched {len(records)} suppliers from database")
+        logger.debug(f"Fetched {len(records)} suppliers from database")
         return {"records": records}
         
     except Exception as e:
-        print(f"ERROR: Failed to fetch suppliers from database: {e}")
+        logger.error(f"Failed to fetch suppliers from database: {e}")
         return None
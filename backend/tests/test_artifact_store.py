@@ -0,0 +1,33 @@
+from services import artifact_store
+
+
+def _store(monkeypatch):
+    stored = {}
+    monkeypatch.setattr(artifact_store, "get", lambda kind, key: stored.get(key))
+    monkeypatch.setattr(artifact_store, "put", lambda kind, key, inputs, data, version, model: stored.__setitem__(key, data))
+    return stored
+
+
+def test_stored_under_the_model_that_answered(monkeypatch):
+    stored = _store(monkeypatch)
+    inputs = {"business_type": "bakery"}
+    data = artifact_store.get_or_generate("success_guide", inputs, lambda: ({"a": 1}, "hedge"), "v1", ("primary", "hedge"))
+    assert data == {"a": 1}
+    assert list(stored) == [artifact_store.artifact_key("success_guide", inputs, "v1", "hedge")]
+
+
+def test_served_from_any_answering_model(monkeypatch):
+    stored = _store(monkeypatch)
+    inputs = {"business_type": "bakery"}
+    stored[artifact_store.artifact_key("success_guide", inputs, "v1", "hedge")] = {"a": 1}
+
+    def generate():
+        raise AssertionError("should have been served from the store")
+
+    assert artifact_store.get_or_generate("success_guide", inputs, generate, "v1", ("primary", "hedge")) == {"a": 1}
+
+
+def test_nothing_stored_without_data(monkeypatch):
+    stored = _store(monkeypatch)
+    assert artifact_store.get_or_generate("success_guide", {}, lambda: (None, None), "v1", ("primary",)) is None
+    assert stored == {}
@@ -0,0 +1,90 @@
+import pytest
+
+from services.bom_costing import BomEngine, normalise_name
+
+BUSINESSES = [
+    {"id": "b1", "name": "Bakery"},
+    {"id": "b2", "name": "Street Food"},
+    {"id": "b3", "name": "Tea Stall"},
+]
+PRODUCTS = [
+    {"id": "p1", "business_id": "b1", "name": "White Bread (400g)", "avg_selling_price": 40},
+    {"id": "p2", "business_id": "b1", "name": "Birthday Cake", "avg_selling_price": 450},
+    {"id": "p3", "business_id": "b2", "name": "Vada Pav", "avg_selling_price": 20},
+    {"id": "p4", "business_id": "b2", "name": "Samosa", "avg_selling_price": 15},
+    {"id": "p5", "business_id": "b3", "name": "Samosa", "avg_selling_price": 18},
+    {"id": "p6", "business_id": "b1", "name": "Fruit Cake", "avg_selling_price": 300},
+    {"id": "p7", "business_id": "b3", "name": "Masala Chai", "avg_selling_price": 15},
+    {"id": "p8", "business_id": "b1", "name": "Rusk", "avg_selling_price": 30},  # no BOM
+    {"id": "p9", "business_id": "b1", "name": "Fruit-Cake", "avg_selling_price": 320},  # same name as p6
+]
+MATERIALS = [
+    {"id": "m1", "name": "Flour", "unit": "kg", "avg_cost_per_unit": 40},
+    {"id": "m2", "name": "Potato", "unit": "kg", "avg_cost_per_unit": 30},
+]
+BOM = [
+    {"product_id": p["id"], "material_id": "m1", "quantity_required": 0.25}
+    for p in PRODUCTS if p["id"] != "p8"
+] + [{"product_id": "p3", "material_id": "m2", "quantity_required": 0.1}]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return BomEngine(BUSINESSES, PRODUCTS, MATERIALS, BOM)
+
+
+def product_id(engine, name, business=""):
+    row = engine.find_product(name, business)
+    return None if row is None else engine.products[row]["id"]
+
+
+def test_normalise_name_drops_pack_sizes_and_punctuation():
+    assert normalise_name("White Bread (400g)") == "white bread"
+    assert normalise_name("  Vada-Pav!! ") == "vada pav"
+
+
+def test_exact_name_matches(engine):
+    assert product_id(engine, "white bread") == "p1"
+    assert product_id(engine, "Vada Pav", "Bakery") == "p3"
+
+
+def test_exact_name_prefers_the_requested_business(engine):
+    assert product_id(engine, "Samosa", "Tea Stall") == "p5"
+    assert product_id(engine, "Samosa", "Street Food") == "p4"
+
+
+def test_same_name_in_several_other_businesses_is_ambiguous(engine):
+    assert product_id(engine, "Samosa") is None
+    assert product_id(engine, "Samosa", "Bakery") is None
+
+
+def test_same_name_twice_in_the_business_is_ambiguous(engine):
+    assert product_id(engine, "Fruit Cake", "Bakery") is None
+    assert product_id(engine, "Fruit Cake") is None
+
+
+def test_partial_words_never_match_across_businesses(engine):
+    assert product_id(engine, "Pav", "Bakery") is None
+    assert product_id(engine, "a", "Bakery") is None
+    assert product_id(engine, "Pav") is None
+
+
+def test_whole_word_match_within_the_business(engine):
+    assert product_id(engine, "Pav", "Street Food") == "p3"
+    assert product_id(engine, "Fresh White Bread Loaf", "Bakery") == "p1"
+    assert product_id(engine, "Masala Chai", "Chai ki dukaan") == "p7"
+
+
+def test_several_whole_word_matches_are_ambiguous(engine):
+    assert product_id(engine, "Cake", "Bakery") is None
+
+
+def test_products_without_a_bom_are_skipped(engine):
+    assert product_id(engine, "Rusk", "Bakery") is None
+
+
+def test_cost_uses_the_bom(engine):
+    costing = engine.cost(engine.find_product("Vada Pav", "Street Food"), batch_size=10)
+    assert costing["unit_cost"] == pytest.approx(0.25 * 40 + 0.1 * 30)
+    assert costing["batch_cost"] == pytest.approx(130)
+    assert [line["name"] for line in costing["materials"]] == ["Flour", "Potato"]
@@ -0,0 +1,55 @@
+import time
+
+from services.leaderboard_service import Leaderboard
+
+
+def _points(board, user_id):
+    row, _ = board.around(user_id, 0)
+    return row["total_points"] if row else None
+
+
+def test_award_survives_a_reload_before_it_is_written():
+    board = Leaderboard()
+    board.load([{"user_id": "a", "total_points": 10}])
+    board.apply_award("e1", "a", 5)
+    board.load([{"user_id": "a", "total_points": 10}])
+    assert _points(board, "a") == 15
+
+
+def test_award_written_before_the_reload_is_not_counted_twice():
+    board = Leaderboard()
+    board.load([{"user_id": "a", "total_points": 10}])
+    board.apply_award("e1", "a", 5)
+    board.mark_written(["e1"])
+    board.load([{"user_id": "a", "total_points": 15}], fetched_at=time.time() + 1)
+    assert _points(board, "a") == 15
+    board.load([{"user_id": "a", "total_points": 15}])
+    assert _points(board, "a") == 15
+
+
+def test_award_written_during_the_reload_is_kept_until_the_next_one():
+    board = Leaderboard()
+    started = time.time() - 1
+    board.apply_award("e1", "b", 7)
+    board.mark_written(["e1"])
+    board.load([], fetched_at=started)
+    assert _points(board, "b") == 7
+
+
+def test_flush_before_the_award_is_recorded():
+    board = Leaderboard()
+    board.load([])
+    board.mark_written(["e1"])
+    board.apply_award("e1", "a", 5)
+    board.load([{"user_id": "a", "total_points": 5}], fetched_at=time.time() + 1)
+    assert _points(board, "a") == 5
+
+
+def test_dead_lettered_award_is_taken_back():
+    board = Leaderboard()
+    board.load([{"user_id": "a", "total_points": 10}])
+    board.apply_award("e1", "a", 5)
+    board.drop_awards(["e1"])
+    assert _points(board, "a") == 10
+    board.load([{"user_id": "a", "total_points": 10}])
+    assert _points(board, "a") == 10
@@ -0,0 +1,36 @@
+import logging
+import queue
+from types import SimpleNamespace
+
+from services import log_setup, metrics
+
+
+def _count(counter) -> float:
+    return counter._series.get((), 0.0)
+
+
+def _record(level=logging.DEBUG, lineno=1):
+    return logging.LogRecord("test", level, "test.py", lineno, "message", None, None)
+
+
+def test_full_queue_drops_and_counts():
+    handler = log_setup.DroppingQueueHandler(queue.Queue(maxsize=1))
+    before = _count(log_setup.LOG_DROPPED)
+    handler.enqueue(_record())
+    handler.enqueue(_record())
+    assert handler.queue.qsize() == 1
+    assert _count(log_setup.LOG_DROPPED) == before + 1
+
+
+def test_debug_sampling_counts_what_it_skips(monkeypatch):
+    monkeypatch.setattr(log_setup, "time", SimpleNamespace(time=lambda: 1000.0))  # one window
+    sampler = log_setup.DebugSampler(burst=2, every=3)
+    before = _count(log_setup.LOG_SUPPRESSED)
+    kept = [sampler.filter(_record()) for _ in range(8)]
+    assert kept == [True, True, False, False, True, False, False, True]
+    assert _count(log_setup.LOG_SUPPRESSED) == before + 4
+    assert sampler.filter(_record(logging.INFO))
+
+
+def test_counters_are_exported():
+    assert "log_records_dropped_total" in metrics.render()
@@ -0,0 +1,39 @@
+import pytest
+
+from services import model_router
+from services.model_router import Route
+
+
+@pytest.fixture
+def hedged(monkeypatch):
+    monkeypatch.setattr(model_router, "HEDGE_ENDPOINTS", {"bi.recipe"})
+
+
+def test_hedging_is_off_unless_the_endpoint_opts_in():
+    route = Route("standard", "test/off-primary", "test/off-secondary", 2.0)
+    assert model_router.hedge_delay("bi.recipe", route) is None
+
+
+def test_no_hedge_without_a_hedge_delay(hedged):
+    route = Route("standard", "test/zero-primary", "test/zero-secondary", 0)
+    assert model_router.hedge_delay("bi.recipe", route) is None
+    assert model_router.hedge_delay("other", Route("standard", "test/zero-primary", "", 2.0)) is None
+
+
+def test_fixed_delay_until_enough_samples(hedged):
+    route = Route("standard", "test/few-primary", "test/few-secondary", 2.0)
+    for _ in range(model_router.HEDGE_MIN_SAMPLES - 1):
+        model_router.record(route.primary, "ok", 1.0, 0.1)
+    assert model_router.hedge_delay("bi.recipe", route) == 2.0
+
+
+def test_percentile_of_observed_ttfb(hedged, monkeypatch):
+    monkeypatch.setattr(model_router, "HEDGE_PERCENTILE", 0.9)
+    route = Route("standard", "test/many-primary", "test/many-secondary", 2.0)
+    for i in range(1, 101):
+        model_router.record(route.primary, "ok", 1.0, i / 100)
+    assert model_router.hedge_delay("bi.recipe", route) == pytest.approx(0.9, abs=0.011)
+
+
+def test_hedge_goes_to_the_primary_without_a_secondary():
+    assert Route("standard", "test/solo", "test/solo", 2.0).hedge_model == "test/solo"
@@ -0,0 +1,42 @@
+import pytest
+
+from services import normalise
+
+
+@pytest.mark.parametrize("raw", ["Tea Shop", "tea shop ", "TEA SHOP.", "Tea stall", "Chai ki Dukaan", "chai wala", "चाय की दुकान"])
+def test_business_type_spellings_share_a_key(raw):
+    assert normalise.business_type(raw) == "tea shop"
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("Clothes shop", "clothes shop"),
+    ("Mens wear", "mens wear"),
+    ("Electronics", "electronics"),
+    ("Glass works", "glass works"),
+    ("Vegetables Shop", "vegetable shop"),
+    ("Sabzi wala", "vegetable shop"),
+    ("Sweets & Snacks", "sweet and snack"),
+])
+def test_business_type_only_singularises_listed_plurals(raw, expected):
+    assert normalise.business_type(raw) == expected
+
+
+def test_repeated_shop_words_collapse():
+    assert normalise.business_type("Kirana Store Shop") == "grocery shop"
+
+
+def test_product_name():
+    assert normalise.product_name("Masala-Chai ") == "masala tea"
+    assert normalise.product_name("Birthday Cakes") == "birthday cakes"
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("Bombay, Maharashtra", "mumbai"),
+    ("Bangalore", "bengaluru"),
+    ("New Delhi", "delhi"),
+    ("", "india"),
+    (None, "india"),
+    ("Pan India", "india"),
+])
+def test_city(raw, expected):
+    assert normalise.city(raw) == expected
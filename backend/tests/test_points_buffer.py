@@ -0,0 +1,148 @@
+import fcntl
+import json
+import os
+
+import pytest
+
+from services.points_buffer import PointsBuffer, is_rejection
+
+
+class Rejected(Exception):
+    """Stands in for a PostgREST APIError carrying a SQLSTATE."""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class Recorder:
+    def __init__(self, bad_users=(), down=False):
+        self.bad_users = set(bad_users)
+        self.down = down
+        self.batches = []
+
+    def __call__(self, events):
+        if self.down:
+            raise ConnectionError("database unavailable")
+        if any(event["user_id"] in self.bad_users for event in events):
+            raise Rejected("23503")
+        self.batches.append(list(events))
+
+    @property
+    def written(self):
+        return [event["event_id"] for batch in self.batches for event in batch]
+
+
+def make_buffer(tmp_path, flush_fn, **kwargs):
+    buffer = PointsBuffer(
+        flush_fn,
+        log_path=str(tmp_path / "events.log"),
+        dead_letter_path=str(tmp_path / "dead.log"),
+        flush_interval=3600,
+        **kwargs,
+    )
+    buffer.start()
+    return buffer
+
+
+def read_lines(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh]
+
+
+def test_is_rejection_only_for_data_errors():
+    assert is_rejection(Rejected("23503"))
+    assert is_rejection(Rejected("22P02"))
+    assert not is_rejection(Rejected("PGRST000"))
+    assert not is_rejection(Rejected("08006"))
+    assert not is_rejection(ConnectionError())
+
+
+def test_log_is_per_process_and_replayed_after_a_crash(tmp_path):
+    first = make_buffer(tmp_path, Recorder())
+    first.submit("u1", "quiz", 10, event_id="e1")
+    first.submit("u2", "quiz", 5, event_id="e2")
+    assert os.path.basename(first._log_path) == f"events.{os.getpid()}.log"
+    first._log.close()  # crash: the lock goes with the process
+
+    recorder = Recorder()
+    second = make_buffer(tmp_path, recorder)
+    second.flush()  # or the flusher start() woke for the replayed events
+    assert sorted(recorder.written) == ["e1", "e2"]
+    assert read_lines(second._log_path) == []
+
+
+def test_orphaned_logs_are_adopted_but_live_ones_are_not(tmp_path):
+    event = {"event_id": "orphan", "user_id": "u1", "activity_type": "quiz", "points": 1, "description": ""}
+    orphan = tmp_path / "events.999999.log"
+    orphan.write_text(json.dumps(event) + "\n")
+    live = tmp_path / "events.999998.log"
+    live.write_text(json.dumps(dict(event, event_id="live")) + "\n")
+    live_handle = open(live, encoding="utf-8")
+    fcntl.flock(live_handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    try:
+        recorder = Recorder()
+        buffer = make_buffer(tmp_path, recorder)
+        assert not orphan.exists()
+        assert live.exists()
+        # start() wakes the flusher for replayed events, so it may already have written them
+        buffer.flush()
+        assert recorder.written == ["orphan"]
+        assert read_lines(buffer._log_path) == []
+    finally:
+        live_handle.close()
+
+
+def test_outage_requeues_the_whole_batch_in_order(tmp_path):
+    recorder = Recorder(down=True)
+    buffer = make_buffer(tmp_path, recorder)
+    for i in range(3):
+        buffer.submit("u1", "quiz", 1, event_id=f"e{i}")
+    assert buffer.flush() == 0
+    assert buffer.pending_count() == 3
+    assert len(read_lines(buffer._log_path)) == 3
+
+    recorder.down = False
+    assert buffer.flush() == 3
+    assert recorder.written == ["e0", "e1", "e2"]
+
+
+def test_poison_event_is_isolated_retried_then_dead_lettered(tmp_path):
+    recorder = Recorder(bad_users={"ghost"})
+    buffer = make_buffer(tmp_path, recorder, max_attempts=3)
+    buffer.submit("u1", "quiz", 1, event_id="a")
+    buffer.submit("ghost", "quiz", 1, event_id="poison")
+    buffer.submit("u2", "quiz", 1, event_id="b")
+    buffer.submit("u3", "quiz", 1, event_id="c")
+
+    assert buffer.flush() == 3
+    assert sorted(recorder.written) == ["a", "b", "c"]
+    assert buffer.pending_count() == 1
+    assert [e["event_id"] for e in read_lines(buffer._log_path)] == ["poison"]
+
+    # Awards queued behind the poison event are not held up by it
+    buffer.submit("u4", "quiz", 1, event_id="d")
+    assert buffer.flush() == 1
+    assert "d" in recorder.written
+
+    assert buffer.flush() == 0
+    assert buffer.pending_count() == 0
+    assert read_lines(buffer._log_path) == []
+    dead = read_lines(str(tmp_path / "dead.log"))
+    assert [line["event"]["event_id"] for line in dead] == ["poison"]
+
+
+def test_duplicates_are_dropped(tmp_path):
+    buffer = make_buffer(tmp_path, Recorder())
+    assert buffer.submit("u1", "quiz", 1, event_id="same") == "same"
+    assert buffer.submit("u1", "quiz", 1, event_id="same") is None
+    assert buffer.pending_count() == 1
+
+
+@pytest.mark.parametrize("points", ["7", 7.0])
+def test_points_are_stored_as_integers(tmp_path, points):
+    buffer = make_buffer(tmp_path, Recorder())
+    buffer.submit("u1", "quiz", points, event_id="e")
+    assert read_lines(buffer._log_path)[0]["points"] == 7
@@ -0,0 +1,40 @@
+import pytest
+
+from services import bom_costing, pricing_simulator
+from services.bom_costing import BomEngine
+from services.pricing_simulator import SimulationError
+
+
+@pytest.fixture(autouse=True)
+def engine(monkeypatch):
+    engine = BomEngine(
+        [{"id": "b1", "name": "Bakery"}],
+        [{"id": "p1", "business_id": "b1", "name": "White Bread", "avg_selling_price": 40}],
+        [{"id": "m1", "name": "Flour", "unit": "kg", "avg_cost_per_unit": 40}],
+        [{"product_id": "p1", "material_id": "m1", "quantity_required": 0.25}],
+    )
+    monkeypatch.setattr(bom_costing, "get_engine", lambda client: engine)
+
+
+def simulate(**inputs):
+    return pricing_simulator.simulate_product(None, "White Bread", "Bakery", **{"scenarios": 200, "seed": 1, **inputs})
+
+
+@pytest.mark.parametrize("inputs", [
+    {"price_range": [-10, 50]},
+    {"volume_range": [-100, 500]},
+    {"material_shocks": {"default": [-1.5, 0]}},
+    {"material_shocks": {"Flour": [-2, 0.1]}},
+    {"price_range": [50, 10]},
+    {"price_range": ["a", 10]},
+    {"fixed_costs": -1},
+    {"scenarios": "many"},
+])
+def test_invalid_inputs_are_rejected(inputs):
+    with pytest.raises(SimulationError):
+        simulate(**inputs)
+
+
+def test_valid_inputs_run():
+    result = simulate(price_range=[0, 60], volume_range=[0, 500], material_shocks={"Flour": [-1, 0.5]})
+    assert result["inputs"]["price_range"] == [0, 60]
@@ -0,0 +1,80 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from services import progress_service
+
+
+class FakeClient:
+    """Answers the user_progress select chain with `row`; on_read runs during the read."""
+
+    def __init__(self, row):
+        self.row = row
+        self.reads = 0
+        self.on_read = None
+
+    def table(self, name):
+        return self
+
+    def select(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def single(self):
+        return self
+
+    def execute(self):
+        self.reads += 1
+        if self.on_read:
+            self.on_read()
+        return SimpleNamespace(data=dict(self.row))
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    yield
+    for state in (progress_service._CACHE, progress_service._VERSIONS, progress_service._read_locks):
+        state.clear()
+
+
+def test_row_read_before_an_invalidation_is_not_cached():
+    client = FakeClient({"points": 1})
+    client.on_read = lambda: progress_service.invalidate("u")
+    assert progress_service.get_progress(client, "u")[0] == {"points": 1}
+    assert "u" not in progress_service._CACHE
+
+
+def test_cached_rows_are_served_without_a_read():
+    client = FakeClient({"points": 1})
+    progress_service.get_progress(client, "u")
+    progress_service.get_progress(client, "u")
+    assert client.reads == 1
+
+
+def test_refresh_wakes_streams_only_when_the_row_changed():
+    client = FakeClient({"points": 1})
+    progress_service.get_progress(client, "u")
+    seen = progress_service.version("u")
+    assert not progress_service.refresh(client, "u")
+    assert progress_service.version("u") == seen
+
+    client.row = {"points": 2}
+    woken = []
+    waiter = threading.Thread(target=lambda: woken.append(progress_service.wait_for_change("u", seen, 5)))
+    waiter.start()
+    assert progress_service.refresh(client, "u")
+    waiter.join(5)
+    assert woken == [seen + 1]
+    assert progress_service.get_progress(client, "u")[0] == {"points": 2}
+    assert client.reads == 3
+
+
+def test_watch_counts_streams_per_user():
+    with progress_service.watch("u", lambda: None):
+        with progress_service.watch("u", lambda: None):
+            assert progress_service._watched["u"] == 2
+        assert progress_service._watched["u"] == 1
+    assert "u" not in progress_service._watched
@@ -0,0 +1,110 @@
+import json
+from collections import Counter
+
+import pytest
+
+from services import prompts
+
+
+@pytest.fixture
+def fresh(tmp_path, monkeypatch):
+    """Module state as a newly started worker sees it, saving to a temp stats file."""
+    path = tmp_path / "prompt_stats.json"
+    monkeypatch.setattr(prompts, "STATS_PATH", str(path))
+    monkeypatch.setattr(prompts, "SAVE_INTERVAL_SECONDS", 3600)
+
+    def start_worker():
+        for state in (prompts._popularity, prompts._unsaved, prompts._saved_versions, prompts._recorded_versions):
+            state.clear()
+        prompts._state.update(loaded=False, dirty=False)
+
+    monkeypatch.setattr(prompts, "_registry", {})
+    start_worker()
+    yield path, start_worker
+    start_worker()
+
+
+def test_workers_add_to_each_others_counts(fresh):
+    path, start_worker = fresh
+    prompt = prompts.Prompt("test.prompt", "{x}")
+    prompt.track(x="a")
+    prompt.track(x="a")
+    prompts.save()
+
+    start_worker()
+    prompt.track(x="a")
+    prompt.track(x="b")
+    prompts.save()
+
+    assert json.loads(path.read_text())["popular"]["test.prompt"] == {
+        json.dumps({"x": "a"}): 3, json.dumps({"x": "b"}): 1,
+    }
+
+
+def test_saving_twice_does_not_count_twice(fresh):
+    path, _ = fresh
+    prompt = prompts.Prompt("test.prompt", "{x}")
+    prompt.track(x="a")
+    prompts.save()
+    prompt.track(x="a")
+    prompts.save()
+    assert json.loads(path.read_text())["popular"]["test.prompt"] == {json.dumps({"x": "a"}): 2}
+    assert prompts._popularity["test.prompt"] == Counter({json.dumps({"x": "a"}): 2})
+
+
+def test_recorded_versions_survive_another_workers_save(fresh):
+    path, start_worker = fresh
+    prompts._registry["test.one"] = prompts.Prompt("test.one", "one")
+    prompts.warm_changed(top=0)
+
+    start_worker()
+    prompts._registry.clear()
+    prompts._registry["test.two"] = prompts.Prompt("test.two", "two")
+    prompts.warm_changed(top=0)
+
+    assert set(json.loads(path.read_text())["versions"]) == {"test.one", "test.two"}
+
+
+def test_tracking_does_not_write_the_stats_file(fresh):
+    path, _ = fresh
+    prompts.Prompt("test.prompt", "{x}").track(x="a")
+    assert not path.exists()
+    prompts.save()
+    assert path.exists()
+
+
+def test_only_one_worker_warms_at_a_time(fresh):
+    fcntl = pytest.importorskip("fcntl")
+    path, _ = fresh
+    warmed = []
+    prompts._registry["test.one"] = prompts.Prompt("test.one", "{x}")
+    prompts._saved_versions["test.one"] = "old"
+    prompts._popularity["test.one"] = Counter({json.dumps({"x": "a"}): 1})
+    prompts._state["loaded"] = True
+    prompts._warmers["test.one"] = lambda **inputs: warmed.append(inputs)
+    try:
+        with open(f"{path}.warm.lock", "a") as other_worker:
+            fcntl.flock(other_worker.fileno(), fcntl.LOCK_EX)
+            prompts.warm_changed(top=5)
+        assert warmed == []
+        prompts.warm_changed(top=5)
+        assert warmed == [{"x": "a"}]
+    finally:
+        prompts._warmers.pop("test.one", None)
+
+
+def test_versions_recorded_by_an_earlier_worker_stop_a_second_warm_up(fresh):
+    path, _ = fresh
+    prompt = prompts._registry["test.one"] = prompts.Prompt("test.one", "{x}")
+    prompts._saved_versions["test.one"] = "old"
+    prompts._popularity["test.one"] = Counter({json.dumps({"x": "a"}): 1})
+    prompts._state["loaded"] = True
+    path.write_text(json.dumps({"versions": {"test.one": prompt.version}, "popular": {}}))
+    warmed = []
+    prompts._warmers["test.one"] = lambda **inputs: warmed.append(inputs)
+    try:
+        prompts.warm_changed(top=5)
+    finally:
+        prompts._warmers.pop("test.one", None)
+    assert warmed == []
+    assert prompts.changed() == []
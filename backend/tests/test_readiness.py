@@ -0,0 +1,34 @@
+import pytest
+
+from services import readiness
+
+
+@pytest.fixture(autouse=True)
+def clean(monkeypatch):
+    monkeypatch.setattr(readiness, "_checks", {})
+    monkeypatch.setattr(readiness, "_state", {})
+    monkeypatch.setattr(readiness, "RETRY_FAILED_SECONDS", 0)
+
+
+def failing(calls):
+    def warm():
+        calls.append(1)
+        raise RuntimeError("down")
+    return warm
+
+
+def test_failed_dependencies_are_retried():
+    calls = []
+    readiness.register("index", failing(calls), required=False)
+    readiness.warm_up(background=False)
+    readiness.warm_up(background=False)
+    assert len(calls) == 2
+
+
+def test_one_shot_jobs_are_not_retried():
+    calls = []
+    readiness.register("job", failing(calls), required=False, retry=False)
+    readiness.warm_up(background=False)
+    readiness.warm_up(background=False)
+    assert len(calls) == 1
+    assert readiness.status()["dependencies"]["job"]["status"] == "failed"
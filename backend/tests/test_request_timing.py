@@ -0,0 +1,30 @@
+import pytest
+from flask import Flask
+
+from services import request_timing
+
+app = Flask(__name__)
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+
+
+@pytest.mark.parametrize("headers, allowed", [
+    ({"X-Admin-Token": "s3cret"}, True),
+    ({"Authorization": "Bearer s3cret"}, True),
+    ({"X-Admin-Token": "wrong"}, False),
+    ({"X-Admin-Token": "sécret"}, False),
+    ({"Authorization": "Bearer ☃"}, False),
+    ({}, False),
+])
+def test_is_admin_request(headers, allowed):
+    with app.test_request_context(headers=headers):
+        assert request_timing.is_admin_request() is allowed
+
+
+def test_closed_without_a_configured_token(monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN")
+    with app.test_request_context(headers={"X-Admin-Token": ""}):
+        assert request_timing.is_admin_request() is False
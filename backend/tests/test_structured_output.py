@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from services.structured_output import Schema, StructuredOutputError, parse, repair_json, strip_fences
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1,}', {"a": 1}),
+    ("{'a': 'it\"s'}", {"a": 'it"s'}),
+    ("{“a”: “b”}", {"a": "b"}),
+    ('{"ok": True, "none": None, "no": False}', {"ok": True, "none": None, "no": False}),
+    ('Sure! Here it is: {"a": [1, 2,]} Hope that helps.', {"a": [1, 2]}),
+    ('{"a": "line one\nline two"}', {"a": "line one\nline two"}),
+    ('{"a": [1, 2', {"a": [1, 2]}),
+    ('{"a": "trunc', {"a": "trunc"}),
+    ('{"a":', {"a": None}),
+    ('{"a": [1, 2}', {"a": [1, 2]}),
+])
+def test_repair_json(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+def test_repair_json_leaves_text_without_json_alone():
+    assert repair_json("no json here") == "no json here"
+
+
+def test_strip_fences():
+    assert strip_fences('```json\n{"a": 1}\n```') == '{"a": 1}'
+    assert strip_fences('{"a": 1}') == '{"a": 1}'
+
+
+def test_parse_outcomes():
+    assert parse('{"a": 1}') == ({"a": 1}, "clean")
+    assert parse('```json\n{"a": 1}\n```') == ({"a": 1}, "fenced")
+    assert parse('```json\n{"a": 1,}\n```') == ({"a": 1}, "repaired")
+    assert parse("{'a': 1}") == ({"a": 1}, "repaired")
+
+
+def test_parse_checks_the_schema():
+    schema = Schema("test", required=["items"], fields={"items": list})
+    assert parse('{"items": []}', schema) == ({"items": []}, "clean")
+    with pytest.raises(StructuredOutputError) as error:
+        parse('{"items": "x"}', schema)
+    assert "wrong type" in str(error.value)
+    assert error.value.raw == '{"items": "x"}'
+    with pytest.raises(StructuredOutputError):
+        parse("no json here", schema)
+
+
+def test_parse_coerces_an_object_to_a_list_as_a_repair():
+    schema = Schema("ads", root=list)
+    assert parse('{"ads": [{"h": 1}]}', schema) == ([{"h": 1}], "repaired")
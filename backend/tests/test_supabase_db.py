@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import supabase_db
+
+
+class PagedTable:
+    """Serves `rows` sorted by the requested order column, like PostgREST with .order()."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.orders = []
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        return self
+
+    def order(self, column):
+        self.orders.append(column)
+        self._sorted = sorted(self.rows, key=lambda r: r[column])
+        return self
+
+    def range(self, start, stop):
+        self._page = self._sorted[start:stop + 1]
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self._page)
+
+
+def test_pages_are_ordered_and_cover_every_row(monkeypatch):
+    monkeypatch.setattr(supabase_db, "PAGE_SIZE", 3)
+    rows = [{"id": f"{i:02d}"} for i in reversed(range(8))]
+    client = PagedTable(rows)
+    fetched = supabase_db.fetch_all_rows(client, "products")
+    assert [r["id"] for r in fetched] == [f"{i:02d}" for i in range(8)]
+    assert client.orders == ["id"] * 3
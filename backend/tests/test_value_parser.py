@@ -0,0 +1,92 @@
+import pytest
+
+from services.value_parser import attach_numeric_fields, parse_amount
+
+
+@pytest.mark.parametrize("text, low, high, unit, per", [
+    ("₹50,000 - ₹2,00,000", 50_000, 200_000, "INR", None),
+    ("e.g. ₹50,000 - ₹2,00,000", 50_000, 200_000, "INR", None),
+    ("₹1.5 lakh", 150_000, 150_000, "INR", None),
+    ("₹2-5 lakh", 200_000, 500_000, "INR", None),
+    ("₹50,000 to ₹1 lakh", 50_000, 100_000, "INR", None),
+    ("Rs. 200 to 400", 200, 400, "INR", None),
+    ("₹200-₹400 per kg", 200, 400, "INR", "kg"),
+    ("₹500/kg", 500, 500, "INR", "kg"),
+    ("25-40%", 25, 40, "%", None),
+    ("1,200", 1200, 1200, None, None),
+])
+def test_amounts_and_ranges(text, low, high, unit, per):
+    assert parse_amount(text) == {"min": low, "max": high, "unit": unit, "per": per}
+
+
+@pytest.mark.parametrize("text, low, high, unit", [
+    ("-20%", -20, -20, "%"),
+    ("Margin: -20%", -20, -20, "%"),
+    ("-₹500", -500, -500, "INR"),
+    ("-10% to -5%", -10, -5, "%"),
+    ("-5 to 10%", -5, 10, "%"),
+])
+def test_leading_minus_is_kept(text, low, high, unit):
+    assert parse_amount(text) == {"min": low, "max": high, "unit": unit, "per": None}
+
+
+@pytest.mark.parametrize("text, high, unit", [
+    ("under ₹100", 100, "INR"),
+    ("Below ₹5 lakh", 500_000, "INR"),
+    ("up to 30%", 30, "%"),
+    ("less than ₹2,000", 2_000, "INR"),
+])
+def test_upper_bound_words_leave_min_open(text, high, unit):
+    assert parse_amount(text) == {"min": None, "max": high, "unit": unit, "per": None}
+
+
+@pytest.mark.parametrize("text, low, high", [
+    ("20 to 30 percent", 20, 30),
+    ("15 per cent", 15, 15),
+    ("10%-20%", 10, 20),
+])
+def test_percent_spelled_out(text, low, high):
+    assert parse_amount(text) == {"min": low, "max": high, "unit": "%", "per": None}
+
+
+def test_open_ended_amount_has_no_max():
+    assert parse_amount("₹5,000 Cr+ annually") == {"min": 5e10, "max": None, "unit": "INR", "per": None}
+
+
+@pytest.mark.parametrize("text, low, per", [
+    ("₹800 per 100 units", 800, "100 units"),
+    ("₹100 per 1 kg", 100, "1 kg"),
+    ("₹1,50,000 (approx. 2 months)", 150_000, None),
+    ("₹500 for 2 kg", 500, None),
+])
+def test_numbers_after_per_or_in_parentheses_are_not_bounds(text, low, per):
+    assert parse_amount(text) == {"min": low, "max": low, "unit": "INR", "per": per}
+
+
+@pytest.mark.parametrize("text", [
+    "Market rate",
+    "₹XX",
+    "₹XX per kg from 2 suppliers",
+    "approx 2 months",
+    "Year 1: ₹2 lakh, Year 2: ₹5 lakh",
+    None,
+    True,
+])
+def test_unclear_values_are_none(text):
+    assert parse_amount(text) is None
+
+
+def test_plain_numbers_pass_through():
+    assert parse_amount(120) == {"min": 120.0, "max": 120.0, "unit": None, "per": None}
+
+
+def test_attach_numeric_fields_walks_nested_results():
+    data = {
+        "investment_range": "₹50,000 - ₹2,00,000",
+        "top_products": [{"name": "Chai", "price_range": "₹10-₹20"}],
+        "notes": "₹5 lakh",
+    }
+    assert attach_numeric_fields(data) is data
+    assert data["investment_range_value"]["max"] == 200_000
+    assert data["top_products"][0]["price_range_value"]["min"] == 10
+    assert "notes_value" not in data
@@ -0,0 +1,44 @@
+"""
+Warm the BI caches for popular business / product pairs (services/cache_warmup.py).
+Run after a deploy, or on a schedule, with BI_CACHE_DIR pointing at the same
+directory the app uses so its workers pick the results up. Without
+BI_CACHE_DIR the results would only live in this process, so the job refuses
+to run.
+
+    python warm_cache.py
+    python warm_cache.py --pairs "Tea Stall:Masala Chai|Samosa;Bakery:Birthday Cake" --concurrency 2 --rpm 10
+"""
+import argparse
+import json
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment explicitly (DOTENV_PATH overrides, as in app.py); before the
+# imports below because the services read env at import
+dotenv_path = os.getenv("DOTENV_PATH") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+load_dotenv(dotenv_path, override=True)
+
+from services import bi_service, cache_warmup, log_setup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pairs", help='"Business:Product A|Product B;Other:..." (default: BI_WARM_PAIRS or the built-in catalogue)')
+    parser.add_argument("--concurrency", type=int, help=f"worker threads (default {cache_warmup.CONCURRENCY})")
+    parser.add_argument("--rpm", type=float, help=f"LLM requests per minute for the job (default {cache_warmup.RPM:g})")
+    args = parser.parse_args()
+
+    if not bi_service.CACHE_DIR:
+        print("BI_CACHE_DIR is not set: warmed results would stay in this process and no app worker "
+              "would see them. Set it to the directory the app uses.", file=sys.stderr)
+        return 2
+    log_setup.configure()
+    pairs = cache_warmup.parse_pairs(args.pairs) if args.pairs else None
+    summary = cache_warmup.run(pairs, concurrency=args.concurrency, rpm=args.rpm)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,60 @@
+-- =====================================================
+-- DATABASE MIGRATION: BATCHED POINT AWARDING
+-- Date: 2026-10-19
+-- Purpose: Idempotent bulk RPC used by the backend write-behind points buffer
+-- =====================================================
+
+-- 1. Idempotency key for point events (NULL for legacy single awards)
+ALTER TABLE public.point_activities ADD COLUMN IF NOT EXISTS event_id TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_point_activities_event_id
+ON public.point_activities(event_id)
+WHERE event_id IS NOT NULL;
+
+-- 2. Bulk award function
+-- p_events: [{"event_id", "user_id", "activity_type", "points", "description"}, ...]
+-- Events already recorded (same event_id) are skipped, totals are applied once
+-- per user and ranks are recomputed once per batch.
+CREATE OR REPLACE FUNCTION award_points_batch(p_events JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    inserted_count INTEGER;
+BEGIN
+    WITH incoming AS (
+        SELECT DISTINCT ON (e.event_id) e.*
+        FROM jsonb_to_recordset(p_events)
+            AS e(event_id TEXT, user_id UUID, activity_type TEXT, points INTEGER, description TEXT)
+    ),
+    inserted AS (
+        INSERT INTO public.point_activities (event_id, user_id, activity_type, points_awarded, description)
+        SELECT event_id, user_id, activity_type, points, description FROM incoming
+        ON CONFLICT (event_id) WHERE event_id IS NOT NULL DO NOTHING
+        RETURNING user_id, points_awarded
+    ),
+    per_user AS (
+        SELECT user_id, SUM(points_awarded)::INTEGER AS points
+        FROM inserted
+        GROUP BY user_id
+    ),
+    totals AS (
+        -- Data-modifying CTEs always run to completion, even when unreferenced
+        INSERT INTO public.user_points (user_id, total_points)
+        SELECT user_id, points FROM per_user
+        ON CONFLICT (user_id)
+        DO UPDATE SET total_points = public.user_points.total_points + EXCLUDED.total_points
+    )
+    SELECT COUNT(*) INTO inserted_count FROM inserted;
+
+    -- Update ranks once for the whole batch
+    WITH ranked_users AS (
+        SELECT user_id, ROW_NUMBER() OVER (ORDER BY total_points DESC) as new_rank
+        FROM public.user_points
+    )
+    UPDATE public.user_points
+    SET rank = ranked_users.new_rank
+    FROM ranked_users
+    WHERE public.user_points.user_id = ranked_users.user_id;
+
+    RETURN inserted_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
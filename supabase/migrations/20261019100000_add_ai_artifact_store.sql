@@ -0,0 +1,61 @@
+-- =====================================================
+-- DATABASE MIGRATION: CONTENT-ADDRESSED AI ARTIFACTS
+-- Date: 2026-10-19
+-- Purpose: Let the backend artifact store (services/artifact_store.py) keep
+-- generated success guides, budget predictions, ad templates and recipe
+-- breakdowns, keyed by a hash of the normalised inputs, prompt version and model
+-- =====================================================
+
+-- 1. Shared artifacts are not owned by a user; the backend writes them with the
+--    service key (RLS still hides rows without a user_id from clients)
+ALTER TABLE public.success_guides ALTER COLUMN user_id DROP NOT NULL;
+ALTER TABLE public.budget_predictions ALTER COLUMN user_id DROP NOT NULL;
+ALTER TABLE public.advertisement_templates ALTER COLUMN user_id DROP NOT NULL;
+
+-- 2. Artifact columns (NULL for rows saved by users before this migration)
+ALTER TABLE public.success_guides
+    ADD COLUMN IF NOT EXISTS artifact_key TEXT,
+    ADD COLUMN IF NOT EXISTS prompt_version TEXT,
+    ADD COLUMN IF NOT EXISTS model TEXT,
+    ADD COLUMN IF NOT EXISTS payload JSONB;
+
+ALTER TABLE public.budget_predictions
+    ADD COLUMN IF NOT EXISTS artifact_key TEXT,
+    ADD COLUMN IF NOT EXISTS prompt_version TEXT,
+    ADD COLUMN IF NOT EXISTS model TEXT,
+    ADD COLUMN IF NOT EXISTS payload JSONB;
+
+-- advertisement_templates keeps the whole generated reply in template_data
+ALTER TABLE public.advertisement_templates
+    ADD COLUMN IF NOT EXISTS artifact_key TEXT,
+    ADD COLUMN IF NOT EXISTS prompt_version TEXT,
+    ADD COLUMN IF NOT EXISTS model TEXT;
+
+-- Plain (not partial) unique indexes so PostgREST upserts can target them;
+-- NULL keys never conflict
+CREATE UNIQUE INDEX IF NOT EXISTS idx_success_guides_artifact_key ON public.success_guides(artifact_key);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_budget_predictions_artifact_key ON public.budget_predictions(artifact_key);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_advertisement_templates_artifact_key ON public.advertisement_templates(artifact_key);
+
+-- 3. Artifacts without a table of their own (recipe breakdowns)
+CREATE TABLE IF NOT EXISTS public.ai_artifacts (
+    artifact_key TEXT NOT NULL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    prompt_version TEXT,
+    model TEXT,
+    inputs JSONB NOT NULL DEFAULT '{}'::jsonb,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_ai_artifacts_kind ON public.ai_artifacts(kind);
+
+-- Backend only: no client policies
+ALTER TABLE public.ai_artifacts ENABLE ROW LEVEL SECURITY;
+
+DROP TRIGGER IF EXISTS update_ai_artifacts_updated_at ON public.ai_artifacts;
+CREATE TRIGGER update_ai_artifacts_updated_at
+BEFORE UPDATE ON public.ai_artifacts
+FOR EACH ROW
+EXECUTE FUNCTION public.update_updated_at_column();